@@ -4,19 +4,30 @@ import asyncio
 import time
 import os
 import logging
+from datetime import datetime
 from pydantic import BaseModel
-from fastapi import FastAPI, WebSocket, WebSocketDisconnect
+from fastapi import FastAPI, WebSocket, WebSocketDisconnect, Request, Depends, Query
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.exceptions import HTTPException
 
-from trader.trader import Trader, get_scoped_session
+from trader.trader import Trader
+from trader.storage import Storage, StorageConfig, AsyncStorage
+from trader import repository
+from trader.equity import record_equity_snapshots, downsample, DOWNSAMPLING_METHODS
+from trader.risk import portfolio_risk
+from trader.ledger import ensure_positions
 from time_series.predictor import Predictor
 from social_media_analysis.reddit_sentiment_analysis import get_sentiment_analysis_for_stocks
 from news.news_sentiment import NewsSentimentAnalyzer
 
-from trader.llm_trader import LLMTrader
+from trader.llm_trader import MODES
+from trader.registry import seed_traders, DecisionScheduler, DEFAULT_BALANCE
+from trader.llm_client import AsyncLLMClient
+from trader.decision_cache import DecisionCache
 
 from context_generator import generate_context
+from pipeline import UpdatePipeline, Stage
+from snapshot import Snapshot
 
 if sys.platform.startswith('win'):
 	asyncio.set_event_loop_policy(asyncio.WindowsSelectorEventLoopPolicy())
@@ -40,72 +51,226 @@ app.add_middleware(
 	allow_headers=["*"],
 )
 
-session = get_scoped_session("sqlite:///db.sqlite")
+# WAL + tuned pragmas (see trader/storage.py), DB_URL / DB_POOL_SIZE override the defaults
+storage_config = StorageConfig.from_env()
+# same database for the handlers, through aiosqlite so queries never block the event loop
+async_storage = AsyncStorage(storage_config)
 
-# modes : value, growth, momentum, defensive, ideal
-profiles = {
-	"Alice": "value",
-	"Bob": "growth",
-	"Charlie": "momentum",
-	"David": "defensive",
-	"Eve": "ideal"
-}
+# built by setup() on startup, not when the module is imported: the training pool spawns
+# processes that re-import __main__ (this file with `python main.py`) and must not repeat it
+storage = None
+session = None
+scheduler = None
+predictor = None
+news_analyzer = None
 
-llms = {}
- 
-for name, profile in profiles.items():
-	if not session.query(Trader).filter(Trader.name == name).first():
-		trader = Trader(name=name, balance=10_000)
-		session.add(trader)
-		session.commit()
-	
-	trader = session.query(Trader).filter(Trader.name == name).first()
-	llms[name] = LLMTrader(trader, session, profile)
 
-predictor = Predictor()
-news_analyzer = NewsSentimentAnalyzer() 
+def setup():
+	global storage, session, scheduler, predictor, news_analyzer
+	storage = Storage(storage_config)
+	# thread-local session of the pipeline stages, HTTP handlers use Depends(async_storage.session_dependency)
+	session = storage.scoped
+	try:
+		ensure_positions(session)
+		# traders live in the database (POST /traders), the five demo profiles are created on first start
+		seed_traders(session)
+	finally:
+		session.remove()
+	# decision cycles of all traders, every prompt sent concurrently (LLM_CONCURRENCY / LLM_RPM / OPENAI_BASE_URL)
+	# plans reused while the market barely moves (DECISION_CACHE_TTL / _TOLERANCE, DECISION_CACHE_BYPASS=1 to disable)
+	# LLM_STREAM=1 streams the replies and executes each decision as it is parsed, a plan is committed or rolled back whole
+	scheduler = DecisionScheduler(session, llm_client=AsyncLLMClient(), cache=DecisionCache.from_env(),
+	                              stream=os.getenv("LLM_STREAM", "0") == "1")
+	predictor = Predictor()
+	news_analyzer = NewsSentimentAnalyzer()
 
 
-@app.get("/")
-async def root():
-  # return everything in the database
-  people_performance = {}
-  for name, llm in llms.items():
-    trader = session.query(Trader).filter(Trader.name == name).first()
-    people_performance[name] = trader.get_performance_stats(session, predictor.get_current_prices())
-  
-  people_thoughts = {}
-  for name, llm in llms.items():
-    trader = session.query(Trader).filter(Trader.name == name).first()
-    people_thoughts[name] = trader.get_thoughts()
-  
-  
-  data = {
-		"people": profiles,
-		"people_performance": people_performance,
-		"people_thoughts": people_thoughts,
-		"current_prices": predictor.get_current_prices(),
-		"data_and_forecast": predictor.data_and_forcast(),
-	}
-  
-  return data
-
-
-async def update_loop():
-	while True:
-		await asyncio.sleep(60*60)
-		context = generate_context(predictor, news_analyzer)
-		for name, llm in llms.items():
-			llm.run_decision_making(session=session, context=context, market_data=context["current_prices"])
+def context_stage(results):
+	try:
+		return generate_context(predictor, news_analyzer)
+	finally:
+		session.remove()
+
+
+def decisions_stage(results):
+	context = results["context"]
+	try:
+		# computed for every trader at once, each prompt gets its own block
+		risk = portfolio_risk(session, context["current_prices"], predictor.get_close_history())
+		return scheduler.run(context, context["current_prices"], risk)
+	finally:
+		session.remove()
+
+
+# thoughts per trader embedded in the dashboard snapshot
+DASHBOARD_THOUGHTS = 20
+
+
+def dashboard_stage(results):
+	try:
+		current_prices = predictor.get_current_prices()
+		people_performance = {}
+		people_thoughts = {}
+		people_risk = {}
+		risk = portfolio_risk(session, current_prices, predictor.get_close_history())
+		traders = session.query(Trader).order_by(Trader.id).all()
+		for trader in traders:
+			name = trader.name
+			people_risk[name] = risk.get(trader.id)
+			people_performance[name] = trader.get_performance_stats(session, current_prices)
+			# older entries are served page by page by /traders/{name}/thoughts
+			people_thoughts[name] = [thought.to_dict() for thought in trader.get_recent_thoughts(session, DASHBOARD_THOUGHTS)]
 		
+		# serialized once per cycle, every request reuses the same bytes
+		return Snapshot.build({
+			"people": {trader.name: trader.mode for trader in traders},
+			"people_performance": people_performance,
+			"people_thoughts": people_thoughts,
+			"people_risk": people_risk,
+			"current_prices": current_prices,
+			"data_and_forecast": predictor.data_and_forcast(),
+		})
+	finally:
+		session.remove()
+
+
+def equity_stage(results):
+	try:
+		# one row per trader and cycle, the history behind /traders/{name}/equity
+		return record_equity_snapshots(session, predictor.get_current_prices())
+	finally:
+		session.remove()
+
+
+# blocking work (downloads, training, LLM calls) runs in worker threads, handlers only read pipeline.snapshot
+pipeline = UpdatePipeline([
+	Stage("context", context_stage, timeout=45*60),
+	Stage("decisions", decisions_stage, timeout=15*60),
+	Stage("dashboard", dashboard_stage, timeout=10*60),
+	Stage("equity", equity_stage, timeout=5*60, required=False),
+])
+
+
+@app.get("/")
+async def root(request: Request):
+  # served from the last completed update cycle, 304 when the client already has it
+  if "dashboard" not in pipeline.snapshot:
+    raise HTTPException(status_code=503, detail="Dashboard not ready yet", headers={"Retry-After": "30"})
+  return pipeline.snapshot["dashboard"].response(request.headers.get("if-none-match"))
+
+
+class TraderCreate(BaseModel):
+  name: str
+  mode: str = "ideal"
+  balance: float = DEFAULT_BALANCE
+
+
+@app.get("/traders")
+async def traders(db=Depends(async_storage.session_dependency)):
+  return [trader.to_dict() for trader in await repository.list_traders(db)]
+
+
+@app.post("/traders", status_code=201)
+async def create_trader(body: TraderCreate, db=Depends(async_storage.session_dependency)):
+  # picked up by the scheduler on the next decision cycle
+  if body.mode not in MODES:
+    raise HTTPException(status_code=400, detail=f"mode must be one of {list(MODES)}")
+  if body.balance < 0:
+    raise HTTPException(status_code=400, detail="balance must be positive")
+  try:
+    trader = await repository.create_trader(db, body.name, body.mode, body.balance)
+  except ValueError as e:
+    raise HTTPException(status_code=409, detail=str(e))
+  return trader.to_dict()
+
+
+@app.get("/metrics/decisions")
+async def decision_metrics():
+  # per-trader timings of the last completed decision cycle
+  if "decisions" not in pipeline.snapshot:
+    raise HTTPException(status_code=404, detail="No decision cycle completed yet")
+  return pipeline.snapshot["decisions"]
+
+
+@app.get("/traders/{name}")
+async def trader_details(name: str, db=Depends(async_storage.session_dependency)):
+  # live read of the ledger, unlike "/" which serves the last update cycle
+  trader = await repository.get_trader_by_name(db, name)
+  if trader is None:
+    raise HTTPException(status_code=404, detail=f"Unknown trader {name}")
+  positions = await repository.get_positions(db, trader.id, open_only=True)
+  transactions = await repository.get_recent_transactions(db, trader.id)
+  thoughts = await repository.get_recent_thoughts(db, trader.id)
+  return {
+    "name": trader.name,
+    "balance": trader.balance,
+    "positions": [position.to_dict() for position in positions],
+    "transactions": [transaction.to_dict() for transaction in transactions],
+    "thoughts": [thought.to_dict() for thought in thoughts],
+  }
+
+
+async def history_page(db, name: str, page, limit: int, cursor: str, stock: str, action: str, since: datetime, until: datetime):
+  trader = await repository.get_trader_by_name(db, name)
+  if trader is None:
+    raise HTTPException(status_code=404, detail=f"Unknown trader {name}")
+  try:
+    items, next_cursor = await page(db, trader.id, limit=limit, cursor=cursor, stock=stock, action=action, since=since, until=until)
+  except ValueError as e:
+    raise HTTPException(status_code=400, detail=str(e))
+  return {"items": [item.to_dict() for item in items], "next_cursor": next_cursor}
+
+
+@app.get("/traders/{name}/thoughts")
+async def trader_thoughts(name: str, limit: int = Query(50, ge=1, le=500), cursor: str = None, stock: str = None,
+                          action: str = None, since: datetime = None, until: datetime = None,
+                          db=Depends(async_storage.session_dependency)):
+  # newest first, pass back `next_cursor` to get the following page
+  return await history_page(db, name, repository.page_thoughts, limit, cursor, stock, action, since, until)
+
+
+@app.get("/traders/{name}/transactions")
+async def trader_transactions(name: str, limit: int = Query(50, ge=1, le=500), cursor: str = None, stock: str = None,
+                              action: str = None, since: datetime = None, until: datetime = None,
+                              db=Depends(async_storage.session_dependency)):
+  return await history_page(db, name, repository.page_transactions, limit, cursor, stock, action, since, until)
+
+
+@app.get("/traders/{name}/equity")
+async def trader_equity(name: str, since: datetime = None, until: datetime = None,
+                        points: int = Query(500, ge=3, le=5000), method: str = "lttb",
+                        db=Depends(async_storage.session_dependency)):
+  # equity curve downsampled to about `points` points ("lttb" or "minmax" buckets), timestamps in epoch ms
+  if method not in DOWNSAMPLING_METHODS:
+    raise HTTPException(status_code=400, detail=f"method must be one of {DOWNSAMPLING_METHODS}")
+  trader = await repository.get_trader_by_name(db, name)
+  if trader is None:
+    raise HTTPException(status_code=404, detail=f"Unknown trader {name}")
+  timestamps, equity = await repository.get_equity_curve(db, trader.id, since, until)
+  sampled_timestamps, sampled_equity = downsample(timestamps, equity, points, method)
+  return {
+    "timestamps": sampled_timestamps.tolist(),
+    "total_equity": sampled_equity.tolist(),
+    "method": method,
+    "raw_points": len(timestamps),
+  }
+
 
 @app.on_event("startup")
 async def startup_event():
-	asyncio.create_task(update_loop())
+	# database, traders and the bars of every symbol: blocking, kept off the event loop
+	await asyncio.to_thread(setup)
+	# the handlers' engine checks the schema itself instead of relying on the sync Storage having created it
+	await async_storage.init_schema()
+	asyncio.create_task(pipeline.run_forever(60*60, initial_stages=["dashboard"]))
 	logging.info("Application startup complete")
 
 @app.on_event("shutdown")
 async def shutdown_event():
+  pipeline.shutdown()
+  await async_storage.dispose()
+  storage.dispose()
+  scheduler.cache.close()
   logging.info("Application shutdown complete")
 
 
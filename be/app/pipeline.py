@@ -0,0 +1,98 @@
+import time
+import asyncio
+import logging
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, List
+from concurrent.futures import ThreadPoolExecutor
+
+
+@dataclass
+class Stage:
+    """
+    One step of the update cycle.
+
+    `fn` receives the results of the previous stages of the cycle (by stage name)
+    and runs in a worker thread, so it may block. A stage that raises or exceeds
+    `timeout` seconds aborts the rest of the cycle when `required`, otherwise
+    its result is simply missing.
+    """
+    name: str
+    fn: Callable[[Dict[str, Any]], Any]
+    timeout: float
+    required: bool = True
+
+
+class UpdatePipeline:
+    """
+    Background update cycle that keeps the FastAPI event loop free.
+
+    Stages run one after another in a thread pool, each bounded by its timeout.
+    Only a cycle that completes publishes its results: HTTP handlers read
+    `snapshot` (the results of the last completed cycle) and never wait on a
+    running one.
+
+    Note that a timed out stage cannot be killed: its thread keeps running in
+    the background, the cycle just stops waiting for it.
+    """
+
+    def __init__(self, stages: List[Stage], max_workers: int = 4):
+        self.stages = stages
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="pipeline")
+        self.logger = logging.getLogger(__name__)
+        self.snapshot: Dict[str, Any] = {}
+        self.snapshot_time = None
+        self.last_cycle: Dict[str, Any] = {}
+        self._lock = asyncio.Lock()
+
+    async def run_stage(self, stage: Stage, results: Dict[str, Any]):
+        loop = asyncio.get_running_loop()
+        return await asyncio.wait_for(loop.run_in_executor(self.executor, stage.fn, results), timeout=stage.timeout)
+
+    async def run_cycle(self, stages: List[str] = None) -> bool:
+        """
+        Run the stages named in `stages` (all of them by default) and publish their
+        results on top of the current snapshot. Returns False if a required stage failed.
+        Cycles never overlap, a second call waits for the running one.
+        """
+        async with self._lock:
+            results = dict(self.snapshot)
+            report = {"started": time.time(), "stages": {}}
+            self.last_cycle = report
+            ok = True
+            for stage in self.stages:
+                if stages is not None and stage.name not in stages:
+                    continue
+                start = time.perf_counter()
+                try:
+                    results[stage.name] = await self.run_stage(stage, results)
+                    status = "ok"
+                except asyncio.TimeoutError:
+                    status = "timeout"
+                    self.logger.error(f"Pipeline stage {stage.name} timed out after {stage.timeout}s")
+                except Exception as e:
+                    status = "error"
+                    self.logger.exception(f"Pipeline stage {stage.name} failed: {e}")
+                report["stages"][stage.name] = {"status": status, "duration": time.perf_counter() - start}
+                if status != "ok" and stage.required:
+                    ok = False
+                    break
+            report["finished"] = time.time()
+            if ok:
+                self.snapshot = results
+                self.snapshot_time = report["finished"]
+            self.logger.info(f"Pipeline cycle {'completed' if ok else 'aborted'}: {report['stages']}")
+            return ok
+
+    async def run_forever(self, interval: float, initial_stages: List[str] = None):
+        """
+        Run `initial_stages` right away (so handlers have a snapshot to serve),
+        then a full cycle every `interval` seconds.
+        """
+        if initial_stages:
+            await self.run_cycle(initial_stages)
+        while True:
+            await asyncio.sleep(interval)
+            await self.run_cycle()
+
+    def shutdown(self):
+        self.executor.shutdown(wait=False, cancel_futures=True)
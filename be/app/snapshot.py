@@ -0,0 +1,44 @@
+import json
+import time
+import hashlib
+from dataclasses import dataclass, field
+from typing import Any, Dict
+
+from fastapi import Response
+from fastapi.encoders import jsonable_encoder
+
+
+@dataclass(frozen=True)
+class Snapshot:
+    """
+    A payload serialized once, ready to be served as is.
+    `etag` is a strong validator derived from the body, so identical
+    dashboards built by different cycles share the same tag.
+    """
+    body: bytes
+    etag: str
+    created: float = field(default_factory=time.time)
+
+    @classmethod
+    def build(cls, payload: Dict[str, Any]) -> "Snapshot":
+        body = json.dumps(jsonable_encoder(payload), separators=(",", ":")).encode("utf-8")
+        return cls(body=body, etag=f'"{hashlib.sha1(body).hexdigest()}"')
+
+    def matches(self, if_none_match: str) -> bool:
+        if not if_none_match:
+            return False
+        if if_none_match.strip() == "*":
+            return True
+        tags = [tag.strip().removeprefix("W/") for tag in if_none_match.split(",")]
+        return self.etag in tags
+
+    def response(self, if_none_match: str = None) -> Response:
+        """
+        Return the serialized body, or an empty 304 when the client already
+        holds this version (`If-None-Match`).
+        """
+        # no-cache: clients may store the body but must revalidate it on every poll
+        headers = {"ETag": self.etag, "Cache-Control": "no-cache"}
+        if self.matches(if_none_match):
+            return Response(status_code=304, headers=headers)
+        return Response(content=self.body, media_type="application/json", headers=headers)
@@ -0,0 +1,180 @@
+import os
+import re
+import time
+import datetime as dt
+import numpy as np
+import pandas as pd
+import yfinance as yf
+
+BAR_COLUMNS = ['Open', 'High', 'Low', 'Close', 'Volume']
+BAR_DTYPE = np.dtype([('ts', '<i8')] + [(column, '<f8') for column in BAR_COLUMNS])
+
+# Seconds between two provider calls for the same symbol/interval.
+REFRESH_CST = 5*60
+
+_PERIOD_UNITS = {'d': 1, 'wk': 7, 'mo': 31, 'y': 366}
+
+
+def period_to_timedelta(period: str) -> dt.timedelta:
+    """
+    Convert a yfinance period string ("60d", "6mo", "2y", ...) into a timedelta.
+    "max" (or anything unparsable) maps to an unbounded lookback.
+    """
+    match = re.fullmatch(r'(\d+)(d|wk|mo|y)', period or '')
+    if match is None:
+        return dt.timedelta.max
+    return dt.timedelta(days=int(match.group(1)) * _PERIOD_UNITS[match.group(2)])
+
+
+def _normalize_bars(data: pd.DataFrame) -> pd.DataFrame:
+    """Flatten yfinance columns, keep OHLCV only and index the frame in UTC."""
+    if isinstance(data.columns, pd.MultiIndex):
+        data = data.copy()
+        data.columns = data.columns.droplevel(1)
+    data = data[BAR_COLUMNS].dropna()
+    index = pd.DatetimeIndex(data.index)
+    index = index.tz_localize('UTC') if index.tz is None else index.tz_convert('UTC')
+    data = data.set_axis(index)
+    return data[~data.index.duplicated(keep='last')].sort_index()
+
+
+class BarProvider:
+    """
+    Source of OHLCV bars used to fill a `BarStore`.
+    Subclasses return a DataFrame indexed by timestamp with (at least) the
+    Open/High/Low/Close/Volume columns.
+    """
+
+    def fetch(self, symbol: str, interval: str, start: dt.datetime = None, period: str = None) -> pd.DataFrame:
+        """
+        Fetch bars for `symbol` at `interval`, either from `start` onwards
+        (delta fetch) or for the whole `period` (initial fetch).
+        """
+        raise NotImplementedError
+
+
+class YFinanceProvider(BarProvider):
+    """Fetch bars from Yahoo Finance through yfinance."""
+
+    def fetch(self, symbol, interval, start=None, period=None):
+        if start is not None:
+            return yf.download(symbol, start=start, interval=interval, progress=False)
+        return yf.download(symbol, period=period, interval=interval, progress=False)
+
+
+class CSVProvider(BarProvider):
+    """
+    Serve bars from local CSV files named `<root>/<SYMBOL>_<interval>.csv`,
+    in the format written by `yf.download(...).to_csv()`.
+    Handy as a fixture provider for tests and offline runs.
+    """
+
+    def __init__(self, root: str):
+        self.root = root
+
+    def fetch(self, symbol, interval, start=None, period=None):
+        data = pd.read_csv(os.path.join(self.root, f'{symbol}_{interval}.csv'), header=[0, 1], index_col=0)
+        data.index = pd.to_datetime(data.index, utc=True)
+        data = _normalize_bars(data)
+        if start is not None:
+            return data[data.index >= pd.Timestamp(start)]
+        return data
+
+
+class BarStore:
+    """
+    Persistent local OHLCV store, one memory-mapped NumPy file per symbol/interval
+    (`<root>/<SYMBOL>/<interval>.npy`). Reads come from disk; the provider is only
+    asked for the bars after the last stored one, at most every `refresh_interval` seconds.
+    """
+
+    def __init__(self, root: str = 'data/bars', provider: BarProvider = None, refresh_interval: float = REFRESH_CST):
+        self.root = root
+        self.provider = provider if provider is not None else YFinanceProvider()
+        self.refresh_interval = refresh_interval
+        self._last_refresh = {}
+
+    def _path(self, symbol: str, interval: str) -> str:
+        return os.path.join(self.root, symbol, f'{interval}.npy')
+
+    def _read(self, symbol: str, interval: str):
+        path = self._path(symbol, interval)
+        if not os.path.exists(path):
+            return None
+        return np.load(path, mmap_mode='r')
+
+    def _write(self, symbol: str, interval: str, bars: np.ndarray):
+        path = self._path(symbol, interval)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        # write then rename so concurrent readers never see a half written file
+        tmp_path = f'{path}.{os.getpid()}.tmp'
+        with open(tmp_path, 'wb') as file:
+            np.save(file, bars)
+        os.replace(tmp_path, path)
+
+    @staticmethod
+    def _to_records(data: pd.DataFrame) -> np.ndarray:
+        bars = np.empty(len(data), dtype=BAR_DTYPE)
+        bars['ts'] = data.index.as_unit('ns').asi8
+        for column in BAR_COLUMNS:
+            bars[column] = data[column].to_numpy(dtype=np.float64)
+        return bars
+
+    @staticmethod
+    def _to_frame(bars: np.ndarray) -> pd.DataFrame:
+        index = pd.to_datetime(np.asarray(bars['ts']), utc=True)
+        return pd.DataFrame({column: np.asarray(bars[column]) for column in BAR_COLUMNS}, index=index)
+
+    def refresh(self, symbol: str, interval: str, period: str = '2y', force: bool = False):
+        """
+        Bring the stored bars of `symbol`/`interval` up to date.
+        Only the tail since the last stored bar is fetched (that bar included,
+        as it may have been stored while still forming). Falls back to a full
+        `period` fetch when nothing is stored or the store is older than `period`.
+        """
+        key = (symbol, interval)
+        now = time.time()
+        if not force and now - self._last_refresh.get(key, 0) < self.refresh_interval:
+            return
+        stored = self._read(symbol, interval)
+        start = None
+        if stored is not None and len(stored):
+            last_bar = pd.Timestamp(int(stored['ts'][-1]), tz='UTC')
+            if pd.Timestamp.now(tz='UTC') - last_bar < period_to_timedelta(period):
+                start = last_bar.to_pydatetime()
+
+        fetched = self.provider.fetch(symbol, interval, start=start, period=period)
+        self._last_refresh[key] = now
+        if fetched is None or fetched.empty:
+            return
+        fetched = self._to_records(_normalize_bars(fetched))
+        if start is not None:
+            kept = np.array(stored[stored['ts'] < fetched['ts'][0]])
+            fetched = np.concatenate([kept, fetched])
+        # release the memory map before replacing the file (required on Windows)
+        del stored
+        self._write(symbol, interval, fetched)
+
+    def get_bars(self, symbol: str, interval: str, period: str = '2y', refresh: bool = True) -> pd.DataFrame:
+        """
+        Return the stored bars of `symbol`/`interval` covering the last `period`
+        as a DataFrame with Open/High/Low/Close/Volume columns.
+        """
+        if refresh:
+            self.refresh(symbol, interval, period)
+        bars = self._read(symbol, interval)
+        if bars is None:
+            return pd.DataFrame(columns=BAR_COLUMNS, index=pd.DatetimeIndex([], tz='UTC'))
+        lookback = period_to_timedelta(period)
+        if lookback != dt.timedelta.max and len(bars):
+            cutoff = int(bars['ts'][-1]) - int(lookback.total_seconds() * 1e9)
+            bars = bars[np.searchsorted(bars['ts'], cutoff):]
+        return self._to_frame(bars)
+
+    def get_last_close(self, symbol: str, interval: str = '1h', period: str = '2y') -> float:
+        """Return the most recent close of `symbol`, refreshing the tail first."""
+        self.refresh(symbol, interval, period)
+        bars = self._read(symbol, interval)
+        if bars is None or not len(bars):
+            raise ValueError(f"No bars stored for {symbol} ({interval}).")
+        return float(bars['Close'][-1])
@@ -0,0 +1,86 @@
+import numpy as np
+
+
+def keras_step(model, compiled: bool = True):
+    """
+    Return a function mapping a batch of windows (batch, window_size, n_features)
+    to the next scaled close (batch, 1).
+
+    With `compiled` the model is called directly inside a `tf.function`
+    (traced once per model and input shape) instead of going through
+    `model.predict`, whose per-call setup dominates batch-of-one inference.
+    """
+    if not compiled:
+        return lambda X: model.predict(X, verbose=0)
+    step = getattr(model, '_forecast_step', None)
+    if step is None:
+        import tensorflow as tf
+        step = tf.function(lambda X: model(X, training=False), reduce_retracing=True)
+        # kept on the model so the ModelRegistry cache also caches the traced graph
+        model._forecast_step = step
+    return lambda X: step(X.astype(np.float32)).numpy()
+
+
+def sklearn_step(model):
+    """Same as `keras_step` for sklearn regressors trained on flattened windows."""
+    return lambda X: model.predict(X.reshape(X.shape[0], -1)).reshape(-1, 1)
+
+
+def recursive_rollout(step, X: np.ndarray, n_instances: int, close_index: int = 0) -> np.ndarray:
+    """
+    Forecast `n_instances` steps ahead by feeding each prediction back into the window.
+
+    All windows of the batch are rolled out together, one `step` call per horizon
+    step whatever the batch size. The predicted close replaces feature
+    `close_index` of a copy of the last timestep, other features are carried over.
+
+    Args:
+        step (callable): batch of windows -> (batch, 1) predictions
+        X (np.ndarray): scaled windows of shape (batch, window_size, n_features)
+        n_instances (int): number of steps to forecast
+        close_index (int): position of the close in the feature axis
+
+    Returns:
+        np.ndarray: scaled forecasts of shape (batch, n_instances)
+    """
+    X = np.array(X, dtype=np.float64)
+    forecast = np.empty((X.shape[0], n_instances))
+    for i in range(n_instances):
+        y_pred = np.asarray(step(X)).reshape(-1)
+        forecast[:, i] = y_pred
+        next_row = X[:, -1:, :].copy()
+        next_row[:, 0, close_index] = y_pred
+        X = np.concatenate((X[:, 1:, :], next_row), axis=1)
+    return forecast
+
+
+def direct_rollout(step, X: np.ndarray, n_instances: int, close_index: int = 0) -> np.ndarray:
+    """
+    Forecast `n_instances` steps with a multi-horizon model, whose `step` emits `horizon` steps per pass.
+
+    Up to `horizon` steps come out of a single pass. Longer forecasts continue
+    recursively, one pass per `horizon` steps: the predicted closes are appended
+    to the window (as in `recursive_rollout`) and the window slides forward by as many rows.
+
+    Args:
+        step (callable): batch of windows -> (batch, horizon) predictions
+        X (np.ndarray): scaled windows of shape (batch, window_size, n_features)
+        n_instances (int): number of steps to forecast
+        close_index (int): position of the close in the feature axis
+
+    Returns:
+        np.ndarray: scaled forecasts of whole passes, shape (batch, passes * horizon) with
+            passes * horizon >= n_instances (trim after inverse scaling the horizon columns)
+    """
+    X = np.array(X, dtype=np.float64)
+    window_size = X.shape[1]
+    passes = []
+    produced = 0
+    while produced < n_instances:
+        y_pred = np.asarray(step(X)).reshape(X.shape[0], -1)
+        passes.append(y_pred)
+        produced += y_pred.shape[1]
+        next_rows = np.repeat(X[:, -1:, :], y_pred.shape[1], axis=1)
+        next_rows[:, :, close_index] = y_pred
+        X = np.concatenate((X, next_rows), axis=1)[:, -window_size:, :]
+    return np.concatenate(passes, axis=1)
@@ -0,0 +1,126 @@
+import os
+import json
+import time
+import pickle
+import threading
+
+from .preprocessing import WindowPreprocessor
+
+
+def _load_keras(path: str):
+    # imported lazily so the registry can be used without TensorFlow for sklearn models
+    import tensorflow as tf
+    return tf.keras.models.load_model(path)
+
+
+def _load_pickle(path: str):
+    with open(path, 'rb') as file:
+        return pickle.load(file)
+
+
+class ModelRegistry:
+    """
+    In-process cache of deserialized models, keyed by (symbol, interval, model kind, period).
+
+    An entry stays valid as long as the `creation_date` recorded for the model in
+    `models/<SYMBOL>/models_manager_<period>_<interval>.json` does not change
+    (the file modification time is used for models missing from the manifest).
+    Manifests themselves are only re-read when their mtime changes.
+    """
+
+    def __init__(self, root: str = 'models'):
+        self.root = root
+        self._entries = {}
+        self._manifests = {}
+        self._lock = threading.RLock()
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+        self.load_time = 0.0
+
+    def model_path(self, symbol: str, interval: str, kind: str, period: str) -> str:
+        extension = 'pkl' if kind.startswith('MLP') else 'h5'
+        return os.path.join(self.root, symbol, f'{kind}_{period}_{interval}.{extension}')
+
+    def preprocessing_path(self, symbol: str, interval: str, kind: str, period: str) -> str:
+        return os.path.join(self.root, symbol, f'preprocessing_{kind}_{period}_{interval}.pkl')
+
+    def _manifest(self, symbol: str, interval: str, period: str) -> dict:
+        path = os.path.join(self.root, symbol, f'models_manager_{period}_{interval}.json')
+        try:
+            mtime = os.path.getmtime(path)
+        except OSError:
+            return {}
+        cached = self._manifests.get(path)
+        if cached is not None and cached[0] == mtime:
+            return cached[1]
+        try:
+            with open(path, 'r') as file:
+                data = json.load(file)
+        except (OSError, ValueError):
+            # manifest being rewritten, keep serving the previous version
+            return cached[1] if cached is not None else {}
+        self._manifests[path] = (mtime, data)
+        return data
+
+    def version(self, symbol: str, interval: str, kind: str, period: str):
+        """Return the `creation_date` of a model, or None if it has never been trained."""
+        entry = self._manifest(symbol, interval, period).get(f'{kind}_{period}_{interval}')
+        if entry is not None:
+            return entry['creation_date']
+        path = self.model_path(symbol, interval, kind, period)
+        return os.path.getmtime(path) if os.path.exists(path) else None
+
+    def _get(self, key: tuple, path: str, version, loader):
+        with self._lock:
+            cached = self._entries.get(key)
+            if cached is not None:
+                if cached[0] == version:
+                    self.hits += 1
+                    return cached[1]
+                self.invalidations += 1
+            self.misses += 1
+            start = time.perf_counter()
+            value = loader(path)
+            self.load_time += time.perf_counter() - start
+            self._entries[key] = (version, value)
+            return value
+
+    def get(self, symbol: str, interval: str, kind: str, period: str):
+        """
+        Return the deserialized model `kind` ("LSTM_univariate", "MLP_univariate", ...)
+        of `symbol`, loading it from disk only on first use or after a retrain.
+        """
+        path = self.model_path(symbol, interval, kind, period)
+        loader = _load_pickle if path.endswith('.pkl') else _load_keras
+        version = self.version(symbol, interval, kind, period)
+        return self._get((symbol, interval, kind, period), path, version, loader)
+
+    def put(self, symbol: str, interval: str, kind: str, period: str, model, version):
+        """Serve `model` as version `version` (the `creation_date` of its manifest entry), e.g. once fine-tuned."""
+        with self._lock:
+            self._entries[(symbol, interval, kind, period)] = (version, model)
+
+    def get_preprocessing(self, symbol: str, interval: str, kind: str, period: str) -> WindowPreprocessor:
+        """Return the fitted WindowPreprocessor saved with a model, cached like the model."""
+        path = self.preprocessing_path(symbol, interval, kind, period)
+        version = (self.version(symbol, interval, kind, period), os.path.getmtime(path))
+        return self._get((symbol, interval, f'preprocessing_{kind}', period), path, version, WindowPreprocessor.load)
+
+    def invalidate(self, symbol: str = None, interval: str = None):
+        """Drop cached entries, for one symbol (and interval) or all of them."""
+        with self._lock:
+            for key in list(self._entries):
+                if (symbol is None or key[0] == symbol) and (interval is None or key[1] == interval):
+                    del self._entries[key]
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'invalidations': self.invalidations,
+            'hit_rate': self.hits / lookups if lookups else 0.0,
+            'load_time': self.load_time,
+            'cached': len(self._entries),
+        }
@@ -1,22 +1,51 @@
+import pandas as pd
+
 from .stock_predictor import StockPredictor
+from .bar_store import BarStore
+from .model_registry import ModelRegistry
+from .training_scheduler import TrainingScheduler, TrainingJob, default_workers
 
 
 class Constants:
     DAY= "1d"
     HOUR= "1h"
 class Predictor:
-    def __init__(self,interval="1h",period="2y",stocks=['AMZN', 'MSFT', 'TSLA', 'NVDA']):
+    def __init__(self,interval="1h",period="2y",stocks=['AMZN', 'MSFT', 'TSLA', 'NVDA'],bar_store:BarStore=None,direct_horizon:int=None):
         self.stocks = stocks
+        self.bar_store = bar_store if bar_store is not None else BarStore()
+        # shared by every StockPredictor so each model is deserialized once per process
+        self.model_registry = ModelRegistry()
         self.predictors = {}
         for stock in stocks:
             self.predictors[stock] = {}
-            self.predictors[stock][Constants.HOUR] = StockPredictor(stock_name=stock,interval=Constants.HOUR,period=period)
-            self.predictors[stock][Constants.DAY] = StockPredictor(stock_name=stock,interval=Constants.DAY,period=period)
+            self.predictors[stock][Constants.HOUR] = StockPredictor(stock_name=stock,interval=Constants.HOUR,period=period,bar_store=self.bar_store,model_registry=self.model_registry,direct_horizon=direct_horizon)
+            self.predictors[stock][Constants.DAY] = StockPredictor(stock_name=stock,interval=Constants.DAY,period=period,bar_store=self.bar_store,model_registry=self.model_registry,direct_horizon=direct_horizon)
         
-    def train(self, force=False):
-        for stock in self.predictors.values():
-            stock[Constants.HOUR].train(force)
-            stock[Constants.DAY].train(force)
+    def train(self, force=False, workers:int=None):
+        """
+        Train the expired (or all, with `force`) models of every stock and interval.
+        With more than one worker (`workers`, or the TRAINING_WORKERS environment variable)
+        the jobs run on a TrainingScheduler process pool, otherwise, by default, one after
+        another in this process.
+        Returns the per-job reports of the scheduler (empty when run serially).
+        """
+        workers = workers or default_workers()
+        if workers <= 1:
+            for stock in self.predictors.values():
+                stock[Constants.HOUR].train(force)
+                stock[Constants.DAY].train(force)
+            return []
+        
+        to_train = [predictor for stock in self.predictors.values() for predictor in stock.values()
+                    if force or predictor.model_expiry()]
+        # make sure workers start from up to date bars, they do not fetch themselves
+        for predictor in to_train:
+            predictor.data = predictor.get_stock_data()
+        jobs = [TrainingJob(stock_name=predictor.stock_name, interval=predictor.interval, period=predictor.period,
+                            window_size=predictor.window_size, direct_horizon=predictor.direct_horizon,
+                            bar_root=self.bar_store.root, force=force)
+                for predictor in to_train]
+        return TrainingScheduler(max_workers=workers).run(jobs)
     
     def forecast(self,n_instances_hour:int=24, n_instances_day:int=7):
         forecast = {}
@@ -34,6 +63,12 @@ class Predictor:
             prices[stock[Constants.HOUR].stock_name] = stock[Constants.HOUR].get_current_price()
         return prices
     
+    def get_close_history(self, interval: str = Constants.DAY, period: str = "1y"):
+        """Close prices of every stock as one DataFrame (time x symbol), read from the bar store without fetching."""
+        return pd.DataFrame({
+            stock: self.bar_store.get_bars(stock, interval, period, refresh=False)["Close"] for stock in self.stocks
+        })
+    
     def format_forcast(self, forecast, n_instances_hour:int=24, n_instances_day:int=7):
         """
         Format the forecast into a readable string
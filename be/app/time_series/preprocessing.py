@@ -0,0 +1,62 @@
+import os
+import pickle
+import numpy as np
+from sklearn.preprocessing import MinMaxScaler
+
+
+class WindowPreprocessor:
+    """
+    Fitted preprocessing of one model: the input/target scalers and the window
+    configuration they were fitted with. Saved next to the model at train time
+    and loaded at forecast time, so inference reuses the training scaling and
+    only has to look at the last `window_size` rows.
+    """
+
+    def __init__(self, window_size: int, features: list, target: str = 'Close'):
+        self.window_size = window_size
+        self.features = list(features)
+        self.target = target
+        self.x_scaler = MinMaxScaler()
+        self.y_scaler = MinMaxScaler()
+
+    def fit_transform(self, X: np.ndarray, y: np.ndarray):
+        """
+        Fit the scalers on windowed data and return it scaled.
+
+        Args:
+            X (np.ndarray): windows of shape (n_windows, window_size, n_features)
+            y (np.ndarray): targets of shape (n_windows, horizon)
+
+        Returns:
+            tuple: scaled X (same shape) and scaled y
+        """
+        X_scaled = self.x_scaler.fit_transform(X.reshape(X.shape[0], -1)).reshape(X.shape)
+        y_scaled = self.y_scaler.fit_transform(y)
+        return X_scaled, y_scaled
+
+    def transform(self, X: np.ndarray, y: np.ndarray):
+        """Scale windows and targets with the already fitted scalers."""
+        X_scaled = self.x_scaler.transform(X.reshape(X.shape[0], -1)).reshape(X.shape)
+        return X_scaled, self.y_scaler.transform(y)
+
+    def last_window(self, data) -> np.ndarray:
+        """Return the last `window_size` rows of the model features of `data` (a DataFrame)."""
+        return data[self.features].to_numpy()[-self.window_size:]
+
+    def transform_window(self, window: np.ndarray) -> np.ndarray:
+        """Scale a single (window_size, n_features) window."""
+        return self.x_scaler.transform(window.reshape(1, -1)).reshape(window.shape)
+
+    def inverse_transform_y(self, y: np.ndarray) -> np.ndarray:
+        """Map scaled targets back to prices, returns shape (n, 1)."""
+        return self.y_scaler.inverse_transform(np.asarray(y).reshape(-1, self.y_scaler.n_features_in_))
+
+    def save(self, path: str):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, 'wb') as file:
+            pickle.dump(self, file)
+
+    @classmethod
+    def load(cls, path: str) -> 'WindowPreprocessor':
+        with open(path, 'rb') as file:
+            return pickle.load(file)
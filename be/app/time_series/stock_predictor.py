@@ -1,61 +1,71 @@
-import yfinance as yf
 import numpy as np
 from tensorflow.keras.models import Sequential
 from tensorflow.keras.layers import LSTM, Dense, Dropout,SimpleRNN,BatchNormalization,GRU
 from tensorflow.keras.optimizers import Adam
 import datetime as dt
 import tensorflow as tf
-from sklearn.preprocessing import MinMaxScaler
 from sklearn.neural_network import MLPRegressor
 import pickle
 import os
+import copy
 import json
+import logging
 import warnings
+from .bar_store import BarStore
+from .windowing import window_univariate, window_multivariate
+from .preprocessing import WindowPreprocessor
+from .model_registry import ModelRegistry
+from .forecasting import keras_step, sklearn_step, recursive_rollout, direct_rollout
 
 warnings.filterwarnings("ignore")
+logger = logging.getLogger(__name__)
 EXPIRY_CST = 12*60*60
+# full retrain at least this often, fine-tune on the new bars in between
+FULL_RETRAIN_CST = 7*24*60*60
+FINE_TUNE_EPOCHS = 5
+FINE_TUNE_LEARNING_RATE = 0.001
+# fall back to a full retrain when the error on the new bars exceeds this multiple of the training validation error
+DRIFT_THRESHOLD = 3.0
+VALIDATION_RATIO = 0.1
+UNIVARIATE_FEATURES = ['Close']
+MULTIVARIATE_FEATURES = ['Close', 'High', 'Low', 'Volume']
+MODEL_FEATURES = {
+    'LSTM_univariate': UNIVARIATE_FEATURES,
+    'LSTM_multivariate': MULTIVARIATE_FEATURES,
+    'LSTM_direct': UNIVARIATE_FEATURES,
+    'MLP_univariate': UNIVARIATE_FEATURES,
+}
 
 
 class StockPredictor:
-    def __init__(self,stock_name='AAPL',interval="1h",period="1y",split_ratio=1,window_size=6):
+    def __init__(self,stock_name='AAPL',interval="1h",period="1y",split_ratio=1,window_size=6,bar_store:BarStore=None,model_registry:ModelRegistry=None,direct_horizon:int=None):
         self.stock_name = stock_name
         self.split_ratio = split_ratio
         self.period = period
         self.interval = interval
         self.window_size = window_size
-        self.data = yf.download(self.stock_name, period=self.period,interval=self.interval)
-        self.data = self.data.dropna()
-        self.data.columns = self.data.columns.droplevel(1) 
+        # when set, also train an LSTM head that emits `direct_horizon` steps in one pass
+        self.direct_horizon = direct_horizon
+        # call Keras models through a traced tf.function instead of model.predict
+        self.compiled_predict = True
+        self.bar_store = bar_store if bar_store is not None else BarStore()
+        self.model_registry = model_registry if model_registry is not None else ModelRegistry()
+        self.data = self.get_stock_data()
         self.cache = None
     
     def get_stock_data(self):
-        stock_data = yf.download(self.stock_name, period=self.period,interval=self.interval)
-        stock_data = stock_data.dropna()
-        stock_data.columns = stock_data.columns.droplevel(1) 
-        return stock_data
+        # served from the local bar store, only the missing tail is fetched
+        return self.bar_store.get_bars(self.stock_name, self.interval, self.period)
     
-    def window_data_univariate(self,data, window_size):
-        X = []
-        y = []
-        
-        for i in range(len(data) - window_size - 1):
-            X.append(data[i:(i + window_size)])
-            y.append(data[i + window_size])
-        return np.array(X), np.array(y).reshape(-1, 1)
+    def window_data_univariate(self,data, window_size, horizon=1):
+        # strided views over `data`, see windowing.py
+        return window_univariate(data, window_size, horizon)
     
-    def window_data_multivariate(self,data,close_data, window_size):
-        X = []
-        y = []
-        
-        for i in range(len(data) - window_size - 1):
-            # Window includes all features
-            X.append(data[i:(i + window_size), :])
-            # Target is next day's closing price
-            y.append(close_data[i + window_size])  # Closing price is first column
-            
-        return np.array(X), np.array(y).reshape(-1, 1)
+    def window_data_multivariate(self,data,close_data, window_size, horizon=1):
+        # Window includes all features, target is the next closing price(s)
+        return window_multivariate(data, close_data, window_size, horizon)
     
-    def build_lstm_model(self,X_train):
+    def build_lstm_model(self,X_train,horizon=1):
         model = Sequential([
             LSTM(units=128, 
             return_sequences=True, 
@@ -66,7 +76,7 @@ class StockPredictor:
         Dropout(0.2),
         
         Dense(32, activation='relu'),
-        Dense(1)
+        Dense(horizon)
         ])
         optimizer = Adam(learning_rate=0.01)
         model.compile(optimizer=optimizer, loss='mean_squared_error')
@@ -77,19 +87,39 @@ class StockPredictor:
         return model_mlp
     
     def get_current_price(self):
-        stock_data = yf.download(self.stock_name, period='2y',interval='1h')
-        return stock_data['Close'].to_numpy()[-1][0]
+        return self.bar_store.get_last_close(self.stock_name, '1h', '2y')
     
-    def train_lstm_univariate(self):
-        scaler = MinMaxScaler()
+    def preprocessing_path(self, model_name:str):
+        return self.model_registry.preprocessing_path(self.stock_name, self.interval, model_name, self.period)
+    
+    def load_model(self, model_name:str):
+        # deserialized once, then served from the registry until the next retrain
+        return self.model_registry.get(self.stock_name, self.interval, model_name, self.period)
+    
+    def fit_preprocessing(self, features:list, horizon:int=1):
+        """
+        Window the stored bars on `features` and fit a fresh WindowPreprocessor
+        (separate scalers for X and y) on them.
+        Returns the preprocessor with the scaled windows and targets.
+        """
+        data = self.data[features]
         data_close = self.data['Close']
-        df_windowed,df_target = self.window_data_univariate(data_close.to_numpy().reshape(-1,1),self.window_size)
-        df_windowed_reshaped = df_windowed.reshape(df_windowed.shape[0], -1)
-        x_scaler = scaler.fit(df_windowed_reshaped)
-        df_windowed_reshaped = x_scaler.transform(df_windowed_reshaped)
-        df_windowed = df_windowed_reshaped.reshape(df_windowed.shape[0], df_windowed.shape[1], df_windowed.shape[2])
-        y_scaler = scaler.fit(df_target)
-        df_target = y_scaler.transform(df_target)
+        df_windowed,df_target = self.window_data_multivariate(data.to_numpy(),data_close.to_numpy(),self.window_size,horizon)
+        preprocessor = WindowPreprocessor(self.window_size, features)
+        df_windowed,df_target = preprocessor.fit_transform(df_windowed,df_target)
+        return preprocessor,df_windowed,df_target
+    
+    def load_preprocessing(self, model_name:str, features:list):
+        path = self.preprocessing_path(model_name)
+        if os.path.exists(path):
+            return self.model_registry.get_preprocessing(self.stock_name, self.interval, model_name, self.period)
+        # models trained before the artifact existed: fit it once from history and keep it
+        preprocessor,_,_ = self.fit_preprocessing(features)
+        preprocessor.save(path)
+        return preprocessor
+    
+    def train_lstm_univariate(self):
+        preprocessor,df_windowed,df_target = self.fit_preprocessing(UNIVARIATE_FEATURES)
         train_size = int(self.split_ratio*len(df_windowed))
         X_train = df_windowed[:train_size]
         y_train = df_target[:train_size]
@@ -101,18 +131,10 @@ class StockPredictor:
             verbose=0)
 
         model.save(f'models/{self.stock_name}/LSTM_univariate_{self.period}_{self.interval}.h5')
+        preprocessor.save(self.preprocessing_path('LSTM_univariate'))
      
     def train_lstm_multivariante(self):
-        scaler = MinMaxScaler()
-        data = self.data[['Close', 'High', 'Low', 'Volume']]
-        data_close = self.data['Close']
-        df_windowed,df_target = self.window_data_multivariate(data.to_numpy(),data_close.to_numpy().reshape(-1,1),self.window_size)
-        df_windowed_reshaped = df_windowed.reshape(df_windowed.shape[0], -1)
-        x_scaler = scaler.fit(df_windowed_reshaped)
-        df_windowed_reshaped = x_scaler.transform(df_windowed_reshaped)
-        df_windowed = df_windowed_reshaped.reshape(df_windowed.shape[0], df_windowed.shape[1], df_windowed.shape[2])
-        y_scaler = scaler.fit(df_target)
-        df_target = y_scaler.transform(df_target)
+        preprocessor,df_windowed,df_target = self.fit_preprocessing(MULTIVARIATE_FEATURES)
         train_size = int(self.split_ratio*len(df_windowed))
         X_train = df_windowed[:train_size]
         y_train = df_target[:train_size]
@@ -124,28 +146,35 @@ class StockPredictor:
             verbose=0)
 
         model.save(f'models/{self.stock_name}/LSTM_multivariate_{self.period}_{self.interval}.h5')   
+        preprocessor.save(self.preprocessing_path('LSTM_multivariate'))
+        
+    def train_lstm_direct(self):
+        preprocessor,df_windowed,df_target = self.fit_preprocessing(UNIVARIATE_FEATURES, self.direct_horizon)
+        train_size = int(self.split_ratio*len(df_windowed))
+        X_train = df_windowed[:train_size]
+        y_train = df_target[:train_size]
+        model = self.build_lstm_model(X_train, self.direct_horizon)
+        model.fit(X_train, y_train, epochs=50,batch_size=32,    
+            validation_split=0.1,
+            verbose=0)
+
+        model.save(f'models/{self.stock_name}/LSTM_direct_{self.period}_{self.interval}.h5')
+        preprocessor.save(self.preprocessing_path('LSTM_direct'))
         
     def train_mlp_univariante(self):
-        scaler = MinMaxScaler()
-        data_close = self.data['Close']
-        df_windowed,df_target = self.window_data_univariate(data_close.to_numpy().reshape(-1,1),self.window_size)
-        df_windowed_reshaped = df_windowed.reshape(df_windowed.shape[0], -1)
-        x_scaler = scaler.fit(df_windowed_reshaped)
-        df_windowed_reshaped = x_scaler.transform(df_windowed_reshaped)
-        df_windowed = df_windowed_reshaped.reshape(df_windowed.shape[0], df_windowed.shape[1], df_windowed.shape[2])
-        y_scaler = scaler.fit(df_target)
-        df_target = y_scaler.transform(df_target)
+        preprocessor,df_windowed,df_target = self.fit_preprocessing(UNIVARIATE_FEATURES)
         train_size = int(self.split_ratio*len(df_windowed))
         X_train = df_windowed[:train_size]
         y_train = df_target[:train_size]
         X_test = df_windowed[train_size:]
         y_test = df_target[train_size:]
         model = self.build_mlp_model()
-        model.fit(X_train.reshape(X_train.shape[0],-1), y_train)
+        model.fit(X_train.reshape(X_train.shape[0],-1), y_train.ravel())
         output_dir = f'models/{self.stock_name}'
         os.makedirs(output_dir, exist_ok=True)
         with open(f'models/{self.stock_name}/MLP_univariate_{self.period}_{self.interval}.pkl', 'wb') as file:
             pickle.dump(model, file)
+        preprocessor.save(self.preprocessing_path('MLP_univariate'))
     
     def model_expiry(self):
         models = [f"MLP_univariate_{self.period}_{self.interval}",f"LSTM_univariate_{self.period}_{self.interval}",
@@ -167,109 +196,203 @@ class StockPredictor:
                     return diff > EXPIRY_CST
                 
     
-    def train(self, force: bool = False):
+    def trained_models(self):
+        models = ['LSTM_univariate', 'MLP_univariate']  # 'LSTM_multivariate'
+        if self.direct_horizon:
+            models.append('LSTM_direct')
+        return models
+    
+    def manifest_path(self):
+        return f'models/{self.stock_name}/models_manager_{self.period}_{self.interval}.json'
+    
+    def read_manifest(self):
+        if not os.path.exists(self.manifest_path()):
+            return {}
+        with open(self.manifest_path(), 'r') as file:
+            return json.load(file)
+    
+    def write_manifest(self, data):
+        # write then rename so readers (other workers, the ModelRegistry) never see a partial manifest
+        tmp_path = f'{self.manifest_path()}.{os.getpid()}.tmp'
+        with open(tmp_path, 'w') as file:
+            json.dump(data, file)
+        os.replace(tmp_path, self.manifest_path())
+    
+    def model_step(self, model_name:str, model):
+        if model_name.startswith('MLP'):
+            return sklearn_step(model)
+        return keras_step(model, self.compiled_predict)
+    
+    def validation_loss(self, model_name:str):
+        """MSE (in scaled units) of a freshly trained model on the last VALIDATION_RATIO of the windows."""
+        preprocessor = self.load_preprocessing(model_name, MODEL_FEATURES[model_name])
+        horizon = preprocessor.y_scaler.n_features_in_
+        data = self.data[preprocessor.features].to_numpy()
+        df_windowed,df_target = self.window_data_multivariate(data,self.data['Close'].to_numpy(),self.window_size,horizon)
+        n_validation = max(1, int(VALIDATION_RATIO*len(df_windowed)))
+        X,y = preprocessor.transform(df_windowed[-n_validation:],df_target[-n_validation:])
+        y_pred = self.model_step(model_name, self.load_model(model_name))(X)
+        return float(np.mean((y_pred.reshape(y.shape) - y)**2))
+    
+    def new_bars(self, last_bar:int) -> int:
+        """Number of stored bars after `last_bar` (ns timestamp)."""
+        return int((self.data.index.as_unit('ns').asi8 > last_bar).sum())
+    
+    def recent_windows(self, preprocessor:WindowPreprocessor, last_bar:int):
+        """Scaled windows whose target ends on one of the bars stored after `last_bar` (ns timestamp)."""
+        horizon = preprocessor.y_scaler.n_features_in_
+        new_rows = self.new_bars(last_bar)
+        tail = self.data.iloc[-(new_rows + self.window_size + horizon - 1):] if new_rows else self.data.iloc[:0]
+        # the last window ends on the newest bar, unlike the training windows (see windowing._n_windows)
+        df_windowed,df_target = window_multivariate(tail[preprocessor.features].to_numpy(),tail['Close'].to_numpy(),
+                                                    self.window_size,horizon,keep_last=True)
+        if len(df_windowed) == 0:
+            return df_windowed,df_target
+        return preprocessor.transform(df_windowed,df_target)
+    
+    def fine_tune(self, manifest:dict):
+        """
+        Warm-start copies of the existing models on the bars added since they were last trained.
+        Keras models get FINE_TUNE_EPOCHS more epochs, sklearn models as many `partial_fit` passes.
+        The models cached in the registry are never modified (forecasts may be using them):
+        the tuned copies are saved once all of them are fitted, and returned by name.
+        Returns an empty dict when no bar was stored since (e.g. over a weekend), and None,
+        leaving the models untouched, when a full retrain is needed instead:
+        unknown training state, FULL_RETRAIN_CST elapsed since the last full train,
+        or an error on the new bars above DRIFT_THRESHOLD times the validation error.
+        """
+        entries = {model_name: manifest.get(f"{model_name}_{self.period}_{self.interval}") for model_name in self.trained_models()}
+        for entry in entries.values():
+            if entry is None or not {'full_train_date', 'last_bar', 'val_loss'} <= entry.keys():
+                return None
+            if dt.datetime.now().timestamp() - entry['full_train_date'] > FULL_RETRAIN_CST:
+                return None
+        if not any(self.new_bars(entry['last_bar']) for entry in entries.values()):
+            return {}
+        
+        updates = []
+        for model_name, entry in entries.items():
+            model = self.load_model(model_name)
+            preprocessor = self.load_preprocessing(model_name, MODEL_FEATURES[model_name])
+            X,y = self.recent_windows(preprocessor, entry['last_bar'])
+            if len(X) == 0:
+                continue
+            drift = float(np.mean((self.model_step(model_name, model)(X).reshape(y.shape) - y)**2))
+            if drift > DRIFT_THRESHOLD*max(entry['val_loss'], 1e-8):
+                logger.info(f"{self.stock_name} {self.interval} {model_name}: drift {drift:.2e} > {DRIFT_THRESHOLD} x {entry['val_loss']:.2e}, full retrain")
+                return None
+            updates.append((model_name, model, X, y))
         
-        # TODO : detect the expiry of the model using the json file, json create name path of the model
-        # diff( now - created ) > cst train else skip
-        # if force is True, train the model
-        if force or self.model_expiry():
+        tuned = {}
+        for model_name, model, X, y in updates:
+            if model_name.startswith('MLP'):
+                model = copy.deepcopy(model)
+                for epoch in range(FINE_TUNE_EPOCHS):
+                    model.partial_fit(X.reshape(X.shape[0],-1), y.ravel())
+            else:
+                weights = model.get_weights()
+                model = tf.keras.models.clone_model(model)
+                model.set_weights(weights)
+                model.compile(optimizer=Adam(learning_rate=FINE_TUNE_LEARNING_RATE), loss='mean_squared_error')
+                model.fit(X, y, epochs=FINE_TUNE_EPOCHS, batch_size=32, verbose=0)
+            tuned[model_name] = model
+        
+        for model_name, model in tuned.items():
+            path = self.model_registry.model_path(self.stock_name, self.interval, model_name, self.period)
+            # written next to the model then renamed: a concurrent load never reads a partial file
+            root, extension = os.path.splitext(path)
+            tmp_path = f"{root}.tuning{extension}"
+            if model_name.startswith('MLP'):
+                with open(tmp_path, 'wb') as file:
+                    pickle.dump(model, file)
+            else:
+                model.save(tmp_path)
+            os.replace(tmp_path, path)
+        return tuned
+    
+    def train(self, force: bool = False, incremental: bool = True):
+        """
+        Train the models once they expire (EXPIRY_CST) or when `force` is set.
+        With `incremental`, expired models are fine-tuned on the new bars only
+        (see `fine_tune`) and fully retrained on schedule or on drift.
+        Returns True if the models were updated.
+        """
+        if not (force or self.model_expiry()):
+            return False
+        self.data = self.get_stock_data()
+        os.makedirs(f'models/{self.stock_name}', exist_ok=True)
+        manifest = self.read_manifest()
+        now = dt.datetime.now().timestamp()
+        
+        tuned = None if force or not incremental else self.fine_tune(manifest)
+        full_train = tuned is None
+        if full_train:
             self.train_lstm_univariate()
             # self.train_lstm_multivariante()
             self.train_mlp_univariante()
-            data = {
-                    f"MLP_univariate_{self.period}_{self.interval}":{
-                        'path':f'models/{self.stock_name}/MLP_univariate_{self.period}_{self.interval}.pkl',
-                        "creation_date":dt.datetime.now().timestamp()
-                    },
-                    f"LSTM_univariate_{self.period}_{self.interval}":{
-                        'path':f'models/{self.stock_name}/LSTM_univariate_{self.period}_{self.interval}.h5',
-                        "creation_date":dt.datetime.now().timestamp()
-                    },
-                    # f"LSTM_multivariate_{self.period}_{self.interval}":{
-                    #     'path':f'models/{self.stock_name}/LSTM_multivariate_{self.period}_{self.interval}.h5',
-                    #     "creation_date":dt.datetime.now().timestamp()
-                    # }
-                }
-            with open(f'models/{self.stock_name}/models_manager_{self.period}_{self.interval}.json', 'w') as file:
-                json.dump(data, file)
+            if self.direct_horizon:
+                self.train_lstm_direct()
+            # the manifest is rewritten below, until then the registry would serve the previous models
+            self.model_registry.invalidate(self.stock_name, self.interval)
+        
+        data = {}
+        for model_name in self.trained_models():
+            key = f"{model_name}_{self.period}_{self.interval}"
+            previous = manifest.get(key, {})
+            extension = 'pkl' if model_name.startswith('MLP') else 'h5'
+            data[key] = {
+                'path':f'models/{self.stock_name}/{key}.{extension}',
+                "creation_date":now,
+                "full_train_date":now if full_train else previous['full_train_date'],
+                "last_bar":int(self.data.index.as_unit('ns').asi8[-1]),
+                "val_loss":self.validation_loss(model_name) if full_train else previous['val_loss'],
+            }
+        self.write_manifest(data)
+        # the tuned copies replace the cached models under the new manifest version, no reload from disk
+        for model_name, model in (tuned or {}).items():
+            self.model_registry.put(self.stock_name, self.interval, model_name, self.period, model, now)
+        return True
             
     
     def forecast_lstm_univariante(self,n_instances:int=7):
-        model_dir = f'models/{self.stock_name}/LSTM_univariate_{self.period}_{self.interval}.h5'
-        model = tf.keras.models.load_model(model_dir)
-        forecast = []
-        data_close = self.data['Close']
-        df_windowed,df_target = self.window_data_univariate(data_close.to_numpy().reshape(-1,1),self.window_size)
-        df_windowed_reshaped = df_windowed.reshape(df_windowed.shape[0], -1)
-        x_scaler = MinMaxScaler()
-        x_scaler.fit(df_windowed_reshaped)
-        df_windowed_reshaped = x_scaler.transform(df_windowed_reshaped)
-        df_windowed = df_windowed_reshaped.reshape(df_windowed.shape[0], df_windowed.shape[1], df_windowed.shape[2])
-        y_scaler = MinMaxScaler()
-        y_scaler.fit(df_target)
-        df_target = y_scaler.transform(df_target)
-        X = df_windowed[-1]
-        for i in range(n_instances):
-            X = X.reshape(1, X.shape[0], X.shape[1])
-            y_pred = model.predict(X)
-            forecast.append(y_pred)
-            X = np.concatenate((X[0][1:], y_pred))
-        return y_scaler.inverse_transform(np.array(forecast).reshape(-1, 1))
+        model = self.load_model('LSTM_univariate')
+        preprocessor = self.load_preprocessing('LSTM_univariate', UNIVARIATE_FEATURES)
+        X = preprocessor.transform_window(preprocessor.last_window(self.data))
+        forecast = recursive_rollout(keras_step(model, self.compiled_predict), X[np.newaxis], n_instances)
+        return preprocessor.inverse_transform_y(forecast.reshape(-1, 1))
     
     def forecast_lstm_multivariante(self,n_instances:int=7):
-        model_dir = f'models/{self.stock_name}/LSTM_multivariate_{self.period}_{self.interval}.h5'
-        model = tf.keras.models.load_model(model_dir)
-        ## forecast for n hours
-        forecast = []
-        data = self.data[['Close', 'High', 'Low', 'Volume']]
-        data_close = self.data['Close']
-        df_windowed,df_target = self.window_data_multivariate(data.to_numpy(),data_close.to_numpy().reshape(-1,1),self.window_size)
-        df_windowed_reshaped = df_windowed.reshape(df_windowed.shape[0], -1)
-        x_scaler = MinMaxScaler()
-        x_scaler.fit(df_windowed_reshaped)
-        df_windowed_reshaped = x_scaler.transform(df_windowed_reshaped)
-        df_windowed = df_windowed_reshaped.reshape(df_windowed.shape[0], df_windowed.shape[1], df_windowed.shape[2])
-        y_scaler = MinMaxScaler()
-        y_scaler.fit(df_target)
-        df_target = y_scaler.transform(df_target)
-        X = df_windowed[-1]
-        for i in range(n_instances):
-            X = X.reshape(1, X.shape[0], X.shape[1])
-            y_pred = model.predict(X)
-            forecast.append(y_pred)
-            y_pred_expanded = X[-1].copy()  # Use the last timestep as a template
-            y_pred_expanded[0] = y_pred[0, 0]  # Update the 'Close' feature with the prediction
-            X = np.concatenate((X[0][1:], y_pred_expanded), axis=0)
-        return y_scaler.inverse_transform(np.array(forecast).reshape(-1, 1))
+        model = self.load_model('LSTM_multivariate')
+        preprocessor = self.load_preprocessing('LSTM_multivariate', MULTIVARIATE_FEATURES)
+        ## forecast for n hours, the predicted Close replaces the first feature of the last timestep
+        X = preprocessor.transform_window(preprocessor.last_window(self.data))
+        forecast = recursive_rollout(keras_step(model, self.compiled_predict), X[np.newaxis], n_instances, close_index=0)
+        return preprocessor.inverse_transform_y(forecast.reshape(-1, 1))
+    
+    def forecast_lstm_direct(self,n_instances:int=7):
+        if not self.direct_horizon:
+            raise ValueError("No LSTM_direct model: direct_horizon is not set.")
+        model = self.load_model('LSTM_direct')
+        preprocessor = self.load_preprocessing('LSTM_direct', UNIVARIATE_FEATURES)
+        X = preprocessor.transform_window(preprocessor.last_window(self.data))
+        # all horizon steps come out of a single forward pass, longer forecasts take one pass per horizon
+        forecast = direct_rollout(keras_step(model, self.compiled_predict), X[np.newaxis], n_instances)
+        return preprocessor.inverse_transform_y(forecast).reshape(-1, 1)[:n_instances]
     
     def forecast_mlp_univariate(self,n_instances):
-        model_dir = f'models/{self.stock_name}/MLP_univariate_{self.period}_{self.interval}.pkl'
-        with open(model_dir, 'rb') as file:
-            model = pickle.load(file)
-        data_close = self.data['Close']
-        df_windowed,df_target = self.window_data_univariate(data_close.to_numpy().reshape(-1,1),self.window_size)
-        df_windowed_reshaped = df_windowed.reshape(df_windowed.shape[0], -1)
-        x_scaler = MinMaxScaler()
-        x_scaler.fit(df_windowed_reshaped)
-        df_windowed_reshaped = x_scaler.transform(df_windowed_reshaped)
-        df_windowed = df_windowed_reshaped.reshape(df_windowed.shape[0], df_windowed.shape[1], df_windowed.shape[2])
-        y_scaler = MinMaxScaler()
-        y_scaler.fit(df_target)
-        df_target = y_scaler.transform(df_target)
-        X = df_windowed[-1]
-        forecast = []
-        for i in range(n_instances):
-            y_pred = model.predict(X.reshape(1, -1)).reshape(-1, 1)
-            forecast.append(y_pred)
-            X = np.concatenate((X[1:], y_pred))
-        return y_scaler.inverse_transform(np.array(forecast).reshape(-1, 1))
+        model = self.load_model('MLP_univariate')
+        preprocessor = self.load_preprocessing('MLP_univariate', UNIVARIATE_FEATURES)
+        X = preprocessor.transform_window(preprocessor.last_window(self.data))
+        forecast = recursive_rollout(sklearn_step(model), X[np.newaxis], n_instances)
+        return preprocessor.inverse_transform_y(forecast.reshape(-1, 1))
     
     
     def forecast(self,n_instances:int=7):
         return {
             'LSTM_univariate':self.forecast_lstm_univariante(n_instances),
             # 'LSTM_multivariate':self.forecast_lstm_multivariante(n_instances),
-            'MLP_univariate':self.forecast_mlp_univariate(n_instances)
+            'MLP_univariate':self.forecast_mlp_univariate(n_instances),
+            **({'LSTM_direct':self.forecast_lstm_direct(n_instances)} if self.direct_horizon else {})
         }
         
     def data_and_forcast(self,n_instances:int=7):
@@ -282,7 +405,7 @@ class StockPredictor:
             if diff < EXPIRY_CST:
                 return self.cache['cache_data']
         
-        data = self.get_stock_data()
+        self.data = self.get_stock_data()
         forecast = self.forecast(n_instances)
         self.cache = {
             "cache_data":{
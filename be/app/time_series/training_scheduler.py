@@ -0,0 +1,91 @@
+import os
+import time
+import logging
+import multiprocessing
+from dataclasses import dataclass, asdict
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class TrainingJob:
+    """Everything a worker process needs to rebuild and train one StockPredictor."""
+    stock_name: str
+    interval: str
+    period: str
+    window_size: int = 6
+    direct_horizon: int = None
+    bar_root: str = 'data/bars'
+    force: bool = False
+
+
+def default_workers() -> int:
+    """`TRAINING_WORKERS`, or 1: training stays serial in-process unless a pool is asked for explicitly."""
+    return int(os.environ.get('TRAINING_WORKERS', 1))
+
+
+def _init_worker(tf_threads: int):
+    # must run before TensorFlow creates its thread pools in this process
+    os.environ['OMP_NUM_THREADS'] = str(tf_threads)
+    os.environ['TF_NUM_INTRAOP_THREADS'] = str(tf_threads)
+    os.environ['TF_NUM_INTEROP_THREADS'] = '1'
+    import tensorflow as tf
+    tf.config.threading.set_intra_op_parallelism_threads(tf_threads)
+    tf.config.threading.set_inter_op_parallelism_threads(1)
+
+
+def _train_job(job: TrainingJob) -> dict:
+    from .bar_store import BarStore
+    from .stock_predictor import StockPredictor
+
+    start = time.perf_counter()
+    # the parent process refreshed the bars already, workers only read them
+    bar_store = BarStore(root=job.bar_root, refresh_interval=float('inf'))
+    predictor = StockPredictor(stock_name=job.stock_name, interval=job.interval, period=job.period,
+                               window_size=job.window_size, bar_store=bar_store, direct_horizon=job.direct_horizon)
+    predictor.train(job.force)
+    return {**asdict(job), 'wall_time': time.perf_counter() - start, 'pid': os.getpid()}
+
+
+class TrainingScheduler:
+    """
+    Train StockPredictor models over a pool of worker processes.
+
+    Each worker limits TensorFlow to `tf_threads` intra-op threads so that
+    `max_workers` concurrent fits share the machine instead of oversubscribing it.
+    Models and their `models_manager` manifests are written by the workers as
+    each job finishes (manifests atomically), so the parent's ModelRegistry
+    picks up new models as soon as they land.
+    """
+
+    def __init__(self, max_workers: int = None, tf_threads: int = None):
+        self.max_workers = max_workers or default_workers()
+        self.tf_threads = tf_threads or max(1, (os.cpu_count() or 1) // self.max_workers)
+
+    def run(self, jobs: list) -> list:
+        """
+        Run `jobs` (TrainingJob list) and return one report per job:
+        the job fields plus `wall_time` (seconds) and `pid`, or `error`.
+        """
+        reports = []
+        if not jobs:
+            return reports
+        start = time.perf_counter()
+        # spawn, not fork: forking a process that already initialized TensorFlow deadlocks
+        context = multiprocessing.get_context('spawn')
+        workers = min(self.max_workers, len(jobs))
+        with ProcessPoolExecutor(max_workers=workers, mp_context=context,
+                                 initializer=_init_worker, initargs=(self.tf_threads,)) as pool:
+            futures = {pool.submit(_train_job, job): job for job in jobs}
+            for future in as_completed(futures):
+                job = futures[future]
+                try:
+                    report = future.result()
+                    logger.info("Trained %s %s in %.1fs", job.stock_name, job.interval, report['wall_time'])
+                except Exception as e:
+                    report = {**asdict(job), 'error': str(e)}
+                    logger.error("Training %s %s failed: %s", job.stock_name, job.interval, e)
+                reports.append(report)
+        logger.info("Trained %d models with %d workers in %.1fs", len(jobs), workers, time.perf_counter() - start)
+        return reports
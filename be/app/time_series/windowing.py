@@ -0,0 +1,75 @@
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+
+def _n_windows(n_rows: int, window_size: int, horizon: int, keep_last: bool = False) -> int:
+    # same count as the original loops: range(len(data) - window_size - 1) for horizon=1,
+    # which leave out the last complete window (the one whose target ends on the last row)
+    return max(n_rows - window_size - horizon + keep_last, 0)
+
+
+def window_targets(target, window_size: int, horizon: int = 1, keep_last: bool = False) -> np.ndarray:
+    """
+    Build the targets matching `window_features`.
+
+    Args:
+        target (np.ndarray): series of shape (n,) or (n, 1)
+        window_size (int): number of rows in each input window
+        horizon (int): number of future steps predicted per window
+        keep_last (bool): also build the window whose target ends on the last row
+
+    Returns:
+        np.ndarray: read-only strided view of shape (n_windows, horizon) where
+            row i holds target[i + window_size : i + window_size + horizon]
+    """
+    target = np.asarray(target).reshape(len(target))
+    n = _n_windows(len(target), window_size, horizon, keep_last)
+    if n == 0:
+        return np.empty((0, horizon), dtype=target.dtype)
+    return sliding_window_view(target[window_size:], horizon)[:n]
+
+
+def window_features(data, window_size: int, horizon: int = 1, keep_last: bool = False) -> np.ndarray:
+    """
+    Build the input windows of a (multi-feature) series.
+
+    Args:
+        data (np.ndarray): series of shape (n, n_features)
+        window_size (int): number of rows in each input window
+        horizon (int): number of future steps predicted per window, only used
+            to drop the windows that have no complete target
+        keep_last (bool): also build the window whose target ends on the last row
+
+    Returns:
+        np.ndarray: read-only strided view of shape (n_windows, window_size, n_features)
+            where window i holds data[i : i + window_size]
+    """
+    data = np.asarray(data)
+    if data.ndim == 1:
+        data = data.reshape(-1, 1)
+    n = _n_windows(len(data), window_size, horizon, keep_last)
+    if n == 0:
+        return np.empty((0, window_size, data.shape[1]), dtype=data.dtype)
+    # sliding_window_view puts the window axis last: (n, n_features, window_size)
+    return sliding_window_view(data, window_size, axis=0)[:n].transpose(0, 2, 1)
+
+
+def window_univariate(data, window_size: int, horizon: int = 1):
+    """
+    Zero-copy equivalent of `StockPredictor.window_data_univariate`.
+
+    Returns:
+        tuple: X of shape (n_windows, window_size, 1) and y of shape (n_windows, horizon)
+    """
+    return window_features(data, window_size, horizon), window_targets(data, window_size, horizon)
+
+
+def window_multivariate(data, close_data, window_size: int, horizon: int = 1, keep_last: bool = False):
+    """
+    Zero-copy equivalent of `StockPredictor.window_data_multivariate`.
+
+    Returns:
+        tuple: X of shape (n_windows, window_size, n_features) and y of shape (n_windows, horizon)
+    """
+    return (window_features(data, window_size, horizon, keep_last),
+            window_targets(close_data, window_size, horizon, keep_last))
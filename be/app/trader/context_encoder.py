@@ -0,0 +1,267 @@
+"""
+Compact encoding of the decision context for the LLM prompts.
+
+The sentiment summaries (reddit, RSS news, Alpha Vantage comparison DataFrame),
+the forecast text and the portfolio stats are turned into a fixed schema of
+per-symbol rows with rounded numbers:
+
+    FORECAST % vs price (sym|lstm_7h|mlp_7h|lstm_7d|mlp_7d)
+    AAPL|+1.2|-0.3|+4.0|+2.1
+
+Sections and rows are kept by priority until the token budget is spent, the
+rest is dropped (prices and the portfolio summary line always stay).
+"""
+import os
+import re
+import time
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Tuple
+
+from .prompts import count_tokens, render_market_block, format_portfolio
+
+# lower is kept first when the budget runs out
+SECTION_PRIORITIES = {
+    "prices": 0,
+    "forecast": 1,
+    "news": 2,
+    "news_av": 3,
+    "reddit": 4,
+}
+HORIZONS = {"hours": "h", "days": "d"}
+
+
+def default_budget() -> int:
+    """`CONTEXT_TOKEN_BUDGET` or 1000 tokens for the shared market context."""
+    return int(os.getenv("CONTEXT_TOKEN_BUDGET", 1000))
+
+
+def _num(value, digits: int = 2) -> str:
+    """Rounded number without trailing zeros, "-" when missing."""
+    try:
+        value = float(value)
+    except (TypeError, ValueError):
+        return "-"
+    if value != value:
+        return "-"
+    text = f"{value:.{digits}f}"
+    if "." in text:
+        text = text.rstrip("0").rstrip(".")
+    return "0" if text == "-0" else text
+
+
+def _pct(value, reference) -> str:
+    try:
+        return f"{(float(value) / float(reference) - 1) * 100:+.1f}"
+    except (TypeError, ValueError, ZeroDivisionError):
+        return "-"
+
+
+@dataclass
+class Section:
+    name: str
+    header: str
+    rows: List[str]
+    priority: int = 0
+    required: bool = False
+
+
+@dataclass
+class EncodedContext:
+    """Encoded text, its size against the verbose rendering, and what the budget dropped."""
+    text: str
+    tokens_before: int
+    tokens_after: int
+    encode_time: float
+    dropped: Dict[str, int] = field(default_factory=dict)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "tokens_before": self.tokens_before,
+            "tokens_after": self.tokens_after,
+            "encode_ms": self.encode_time * 1000,
+            "dropped": self.dropped,
+        }
+
+
+def parse_forecast(forecast_str: str) -> Dict[str, Dict[Tuple[str, str], List[float]]]:
+    """
+    Parse the text of `Predictor.format_forcast` into
+    {symbol: {(horizon, model): [predictions]}}, horizon being e.g. "7h" or "7d".
+    """
+    forecasts: Dict[str, Dict[Tuple[str, str], List[float]]] = {}
+    symbol, horizon = None, None
+    for line in (forecast_str or "").split("\n"):
+        line = line.strip()
+        if not line:
+            continue
+        match = re.search(r"next (\d+) (hours|days)", line, re.IGNORECASE)
+        if match:
+            horizon = match.group(1) + HORIZONS[match.group(2).lower()]
+            continue
+        name, _, values = line.partition(":")
+        name, values = name.strip(), values.strip()
+        if not values:
+            symbol, horizon = name, None
+            forecasts[symbol] = {}
+            continue
+        if symbol is None or horizon is None:
+            continue
+        try:
+            forecasts[symbol][(horizon, name)] = [float(x) for x in values.strip("[] ").replace("]", " ").replace("[", " ").split()]
+        except ValueError:
+            continue
+    return forecasts
+
+
+def split_news(news) -> Tuple[Dict[str, Any], Any]:
+    """`NewsSentimentAnalyzer.compare_sentiment_stocks` returns (rss summaries, comparison DataFrame)."""
+    if isinstance(news, (tuple, list)) and len(news) == 2:
+        return news[0] or {}, news[1]
+    return news or {}, None
+
+
+class ContextEncoder:
+    """
+    Encode the market context (shared by every trader) and the portfolios into
+    compact per-symbol rows under a token budget.
+
+    :param budget: Tokens of the market context, `CONTEXT_TOKEN_BUDGET` by default.
+    :param portfolio_budget: Tokens of one portfolio block.
+    :param priorities: Section name -> priority, lower is kept first.
+    """
+
+    def __init__(self, budget: int = None, portfolio_budget: int = 300, priorities: Dict[str, int] = None,
+                 model: str = "gpt-4o-mini"):
+        self.budget = budget or default_budget()
+        self.portfolio_budget = portfolio_budget
+        self.priorities = priorities or SECTION_PRIORITIES
+        self.model = model
+
+    # ------------------------------------------------------------------------
+    #    SECTIONS
+    # ------------------------------------------------------------------------
+
+    def _prices(self, market_data: Dict[str, float]) -> Section:
+        rows = [f"{symbol}|{_num(price)}" for symbol, price in sorted(market_data.items())]
+        return Section("prices", "PRICES (sym|price)", rows, required=True)
+
+    def _forecast(self, forecast_str: str, market_data: Dict[str, float]) -> Section:
+        forecasts = parse_forecast(forecast_str)
+        # hours before days, shortest horizon first
+        columns = sorted({key for series in forecasts.values() for key in series},
+                         key=lambda k: (k[0][-1] != "h", int(k[0][:-1]), k[1]))
+        rows = []
+        for symbol, series in sorted(forecasts.items()):
+            price = market_data.get(symbol)
+            values = [(series.get(key) or [None])[-1] for key in columns]
+            # relative to the current price when known, else the last predicted price
+            cells = [_pct(v, price) if price else _num(v) for v in values]
+            rows.append("|".join([symbol] + cells))
+        names = "|".join(f"{model.split('_')[0].lower()}_{horizon}" for horizon, model in columns)
+        unit = "% vs price" if market_data else "last predicted price"
+        return Section("forecast", f"FORECAST {unit} (sym|{names})", rows)
+
+    def _reddit(self, reddit: Dict[str, Any]) -> Section:
+        rows = []
+        for symbol, data in sorted((reddit or {}).items(), key=lambda item: -(item[1] or {}).get("total_posts", 0)):
+            data = data or {}
+            comments = data.get("comment_statistics", {})
+            rows.append(f"{symbol}|{data.get('total_posts', 0)}|{_num(data.get('average_compound_score'))}|"
+                        f"{comments.get('positive_comments', 0)}/{comments.get('neutral_comments', 0)}/"
+                        f"{comments.get('negative_comments', 0)}")
+        return Section("reddit", "REDDIT (sym|posts|compound|comments +/0/-)", rows)
+
+    def _news(self, rss: Dict[str, Any]) -> Section:
+        rows = []
+        for symbol, data in sorted(rss.items(), key=lambda item: -(item[1] or {}).get("total_articles", 0)):
+            data = data or {}
+            percentages = data.get("sentiment_percentages", {})
+            rows.append(f"{symbol}|{data.get('total_articles', 0)}|{_num(percentages.get('positive'), 0)}|"
+                        f"{_num(percentages.get('negative'), 0)}|{_num(data.get('average_confidence'))}")
+        return Section("news", "NEWS (sym|articles|pos%|neg%|confidence)", rows)
+
+    def _news_av(self, comparison) -> Section:
+        rows = []
+        if comparison is not None and len(comparison):
+            records = comparison.to_dict("index") if hasattr(comparison, "to_dict") else dict(comparison)
+            for symbol, data in sorted(records.items(), key=lambda item: -float(item[1].get("article_count") or 0)):
+                rows.append(f"{symbol}|{data.get('article_count', 0)}|{_num(data.get('avg_sentiment'))}|"
+                            f"{_num(data.get('recent_sentiment'))}|{_num(data.get('sentiment_std'))}|"
+                            f"{data.get('most_common_sentiment', '-')}")
+        return Section("news_av", "NEWS_AV (sym|articles|avg|recent|std|label)", rows)
+
+    # ------------------------------------------------------------------------
+    #    BUDGET
+    # ------------------------------------------------------------------------
+
+    def _fit(self, sections: List[Section], budget: int) -> Tuple[str, Dict[str, int]]:
+        """
+        Keep the required sections, then rows by section priority and row order until
+        `budget` is spent: everything after the first row that does not fit is dropped.
+        """
+        kept = {section.name: [] for section in sections}
+        dropped = {}
+        spent = 0
+        full = False
+        for section in sorted(sections, key=lambda s: (not s.required, s.priority)):
+            if not section.rows:
+                continue
+            header_tokens = count_tokens(section.header + "\n", self.model)
+            for i, row in enumerate(section.rows):
+                cost = count_tokens(row + "\n", self.model) + (header_tokens if i == 0 else 0)
+                full = full or (not section.required and spent + cost > budget)
+                if full:
+                    dropped[section.name] = len(section.rows) - i
+                    break
+                kept[section.name].append(row)
+                spent += cost
+        blocks = [
+            "\n".join([section.header] + kept[section.name]) for section in sections if kept[section.name]
+        ]
+        return "\n".join(blocks), dropped
+
+    def _encode(self, sections: List[Section], budget: int, start: float, verbose, *args) -> EncodedContext:
+        """Fit `sections` in `budget`, then measure the result against `verbose(*args)` (not part of the encode time)."""
+        for section in sections:
+            section.priority = self.priorities.get(section.name, section.priority)
+        text, dropped = self._fit(sections, budget)
+        encode_time = time.perf_counter() - start
+        return EncodedContext(text, count_tokens(verbose(*args), self.model), count_tokens(text, self.model), encode_time, dropped)
+
+    # ------------------------------------------------------------------------
+    #    ENCODERS
+    # ------------------------------------------------------------------------
+
+    def encode_market(self, market_data: Dict[str, float], context: Dict[str, Any]) -> EncodedContext:
+        """Prices, forecasts and sentiment of the cycle, compared to `prompts.render_market_block`."""
+        start = time.perf_counter()
+        sentiment = context.get("sentiment_analysis") or {}
+        rss, comparison = split_news(sentiment.get("news"))
+        sections = [
+            self._prices(market_data),
+            self._forecast(context.get("forecast", ""), market_data),
+            self._news(rss),
+            self._news_av(comparison),
+            self._reddit(sentiment.get("reddit")),
+        ]
+        return self._encode(sections, self.budget, start, render_market_block, market_data, context)
+
+    def encode_portfolio(self, stats: Dict[str, Any]) -> EncodedContext:
+        """One trader's `Trader.get_performance_stats`, largest holdings first, compared to `prompts.format_portfolio`."""
+        start = time.perf_counter()
+        summary = Section("summary", "PORTFOLIO (equity|cash|stocks|realized|unrealized)", [
+            f"{_num(stats['total_equity'])}|{_num(stats['current_balance'])}|{_num(stats['portfolio_value'])}|"
+            f"{_num(stats['realized_profit'])}|{_num(stats['unrealized_profit'])}"
+        ], required=True)
+        holdings = sorted(stats["holdings"].items(), key=lambda item: -stats["holdings_value"].get(item[0], 0.0))
+        held = Section("holdings", "HOLDINGS (sym|qty|value|unrealized|realized)", [
+            f"{symbol}|{_num(quantity)}|{_num(stats['holdings_value'].get(symbol))}|"
+            f"{_num(stats['unrealized_profit_by_stock'].get(symbol))}|{_num(stats['realized_profit_by_stock'].get(symbol))}"
+            for symbol, quantity in holdings
+        ], priority=1)
+        closed = Section("closed", "CLOSED (sym|realized)", [
+            f"{symbol}|{_num(profit)}"
+            for symbol, profit in sorted(stats["realized_profit_by_stock"].items(), key=lambda item: -abs(item[1] or 0.0))
+            if profit and symbol not in stats["holdings"]
+        ], priority=2)
+        return self._encode([summary, held, closed], self.portfolio_budget, start, format_portfolio, stats)
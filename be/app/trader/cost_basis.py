@@ -0,0 +1,270 @@
+import enum
+from dataclasses import dataclass, field
+from typing import Dict, Optional
+
+import numpy as np
+import pandas as pd
+from sqlalchemy import select, type_coerce, String
+
+from .trader import Transaction, TransactionType
+
+
+class CostBasisMethod(enum.Enum):
+    FIFO = "FIFO"
+    LIFO = "LIFO"
+    AVERAGE = "AVERAGE"
+
+
+@dataclass
+class TransactionArrays:
+    """The transactions of one trader as parallel arrays, in execution order."""
+    symbol: np.ndarray
+    is_buy: np.ndarray
+    quantity: np.ndarray
+    price: np.ndarray
+
+    def __len__(self):
+        return len(self.quantity)
+
+
+@dataclass
+class SymbolPnL:
+    """
+    Lot-level result for one symbol. `lot_*` arrays have one entry per BUY
+    (for AVERAGE the open quantity is pooled, so per-lot fields stay empty).
+    """
+    symbol: str
+    quantity: float
+    cost_basis: float
+    realized_pnl: float
+    unrealized_pnl: float
+    lot_price: np.ndarray = field(default_factory=lambda: np.empty(0))
+    lot_open_quantity: np.ndarray = field(default_factory=lambda: np.empty(0))
+    lot_realized_pnl: np.ndarray = field(default_factory=lambda: np.empty(0))
+    lot_unrealized_pnl: np.ndarray = field(default_factory=lambda: np.empty(0))
+
+    @property
+    def average_cost(self) -> float:
+        return self.cost_basis / self.quantity if self.quantity else 0.0
+
+
+TRANSACTION_DTYPE = [("symbol", object), ("is_buy", bool), ("quantity", np.float64), ("price", np.float64)]
+
+
+def load_transactions(session, trader_id: int) -> TransactionArrays:
+    """
+    Read the transactions of a trader into NumPy arrays with a single query, run on the
+    DB-API cursor: the rows go straight into a structured array, without a Row object each.
+    """
+    query = (
+        select(
+            Transaction.symbol,
+            # raw enum value, skips the per-row Enum conversion
+            type_coerce(Transaction.transaction_type, String) == TransactionType.BUY.value,
+            Transaction.quantity,
+            Transaction.price,
+        )
+        .where(Transaction.trader_id == trader_id)
+        .order_by(Transaction.timestamp, Transaction.id)
+    )
+    connection = session.connection()
+    sql = str(query.compile(dialect=connection.dialect, compile_kwargs={"literal_binds": True}))
+    cursor = connection.connection.cursor()
+    try:
+        cursor.execute(sql)
+        rows = np.array(cursor.fetchall(), dtype=TRANSACTION_DTYPE)
+    finally:
+        cursor.close()
+    return TransactionArrays(rows["symbol"], rows["is_buy"], rows["quantity"], rows["price"])
+
+
+def _linear_recurrence(a: np.ndarray, b: np.ndarray, span: float = 600.0) -> np.ndarray:
+    """
+    Solve x[j] = a[j] * x[j-1] + b[j] (x[-1] = 0) for 0 <= a <= 1 without a Python loop per element.
+
+    x[j] = sum_i b[i] * prod(a[i+1..j]) is evaluated as cumulative sums of b[i] / prod(a[..i]),
+    rescaled per block so that prod(a) never spans more than exp(`span`) inside a block.
+    a[j] == 0 restarts the recurrence; those restarts are handled with segmented sums.
+    """
+    n = len(a)
+    x = np.empty(n)
+    restart = a <= 0
+    G = np.cumsum(np.log(np.where(restart, 1.0, a)))  # nonincreasing
+    segment = np.cumsum(restart)
+    carry = 0.0
+    start = 0
+    while start < n:
+        ref = G[start - 1] if start else 0.0
+        # first index where the log-product drops more than `span` below the block reference
+        end = max(start + 1, int(np.searchsorted(-G, span - ref, side='right')))
+        terms = b[start:end] * np.exp(ref - G[start:end])
+        cumulative = np.cumsum(terms)
+        block_segment = segment[start:end]
+        segment_start = np.searchsorted(block_segment, block_segment, side='left')
+        partial = cumulative - np.where(segment_start > 0, cumulative[segment_start - 1], 0.0)
+        carried = np.where(block_segment == (segment[start - 1] if start else 0), carry, 0.0)
+        x[start:end] = np.exp(G[start:end] - ref) * (partial + carried)
+        carry = x[end - 1]
+        start = end
+    return x
+
+
+def _fifo(is_buy, quantity, price):
+    buy_q, buy_p = quantity[is_buy], price[is_buy]
+    sell_q, sell_p = quantity[~is_buy], price[~is_buy]
+    cum_bought = np.concatenate(([0.0], np.cumsum(buy_q)))
+    cum_cost = np.concatenate(([0.0], np.cumsum(buy_q * buy_p)))
+    cum_sold = np.concatenate(([0.0], np.cumsum(sell_q)))
+    cum_proceeds = np.concatenate(([0.0], np.cumsum(sell_q * sell_p)))
+    sold = cum_sold[-1]
+
+    # FIFO consumes lots in order: the cost of the first S shares sold is the
+    # piecewise linear cumulative buy cost evaluated at S
+    realized = cum_proceeds[-1] - np.interp(sold, cum_bought, cum_cost)
+    # per lot: the shares of lot j are the sold range [cum_bought[j-1], cum_bought[j]]
+    consumed_to = np.minimum(cum_bought, sold)
+    lot_consumed = np.diff(consumed_to)
+    lot_proceeds = np.diff(np.interp(consumed_to, cum_sold, cum_proceeds))
+    lot_open = buy_q - lot_consumed
+    return realized, lot_open, lot_proceeds - lot_consumed * buy_p
+
+
+def _next_smaller(values: np.ndarray) -> np.ndarray:
+    """
+    Index of the next strictly smaller value of each element (len(values) when there is none).
+
+    The minima of blocks of 1, 2, 4, ... elements form a pyramid: an element climbs it until
+    the block right of its own holds a smaller value, then descends into that block.
+    Both walks are log2(n) vectorized steps over the elements still looking.
+    """
+    n = len(values)
+    answer = np.full(n, n)
+    if n < 2:
+        return answer
+    size = 1 << (n - 1).bit_length()
+    pyramid = [np.concatenate((values, np.full(size - n, np.inf)))]
+    while len(pyramid[-1]) > 1:
+        pyramid.append(np.minimum(pyramid[-1][0::2], pyramid[-1][1::2]))
+    # elements not above every later value have no answer
+    lowest_after = np.minimum.accumulate(values[::-1])[::-1]
+    pending = np.flatnonzero(values[:-1] > lowest_after[1:])
+    for depth in range(len(pyramid) - 1):
+        if not len(pending):
+            break
+        block = pending >> depth
+        hit = (block & 1) == 0
+        hit[hit] = pyramid[depth][block[hit] + 1] < values[pending[hit]]
+        found, node = pending[hit], block[hit] + 1
+        target = values[found]
+        for level in pyramid[depth - 1::-1] if depth else []:
+            node = 2 * node
+            # the left half when it holds a smaller value, else the right one
+            node += level[node] >= target
+        answer[found] = node
+        pending = pending[~hit]
+    return answer
+
+
+def _path_sums(weight: np.ndarray, parent: np.ndarray) -> np.ndarray:
+    """Sum of `weight` along the path to the root of each node (parent == len(weight)), by pointer doubling."""
+    n = len(weight)
+    total = np.append(weight, 0.0)
+    parent = np.append(parent, n)
+    while (parent[:n] < n).any():
+        total = total + total[parent]
+        total[n] = 0.0
+        parent = parent[parent]
+    return total[:n]
+
+
+def _lifo(is_buy, quantity, price):
+    """
+    LIFO lots are the levels of a stack of shares: height[t] is the holding after t
+    (sells beyond it are ignored) and a buy adds the levels [height[t-1], height[t]).
+    A level is sold by the first later sell bringing the height below it, so the
+    proceeds of the levels [0, height[t]) are the proceeds at the next lower height
+    plus the levels in between sold at that sell: a sum along next-smaller pointers.
+    """
+    signed = np.cumsum(np.where(is_buy, quantity, -quantity))
+    height = np.concatenate(([0.0], signed - np.minimum(np.minimum.accumulate(signed), 0.0)))
+    # price of the transaction that set each height
+    sold_at = np.concatenate(([0.0], price))
+    lower = _next_smaller(height)
+    has_lower = lower < len(height)
+    weight = np.where(has_lower, (height - height[np.minimum(lower, len(height) - 1)]) *
+                      sold_at[np.minimum(lower, len(height) - 1)], 0.0)
+    proceeds_below = _path_sums(weight, lower)
+
+    buys = np.flatnonzero(is_buy)
+    bottom, top = height[buys], height[buys + 1]
+    # levels of the lot never sold: above its bottom and below every later height
+    lowest_after = np.minimum.accumulate(height[::-1])[::-1]
+    lot_open = np.clip(lowest_after[buys + 1] - bottom, 0.0, None)
+    lot_sold = top - bottom - lot_open
+    lot_realized = proceeds_below[buys + 1] - proceeds_below[buys] - lot_sold * price[buys]
+    return float(lot_realized.sum()), lot_open, lot_realized
+
+
+def _average(is_buy, quantity, price):
+    signed = np.where(is_buy, quantity, -quantity)
+    held_after = np.cumsum(signed)
+    held_before = held_after - signed
+    buys = np.flatnonzero(is_buy)
+    # average cost after each buy: A = (held * A_prev + q * p) / (held + q)
+    weight = held_before[buys] + quantity[buys]
+    average_after_buy = _linear_recurrence(held_before[buys] / weight, quantity[buys] * price[buys] / weight)
+    # sells leave the average unchanged: use the one set by the last buy before them
+    last_buy = np.searchsorted(buys, np.flatnonzero(~is_buy)) - 1
+    sell_average = np.where(last_buy >= 0, average_after_buy[np.maximum(last_buy, 0)], 0.0)
+    realized = float(np.sum(quantity[~is_buy] * (price[~is_buy] - sell_average)))
+    held = held_after[-1]
+    average = average_after_buy[-1] if len(buys) and held > 0 else 0.0
+    return realized, held, average
+
+
+def compute_pnl(transactions: TransactionArrays, method: CostBasisMethod = CostBasisMethod.FIFO,
+                current_prices: Optional[Dict[str, float]] = None) -> Dict[str, SymbolPnL]:
+    """
+    Realized and unrealized P&L per symbol (and per lot for FIFO/LIFO).
+
+    All three methods are vectorized, without a Python loop per transaction.
+    Unrealized P&L uses `current_prices` (0 for missing symbols).
+    """
+    method = CostBasisMethod(method)
+    current_prices = current_prices or {}
+    results = {}
+    if not len(transactions):
+        return results
+    # hash-based factorize, np.unique would sort 1M Python strings
+    inverse, symbols = pd.factorize(transactions.symbol)
+    # stable sort keeps the execution order inside each symbol
+    order = np.argsort(inverse, kind='stable')
+    bounds = np.searchsorted(inverse[order], np.arange(len(symbols) + 1))
+    for k, symbol in enumerate(symbols):
+        rows = order[bounds[k]:bounds[k + 1]]
+        is_buy = transactions.is_buy[rows]
+        quantity = transactions.quantity[rows]
+        price = transactions.price[rows]
+        current_price = float(current_prices.get(symbol, 0.0))
+
+        if method == CostBasisMethod.AVERAGE:
+            realized, held, average = _average(is_buy, quantity, price)
+            results[symbol] = SymbolPnL(symbol, float(held), float(held * average), realized, float(held * (current_price - average)))
+            continue
+
+        engine = _fifo if method == CostBasisMethod.FIFO else _lifo
+        realized, lot_open, lot_realized = engine(is_buy, quantity, price)
+        lot_price = price[is_buy]
+        lot_unrealized = lot_open * (current_price - lot_price)
+        results[symbol] = SymbolPnL(
+            symbol=symbol,
+            quantity=float(lot_open.sum()),
+            cost_basis=float(np.dot(lot_open, lot_price)),
+            realized_pnl=float(realized),
+            unrealized_pnl=float(lot_unrealized.sum()),
+            lot_price=lot_price,
+            lot_open_quantity=lot_open,
+            lot_realized_pnl=lot_realized,
+            lot_unrealized_pnl=lot_unrealized,
+        )
+    return results
@@ -0,0 +1,223 @@
+"""
+Local cache of the LLM trading plans.
+
+Between two hourly cycles of a quiet market the prompt of a trader barely
+changes. Its inputs are normalized (prices, forecasts and the trader's cash
+in relative buckets of `tolerance`, sentiment scores in steps of
+`score_tolerance`, holdings as is), hashed, and the plan the LLM answered for the same
+fingerprint is reused instead of a new round trip. Entries live in a SQLite
+file with a TTL and least-recently-used eviction.
+"""
+import os
+import json
+import math
+import time
+import sqlite3
+import hashlib
+import threading
+from dataclasses import dataclass
+from typing import Any, Dict, Optional
+
+from .context_encoder import parse_forecast, split_news
+
+# bump when the prompt changes enough for the cached plans to be stale
+CACHE_VERSION = 2
+
+
+def _bucket(value, tolerance: float) -> Optional[int]:
+    """Relative bucket: values within ~`tolerance` of each other share it."""
+    try:
+        value = float(value)
+    except (TypeError, ValueError):
+        return None
+    if not value > 0:
+        return 0
+    return round(math.log(value) / math.log1p(tolerance))
+
+
+def _step(value, step: float) -> Optional[int]:
+    """Absolute bucket of width `step`."""
+    try:
+        value = float(value)
+    except (TypeError, ValueError):
+        return None
+    return None if value != value else round(value / step)
+
+
+def _digest(value) -> str:
+    return hashlib.sha256(json.dumps(value, sort_keys=True, default=str).encode()).hexdigest()
+
+
+@dataclass
+class DecisionCacheConfig:
+    """
+    - tolerance: relative width of the price, forecast and cash buckets (e.g. 0.01: 1%)
+    - score_tolerance: step of the sentiment scores and percentages
+    - bypass: always ask the LLM (the fresh plans are still stored)
+    """
+    path: str = "data/decision_cache.sqlite"
+    ttl: float = 3 * 60 * 60
+    max_entries: int = 10_000
+    tolerance: float = 0.01
+    score_tolerance: float = 0.05
+    bypass: bool = False
+
+    @classmethod
+    def from_env(cls, **overrides) -> "DecisionCacheConfig":
+        """Read `DECISION_CACHE_PATH`, `DECISION_CACHE_TTL`, `DECISION_CACHE_SIZE`, `DECISION_CACHE_TOLERANCE`, `DECISION_CACHE_BYPASS`."""
+        config = cls(
+            path=os.getenv("DECISION_CACHE_PATH", cls.path),
+            ttl=float(os.getenv("DECISION_CACHE_TTL", cls.ttl)),
+            max_entries=int(os.getenv("DECISION_CACHE_SIZE", cls.max_entries)),
+            tolerance=float(os.getenv("DECISION_CACHE_TOLERANCE", cls.tolerance)),
+            bypass=os.getenv("DECISION_CACHE_BYPASS", "0").lower() in ("1", "true", "yes"),
+        )
+        for key, value in overrides.items():
+            setattr(config, key, value)
+        return config
+
+
+class DecisionCache:
+    """
+    Trading plans by input fingerprint: `market_key` once per cycle, `key` per
+    trader, then `get` / `put`. Thread-safe, one SQLite connection.
+    """
+
+    def __init__(self, config: DecisionCacheConfig = None):
+        self.config = config or DecisionCacheConfig()
+        if self.config.path != ":memory:":
+            os.makedirs(os.path.dirname(os.path.abspath(self.config.path)), exist_ok=True)
+        self._lock = threading.Lock()
+        self._connection = sqlite3.connect(self.config.path, check_same_thread=False, isolation_level=None)
+        if self.config.path != ":memory:":
+            self._connection.execute("PRAGMA journal_mode=WAL")
+            self._connection.execute("PRAGMA synchronous=NORMAL")
+        self._connection.execute(
+            "CREATE TABLE IF NOT EXISTS decisions "
+            "(key TEXT PRIMARY KEY, plan TEXT NOT NULL, created REAL NOT NULL, last_used REAL NOT NULL)"
+        )
+        self._connection.execute("CREATE INDEX IF NOT EXISTS ix_decisions_last_used ON decisions (last_used)")
+        self.hits = 0
+        self.misses = 0
+        self.bypassed = 0
+        self.expired = 0
+        self.evicted = 0
+
+    @classmethod
+    def from_env(cls, **overrides) -> "DecisionCache":
+        return cls(DecisionCacheConfig.from_env(**overrides))
+
+    @property
+    def bypass(self) -> bool:
+        return self.config.bypass
+
+    @bypass.setter
+    def bypass(self, value: bool):
+        self.config.bypass = value
+
+    # ------------------------------------------------------------------------
+    #    FINGERPRINTS
+    # ------------------------------------------------------------------------
+
+    def market_key(self, market_data: Dict[str, float], context: Dict[str, Any]) -> str:
+        """Fingerprint of the cycle's market inputs: prices, forecasts and sentiment, quantized."""
+        tolerance, score = self.config.tolerance, self.config.score_tolerance
+        sentiment = context.get("sentiment_analysis") or {}
+        rss, comparison = split_news(sentiment.get("news"))
+        if comparison is not None and hasattr(comparison, "to_dict"):
+            comparison = comparison.to_dict("index")
+        # the predicted prices themselves, a move of the current price alone does not change them
+        forecasts = {
+            symbol: {f"{model}_{horizon}": _bucket(values[-1], tolerance) for (horizon, model), values in series.items() if values}
+            for symbol, series in parse_forecast(context.get("forecast", "")).items()
+        }
+        normalized = {
+            "prices": {symbol: _bucket(price, tolerance) for symbol, price in market_data.items()},
+            "forecast": forecasts,
+            "reddit": {
+                symbol: _step((data or {}).get("average_compound_score"), score)
+                for symbol, data in (sentiment.get("reddit") or {}).items()
+            },
+            "news": {
+                symbol: [
+                    _step((data or {}).get("sentiment_percentages", {}).get(label, 0) / 100, score)
+                    for label in ("positive", "negative")
+                ] + [_step((data or {}).get("average_confidence"), score)]
+                for symbol, data in rss.items()
+            },
+            "news_av": {
+                symbol: [_step(data.get("avg_sentiment"), score), _step(data.get("recent_sentiment"), score)]
+                for symbol, data in (comparison or {}).items()
+            },
+        }
+        return _digest(normalized)
+
+    def key(self, mode: str, market_key: str, stats: Dict[str, Any], model: str = "") -> str:
+        """Fingerprint of one trader's prompt: strategy, market, holdings and cash (from `get_performance_stats`)."""
+        return _digest([
+            CACHE_VERSION, model, mode, market_key,
+            {symbol: quantity for symbol, quantity in stats["holdings"].items() if quantity},
+            _bucket(stats["current_balance"], self.config.tolerance),
+        ])
+
+    # ------------------------------------------------------------------------
+    #    STORE
+    # ------------------------------------------------------------------------
+
+    def get(self, key: str) -> Optional[str]:
+        """The plan stored for `key` if it has not expired, None on a miss or when bypassed."""
+        if self.config.bypass:
+            self.bypassed += 1
+            return None
+        now = time.time()
+        with self._lock:
+            row = self._connection.execute("SELECT plan, created FROM decisions WHERE key = ?", (key,)).fetchone()
+            if row is not None and now - row[1] > self.config.ttl:
+                self._connection.execute("DELETE FROM decisions WHERE key = ?", (key,))
+                self.expired += 1
+                row = None
+            if row is None:
+                self.misses += 1
+                return None
+            self._connection.execute("UPDATE decisions SET last_used = ? WHERE key = ?", (now, key))
+            self.hits += 1
+            return row[0]
+
+    def put(self, key: str, plan_json: str):
+        """Store a plan, then drop the expired entries and the least recently used ones above `max_entries`."""
+        now = time.time()
+        with self._lock:
+            self._connection.execute(
+                "INSERT OR REPLACE INTO decisions (key, plan, created, last_used) VALUES (?, ?, ?, ?)",
+                (key, plan_json, now, now),
+            )
+            self.expired += self._connection.execute(
+                "DELETE FROM decisions WHERE created < ?", (now - self.config.ttl,)
+            ).rowcount
+            excess = self._connection.execute("SELECT COUNT(*) FROM decisions").fetchone()[0] - self.config.max_entries
+            if excess > 0:
+                self.evicted += self._connection.execute(
+                    "DELETE FROM decisions WHERE key IN (SELECT key FROM decisions ORDER BY last_used LIMIT ?)", (excess,)
+                ).rowcount
+
+    def clear(self):
+        with self._lock:
+            self._connection.execute("DELETE FROM decisions")
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        with self._lock:
+            entries = self._connection.execute("SELECT COUNT(*) FROM decisions").fetchone()[0]
+        return {
+            "entries": entries,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "bypassed": self.bypassed,
+            "expired": self.expired,
+            "evicted": self.evicted,
+        }
+
+    def close(self):
+        with self._lock:
+            self._connection.close()
@@ -0,0 +1,112 @@
+"""
+Equity history of the traders: the snapshot writer run at the end of each
+update cycle, and the downsampling used to serve long curves.
+"""
+from datetime import datetime
+from typing import Dict, Tuple
+
+import numpy as np
+from sqlalchemy import insert
+
+from .trader import Trader, Position, EquitySnapshot
+
+DOWNSAMPLING_METHODS = ("lttb", "minmax")
+
+
+def record_equity_snapshots(session, stocks_current_value: Dict[str, float], timestamp: datetime = None) -> int:
+    """
+    Write one EquitySnapshot per trader valued at `stocks_current_value`,
+    with two reads (traders, open positions) and one bulk insert in one commit.
+    Returns the number of rows written.
+    """
+    timestamp = timestamp or datetime.utcnow()
+    holdings_value = {}
+    open_positions = (
+        session.query(Position.trader_id, Position.symbol, Position.quantity)
+        .filter(Position.quantity > 0)
+    )
+    for trader_id, symbol, quantity in open_positions:
+        holdings_value.setdefault(trader_id, {})[symbol] = quantity * stocks_current_value.get(symbol, 0.0)
+
+    rows = []
+    for trader_id, balance in session.query(Trader.id, Trader.balance):
+        values = holdings_value.get(trader_id, {})
+        portfolio_value = sum(values.values())
+        rows.append({
+            "trader_id": trader_id,
+            "timestamp": timestamp,
+            "balance": balance,
+            "portfolio_value": portfolio_value,
+            "total_equity": balance + portfolio_value,
+            "holdings_value": values,
+        })
+    if rows:
+        session.execute(insert(EquitySnapshot), rows)
+        session.commit()
+    return len(rows)
+
+
+def lttb(x: np.ndarray, y: np.ndarray, threshold: int) -> np.ndarray:
+    """
+    Largest-Triangle-Three-Buckets: indices of `threshold` points keeping the
+    visual shape of the curve. First and last points are always kept.
+    One NumPy pass per bucket, the bucket averages are computed up front.
+    """
+    n = len(x)
+    if threshold >= n or threshold < 3:
+        return np.arange(n)
+    buckets = threshold - 2
+    # bucket i holds the points [bounds[i], bounds[i + 1]) of the interior 1..n-2
+    bounds = 1 + (np.arange(buckets + 1) * (n - 2)) // buckets
+    counts = np.diff(bounds)
+    mean_x = np.add.reduceat(x[1:n - 1], bounds[:-1] - 1) / counts
+    mean_y = np.add.reduceat(y[1:n - 1], bounds[:-1] - 1) / counts
+    # the third vertex of bucket i is the average of bucket i + 1 (the last point for the last bucket)
+    next_x = np.append(mean_x[1:], x[n - 1])
+    next_y = np.append(mean_y[1:], y[n - 1])
+
+    selected = np.empty(threshold, dtype=np.int64)
+    selected[0], selected[-1] = 0, n - 1
+    a = 0
+    for i in range(buckets):
+        start, end = bounds[i], bounds[i + 1]
+        bx, by = x[start:end], y[start:end]
+        # twice the triangle area, the constant factor does not change the argmax
+        area = np.abs((x[a] - next_x[i]) * (by - y[a]) - (x[a] - bx) * (next_y[i] - y[a]))
+        a = start + int(np.argmax(area))
+        selected[i + 1] = a
+    return selected
+
+
+def minmax_buckets(y: np.ndarray, buckets: int) -> np.ndarray:
+    """
+    Indices of the minimum and maximum of each of `buckets` equal-count buckets
+    (plus the first and last points), in time order: keeps every peak and trough.
+    """
+    n = len(y)
+    if 2 * buckets + 2 >= n or buckets < 1:
+        return np.arange(n)
+    size = -(-n // buckets)
+    padded = np.full(size * buckets, np.nan)
+    padded[:n] = y
+    rows = padded.reshape(buckets, size)
+    valid = ~np.all(np.isnan(rows), axis=1)
+    offsets = np.arange(buckets)[valid] * size
+    indices = np.concatenate((
+        [0, n - 1],
+        offsets + np.nanargmin(rows[valid], axis=1),
+        offsets + np.nanargmax(rows[valid], axis=1),
+    ))
+    return np.unique(indices)
+
+
+def downsample(timestamps: np.ndarray, values: np.ndarray, points: int, method: str = "lttb") -> Tuple[np.ndarray, np.ndarray]:
+    """Reduce a curve to about `points` points with `method` ("lttb" or "minmax")."""
+    if method not in DOWNSAMPLING_METHODS:
+        raise ValueError(f"Unknown downsampling method {method!r}, expected one of {DOWNSAMPLING_METHODS}.")
+    if method == "lttb":
+        indices = lttb(timestamps.astype(np.float64), values, points)
+    else:
+        # each bucket contributes up to two points
+        indices = minmax_buckets(values, max(1, (points - 2) // 2))
+    return timestamps[indices], values[indices]
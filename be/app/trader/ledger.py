@@ -0,0 +1,120 @@
+"""
+Rebuild or verify the `positions` ledger by replaying the `transactions` table.
+
+    python -m trader.ledger verify  [--db sqlite:///db.sqlite] [--quick]
+    python -m trader.ledger rebuild [--db sqlite:///db.sqlite]
+"""
+import sys
+import argparse
+from typing import Dict, List
+
+from .trader import Trader, Transaction, TransactionType, Position, get_scoped_session
+
+# tolerance on average cost / realized P&L, float sums replayed in another order drift slightly
+TOLERANCE = 1e-6
+
+
+def replay_positions(session, trader_id: int) -> Dict[str, Position]:
+    """
+    Replay the transactions of a trader in order and return the resulting
+    (transient, not added to the session) Position of each symbol.
+    """
+    positions = {}
+    rows = (
+        session.query(Transaction.symbol, Transaction.quantity, Transaction.price, Transaction.transaction_type)
+        .filter(Transaction.trader_id == trader_id)
+        .order_by(Transaction.timestamp, Transaction.id)
+        .yield_per(10_000)
+    )
+    for symbol, quantity, price, transaction_type in rows:
+        position = positions.get(symbol)
+        if position is None:
+            position = positions[symbol] = Position(trader_id=trader_id, symbol=symbol, quantity=0, average_cost=0.0, realized_pnl=0.0)
+        if transaction_type == TransactionType.BUY:
+            position.apply_buy(quantity, price)
+        else:
+            position.apply_sell(quantity, price)
+    return positions
+
+
+def rebuild_positions(session, trader_ids: List[int] = None):
+    """Replace the ledger rows of the given traders (all by default) by the replayed ones, in one commit."""
+    if trader_ids is None:
+        trader_ids = [trader_id for trader_id, in session.query(Trader.id)]
+    for trader_id in trader_ids:
+        replayed = replay_positions(session, trader_id)
+        session.query(Position).filter(Position.trader_id == trader_id).delete(synchronize_session=False)
+        session.add_all(replayed.values())
+    session.commit()
+
+
+def check_quantities(session, trader: Trader) -> List[str]:
+    """
+    Compare the stored quantities of a trader with its grouped BUY/SELL totals (`Trader.get_symbol_totals`):
+    one aggregate query, without replaying the history in Python. Average cost and P&L are not checked.
+    """
+    mismatches = []
+    expected = {symbol: totals["bought"] - totals["sold"] for symbol, totals in trader.get_symbol_totals(session).items()}
+    stored = dict(session.query(Position.symbol, Position.quantity).filter(Position.trader_id == trader.id))
+    for symbol in sorted(set(expected) | set(stored)):
+        if symbol not in expected or symbol not in stored:
+            mismatches.append(f"trader {trader.id} {symbol}: {'unexpected' if symbol not in expected else 'missing'} ledger row")
+        elif expected[symbol] != stored[symbol]:
+            mismatches.append(f"trader {trader.id} {symbol}: quantity is {stored[symbol]}, transactions give {expected[symbol]}")
+    return mismatches
+
+
+def verify_positions(session, quick: bool = False) -> List[str]:
+    """
+    Compare the stored ledger with a replay of the transactions, return one message per mismatch.
+    With `quick`, only the quantities are checked, against the grouped totals (see `check_quantities`).
+    """
+    mismatches = []
+    if quick:
+        for trader in session.query(Trader).order_by(Trader.id):
+            mismatches.extend(check_quantities(session, trader))
+        return mismatches
+    for trader_id, in session.query(Trader.id):
+        replayed = replay_positions(session, trader_id)
+        stored = {p.symbol: p for p in session.query(Position).filter(Position.trader_id == trader_id)}
+        for symbol in sorted(set(replayed) | set(stored)):
+            expected, actual = replayed.get(symbol), stored.get(symbol)
+            if expected is None or actual is None:
+                mismatches.append(f"trader {trader_id} {symbol}: {'unexpected' if expected is None else 'missing'} ledger row")
+                continue
+            for field in ("quantity", "average_cost", "realized_pnl"):
+                if abs(getattr(expected, field) - getattr(actual, field)) > TOLERANCE:
+                    mismatches.append(
+                        f"trader {trader_id} {symbol}: {field} is {getattr(actual, field)}, replay gives {getattr(expected, field)}"
+                    )
+    return mismatches
+
+
+def ensure_positions(session):
+    """Build the ledger once for databases that have transactions but predate it."""
+    if session.query(Position).first() is None and session.query(Transaction).first() is not None:
+        rebuild_positions(session)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("command", choices=["verify", "rebuild"])
+    parser.add_argument("--db", default="sqlite:///db.sqlite")
+    parser.add_argument("--quick", action="store_true", help="verify: check the quantities only, with grouped aggregates")
+    args = parser.parse_args()
+
+    session = get_scoped_session(args.db)
+    if args.command == "rebuild":
+        rebuild_positions(session)
+        print("Position ledger rebuilt.")
+        return 0
+
+    mismatches = verify_positions(session, args.quick)
+    for mismatch in mismatches:
+        print(mismatch)
+    print(f"{len(mismatches)} mismatch(es).")
+    return 1 if mismatches else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,230 @@
+"""
+Async client of OpenAI compatible chat completion APIs, used to send the
+prompts of every trader concurrently.
+
+    async with AsyncLLMClient() as client:
+        replies = await client.chat_many([messages_1, messages_2, ...])
+        async for delta in client.chat_stream(messages):
+            ...
+
+`OPENAI_BASE_URL` points it at another endpoint, e.g. the local stub
+server of `trader.llm_stub`; tests pass the stub app itself as `transport`.
+"""
+import os
+import json
+import time
+import random
+import asyncio
+import logging
+from typing import Any, AsyncIterator, Dict, List, Optional
+
+import httpx
+
+# status codes worth retrying: rate limited, or the server is temporarily unavailable
+RETRY_STATUS = {408, 409, 429, 500, 502, 503, 504}
+
+
+class TokenBucket:
+    """
+    Token bucket: `rate` requests per second on average, bursts of up to `capacity`.
+    `acquire` waits (without blocking the event loop) until a token is available.
+    """
+
+    def __init__(self, rate: float, capacity: float = None):
+        self.rate = rate
+        self.capacity = capacity if capacity is not None else max(1.0, rate)
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    async def acquire(self):
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1.0:
+                    self.tokens -= 1.0
+                    return
+                await asyncio.sleep((1.0 - self.tokens) / self.rate)
+
+
+class LLMError(Exception):
+    """A chat completion that still failed after every retry."""
+
+
+class AsyncLLMClient:
+    """
+    Chat completions over httpx with:
+    - at most `max_concurrency` requests in flight (`LLM_CONCURRENCY`)
+    - `requests_per_minute` token bucket rate limiting (`LLM_RPM`)
+    - up to `max_retries` retries of timeouts, connection errors and 408/409/429/5xx,
+      with full-jitter exponential backoff (or the server's Retry-After)
+
+    Use it as an async context manager, the HTTP connection pool lives for one `async with`.
+    `transport` replaces the network one of httpx, e.g. `httpx.ASGITransport(app=...)` in tests.
+    """
+
+    def __init__(self, base_url: str = None, api_key: str = None, model: str = "gpt-4o-mini",
+                 max_concurrency: int = None, requests_per_minute: float = None, max_retries: int = 4,
+                 backoff_base: float = 0.5, backoff_max: float = 20.0, timeout: float = 60.0,
+                 transport: httpx.AsyncBaseTransport = None):
+        self.base_url = (base_url or os.getenv("OPENAI_BASE_URL", "https://api.openai.com/v1")).rstrip("/")
+        self.api_key = api_key if api_key is not None else os.getenv("OPENAI_API_KEY", "")
+        self.model = model
+        self.max_concurrency = max_concurrency or int(os.getenv("LLM_CONCURRENCY", 8))
+        self.requests_per_minute = requests_per_minute or float(os.getenv("LLM_RPM", 500))
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.timeout = timeout
+        self.transport = transport
+        self.logger = logging.getLogger(__name__)
+        self._http: Optional[httpx.AsyncClient] = None
+        self._semaphore = None
+        self._bucket = None
+        self.requests = 0
+        self.retries = 0
+        self.failures = 0
+        self.latency = 0.0
+        # as billed by the provider, `cached_tokens` are the prompt tokens served from its prefix cache
+        self.prompt_tokens = 0
+        self.cached_tokens = 0
+        self.completion_tokens = 0
+
+    async def __aenter__(self) -> "AsyncLLMClient":
+        headers = {"Authorization": f"Bearer {self.api_key}"} if self.api_key else {}
+        limits = httpx.Limits(max_connections=self.max_concurrency, max_keepalive_connections=self.max_concurrency)
+        self._http = httpx.AsyncClient(base_url=self.base_url, headers=headers, timeout=self.timeout, limits=limits,
+                                       transport=self.transport)
+        self._semaphore = asyncio.Semaphore(self.max_concurrency)
+        rate = self.requests_per_minute / 60.0
+        self._bucket = TokenBucket(rate, capacity=max(1.0, min(self.max_concurrency, rate * 60)))
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self._http.aclose()
+        self._http = None
+
+    def _backoff(self, attempt: int, response: httpx.Response = None) -> float:
+        retry_after = response.headers.get("retry-after") if response is not None else None
+        if retry_after:
+            try:
+                return min(float(retry_after), self.backoff_max)
+            except ValueError:
+                pass
+        # full jitter: spreads the retries of concurrent callers hitting the same limit
+        return random.uniform(0, min(self.backoff_max, self.backoff_base * 2 ** attempt))
+
+    def _count_usage(self, usage: Dict[str, Any]):
+        self.prompt_tokens += usage.get("prompt_tokens", 0)
+        self.completion_tokens += usage.get("completion_tokens", 0)
+        self.cached_tokens += (usage.get("prompt_tokens_details") or {}).get("cached_tokens", 0)
+
+    async def chat(self, messages: List[Dict[str, str]], model: str = None, **parameters) -> str:
+        """Return the content of the first choice of a chat completion, raises LLMError once out of retries."""
+        payload = {"model": model or self.model, "messages": messages, **parameters}
+        async with self._semaphore:
+            for attempt in range(self.max_retries + 1):
+                await self._bucket.acquire()
+                self.requests += 1
+                start = time.perf_counter()
+                response = None
+                try:
+                    response = await self._http.post("/chat/completions", json=payload)
+                    if response.status_code not in RETRY_STATUS:
+                        response.raise_for_status()
+                        self.latency += time.perf_counter() - start
+                        body = response.json()
+                        self._count_usage(body.get("usage") or {})
+                        return body["choices"][0]["message"]["content"]
+                    error = f"HTTP {response.status_code}"
+                except (httpx.TimeoutException, httpx.TransportError) as e:
+                    error = f"{type(e).__name__}: {e}"
+                except httpx.HTTPStatusError as e:
+                    # 4xx other than the retryable ones: the request itself is wrong
+                    self.failures += 1
+                    raise LLMError(f"HTTP {e.response.status_code}: {e.response.text[:200]}") from e
+                if attempt == self.max_retries:
+                    break
+                self.retries += 1
+                delay = self._backoff(attempt, response)
+                self.logger.warning(f"LLM request failed ({error}), retry {attempt + 1}/{self.max_retries} in {delay:.1f}s")
+                await asyncio.sleep(delay)
+        self.failures += 1
+        raise LLMError(f"LLM request failed after {self.max_retries + 1} attempts: {error}")
+
+    async def chat_stream(self, messages: List[Dict[str, str]], model: str = None, **parameters) -> AsyncIterator[str]:
+        """
+        Stream the content of a chat completion (server-sent events), delta by delta.
+        Failures before the first delta are retried like `chat`; once content has been
+        handed out the request is never re-issued, an error raises LLMError. Closing the
+        generator (`aclose`) closes the response, which cancels the generation.
+        """
+        payload = {"model": model or self.model, "messages": messages, "stream": True,
+                   "stream_options": {"include_usage": True}, **parameters}
+        streamed = False
+        async with self._semaphore:
+            for attempt in range(self.max_retries + 1):
+                await self._bucket.acquire()
+                self.requests += 1
+                start = time.perf_counter()
+                response = None
+                try:
+                    async with self._http.stream("POST", "/chat/completions", json=payload) as response:
+                        if response.status_code not in RETRY_STATUS:
+                            if response.is_error:
+                                await response.aread()
+                                self.failures += 1
+                                raise LLMError(f"HTTP {response.status_code}: {response.text[:200]}")
+                            async for line in response.aiter_lines():
+                                if not line.startswith("data:"):
+                                    continue
+                                data = line[len("data:"):].strip()
+                                if data == "[DONE]":
+                                    break
+                                event = json.loads(data)
+                                self._count_usage(event.get("usage") or {})
+                                for choice in event.get("choices") or []:
+                                    content = (choice.get("delta") or {}).get("content")
+                                    if content:
+                                        streamed = True
+                                        yield content
+                            self.latency += time.perf_counter() - start
+                            return
+                    error = f"HTTP {response.status_code}"
+                except (httpx.TimeoutException, httpx.TransportError) as e:
+                    if streamed:
+                        self.failures += 1
+                        raise LLMError(f"Stream interrupted: {type(e).__name__}: {e}") from e
+                    error = f"{type(e).__name__}: {e}"
+                if attempt == self.max_retries:
+                    break
+                self.retries += 1
+                delay = self._backoff(attempt, response)
+                self.logger.warning(f"LLM request failed ({error}), retry {attempt + 1}/{self.max_retries} in {delay:.1f}s")
+                await asyncio.sleep(delay)
+        self.failures += 1
+        raise LLMError(f"LLM request failed after {self.max_retries + 1} attempts: {error}")
+
+    async def chat_many(self, conversations: List[List[Dict[str, str]]], model: str = None, **parameters) -> List[Any]:
+        """
+        Send every conversation concurrently (within the concurrency and rate limits).
+        Returns, in order, the reply of each one or the LLMError it ended with.
+        """
+        return await asyncio.gather(
+            *(self.chat(messages, model=model, **parameters) for messages in conversations),
+            return_exceptions=True,
+        )
+
+    def stats(self) -> Dict[str, Any]:
+        succeeded = self.requests - self.retries - self.failures
+        return {
+            "requests": self.requests,
+            "retries": self.retries,
+            "failures": self.failures,
+            "mean_latency": self.latency / succeeded if succeeded > 0 else 0.0,
+            "prompt_tokens": self.prompt_tokens,
+            "cached_tokens": self.cached_tokens,
+            "completion_tokens": self.completion_tokens,
+        }
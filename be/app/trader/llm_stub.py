@@ -0,0 +1,93 @@
+"""
+Local stand-in of the chat completions API for tests and benchmarks:
+answers every request with a HOLD plan after a simulated latency (as
+{"decisions": [...]} when a JSON schema is requested), streamed as
+server-sent events of `chunk` characters spread over the latency when
+asked to, and can reject a fraction of the requests (or the first few)
+with 429 to exercise the retries.
+
+In tests, run it in-process through `httpx.ASGITransport(app=create_app(...))`
+passed as the `transport` of an AsyncLLMClient.
+
+    python -m trader.llm_stub [--port 8001] [--latency 0.5] [--failure-rate 0.1]
+    OPENAI_BASE_URL=http://127.0.0.1:8001/v1 uvicorn main:app
+"""
+import json
+import time
+import random
+import asyncio
+import argparse
+from typing import Any, Dict
+
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, StreamingResponse
+
+STUB_PLAN = [{
+    "action": "HOLD",
+    "stock": "AAPL",
+    "quantity": 0,
+    "confidence": 0.5,
+    "reasoning": "Stub response",
+}]
+
+
+def create_app(latency: float = 0.5, jitter: float = 0.0, failure_rate: float = 0.0, plan=None,
+               chunk: int = 16, fail_first: int = 0, retry_after: float = None) -> FastAPI:
+    """
+    Stub app, `latency` +- uniform `jitter` seconds per request, `failure_rate` of 429 answers
+    plus the first `fail_first` requests, with a Retry-After header of `retry_after` seconds if given.
+    `plan` is the list of decisions of every reply, or a function of the request's messages returning it.
+    """
+    app = FastAPI()
+    app.state.requests = 0
+    plan = plan if plan is not None else STUB_PLAN
+
+    @app.post("/v1/chat/completions")
+    async def chat_completions(request: Request):
+        body: Dict[str, Any] = await request.json()
+        app.state.requests += 1
+        if app.state.requests <= fail_first or random.random() < failure_rate:
+            headers = {"Retry-After": str(retry_after)} if retry_after is not None else None
+            return JSONResponse({"error": {"message": "Rate limit reached (stub)"}}, status_code=429, headers=headers)
+        delay = max(0.0, latency + random.uniform(-jitter, jitter))
+        structured = (body.get("response_format") or {}).get("type") == "json_schema"
+        decisions = plan(body.get("messages") or []) if callable(plan) else plan
+        content = json.dumps({"decisions": decisions} if structured else decisions)
+        if body.get("stream"):
+            return StreamingResponse(stream(content, delay, body.get("model", "stub")), media_type="text/event-stream")
+        await asyncio.sleep(delay)
+        return {
+            "id": f"stub-{app.state.requests}",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": body.get("model", "stub"),
+            "choices": [{"index": 0, "message": {"role": "assistant", "content": content}, "finish_reason": "stop"}],
+        }
+
+    async def stream(content: str, delay: float, model: str):
+        pieces = [content[i:i + chunk] for i in range(0, len(content), chunk)]
+        for piece in pieces:
+            await asyncio.sleep(delay / len(pieces))
+            event = {"object": "chat.completion.chunk", "model": model,
+                     "choices": [{"index": 0, "delta": {"content": piece}, "finish_reason": None}]}
+            yield f"data: {json.dumps(event)}\n\n"
+        yield "data: [DONE]\n\n"
+
+    return app
+
+
+def main():
+    import uvicorn
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8001)
+    parser.add_argument("--latency", type=float, default=0.5)
+    parser.add_argument("--jitter", type=float, default=0.0)
+    parser.add_argument("--failure-rate", type=float, default=0.0)
+    parser.add_argument("--chunk", type=int, default=16, help="characters per streamed event")
+    args = parser.parse_args()
+    uvicorn.run(create_app(args.latency, args.jitter, args.failure_rate, chunk=args.chunk), host=args.host, port=args.port)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,8 +1,14 @@
 import json
-from typing import Dict, Any, List
+import time
+from typing import Dict, Any, List, AsyncIterator
 from sqlalchemy.orm import Session
 import openai
 
+from .trader import Trader
+from .risk import format_risk_metrics
+from .prompts import PromptAssembler
+from .plan_parser import PLAN_RESPONSE_FORMAT, TradeDecision, PlanExtractor, ParsedPlan, parse_plan, validate_decision
+
 # -----------------------------
 #    STRATEGY PROMPTS (MODES)
 # -----------------------------
@@ -74,13 +80,13 @@ Maintain a balanced approach while protecting and growing capital efficiently.""
 # Additional prompt to ensure the response is valid JSON
 OUTPUT_FORMAT_PROMPT = """
 Return valid JSON following this exact format:
-[{
+{"decisions": [{
     "action": "BUY|SELL|HOLD",
     "stock": "SYMBOL",
     "quantity": NUMBER,
     "confidence": FLOAT,  # 0.0 to 1.0
     "reasoning": "Brief explanation including position sizing rationale"
-}]
+}]}
 
 Consider in your decisions:
 1. Current portfolio holdings and values
@@ -94,6 +100,11 @@ Consider in your decisions:
 THIS FORMAT IS MANDATORY. Dont mention anything else in the response. it s imperative to follow the format. dont add the formatting in the response. just the json object.
 """
 
+def with_status(thoughts: List[Dict[str, Any]], status: str) -> List[Dict[str, Any]]:
+    """The thoughts of a plan with its outcome (`trader.THOUGHT_STATUSES`), a thought's own status kept."""
+    return [{"status": status, **thought} for thought in thoughts]
+
+
 class LLMTrader:
     """
     A lightweight class that uses OpenAI to propose trading decisions
@@ -112,6 +123,8 @@ class LLMTrader:
                      Defaults to "ideal" if an invalid mode is provided.
         """
         self.trader = trader
+        # the ORM instance belongs to the caller's session, decisions may run in another thread/session
+        self.trader_id = trader.id
         import os
         self.openai_api_key = os.getenv("OPENAI_API_KEY", "")
         # If the user specifies an invalid mode, default to "ideal"
@@ -119,190 +132,115 @@ class LLMTrader:
         self.model = "gpt-4o-mini"  # Example model name (adjust if needed)
 
     # ------------------------------------------------------------------------
-    #    PROMPT BUILDERS - Combine portfolio, sentiment, and forecast data
+    #    PROMPT BUILDERS - Shared market block first, per-trader deltas after
     # ------------------------------------------------------------------------
-    
-    def _process_portfolio_data(self, context: Dict[str, Any]) -> str:
-        """
-        Format portfolio data (equity, holdings, realized profit) into
-        a clear, structured string for the LLM prompt.
-
-        :param context: A dictionary that should contain:
-                        - total_equity
-                        - current_balance
-                        - portfolio_value
-                        - realized_profit
-                        - holdings (dict)
-                        - holdings_value (dict)
-                        - realized_profit_by_stock (dict)
-        :return: A string summarizing portfolio details.
-        """
-        return context
 
-    def _process_sentiment_data(self, context: Dict[str, Any]) -> str:
+    @staticmethod
+    def shared_prompt(market_data: Dict[str, float], context: Dict[str, Any]) -> PromptAssembler:
         """
-        Format sentiment data (Reddit, News, etc.) into a clear, structured string.
-
-        :param context: A dictionary that may contain:
-                        - sentiment_analysis -> {
-                            "reddit": {symbol: {...}},
-                            "news":   {symbol: {...}}
-                          }
-        :return: A string summarizing sentiment analysis.
-        """
-        return context
-        reddit = context.get('sentiment_analysis', {}).get('reddit', {})
-        news = context.get('sentiment_analysis', {}).get('news', {})
-
-        lines = ["\nSentiment Analysis:"]
-        for symbol, reddit_data in reddit.items():
-            news_data = news.get(symbol, {})
-
-            lines.append(f"\n{symbol}:")
-            lines.append("Social Sentiment:")
-            lines.append(f"- Posts: {reddit_data.get('total_posts', 0)}")
-            lines.append(f"- Avg Score: {reddit_data.get('average_compound_score', 0):.3f}")
-            cstats = reddit_data.get('comment_statistics', {})
-            lines.append(f"- Comments: +{cstats.get('positive_comments', 0)} / -{cstats.get('negative_comments', 0)}")
-
-            if news_data:
-                lines.append("News Sentiment:")
-                lines.append(f"- Articles: {news_data.get('total_articles', 0)}")
-                lines.append(f"- Confidence: {float(news_data.get('average_confidence', 0)):.3f}")
-
-        return "\n".join(lines)
+        Prompts of one decision cycle: market data, sentiment and forecasts are
+        rendered once, with the output format, into the message every trader shares.
 
-    def _process_forecast_data(self, forecast_str: str) -> str:
+        :param market_data: Mapping of {stock_symbol -> current_price}.
+        :param context: Dictionary containing sentiment_analysis, forecast, etc.
         """
-        Format the forecast data (as plain text) into a structured summary.
+        return PromptAssembler(market_data, context, instructions=OUTPUT_FORMAT_PROMPT)
 
-        :param forecast_str: Multi-line string containing forecast info.
-        :return: A string summarizing price predictions by stock.
-        """
-        sections = forecast_str.split('\n\n')
-        processed = ["\nPrice Forecasts:"]
-
-        for section in sections:
-            section = section.strip()
-            if not section:
-                continue
-            lines = section.split('\n')
-            stock = lines[0].replace(':', '').strip()
-            if not stock:
-                continue
-
-            processed.append(f"\n{stock}:")
-
-            # For demonstration, we assume lines 2-3 are short-term LSTM/MLP
-            # and lines 5-6 are long-term LSTM/MLP, as in your example structure.
-            if 'next 7 hours' in section.lower() and len(lines) >= 4:
-                # short-term forecast
-                lstm_hours = [float(x) for x in lines[2].split(':')[1].split()]
-                mlp_hours = [float(x) for x in lines[3].split(':')[1].split()]
-                processed.append("Short-term (7h):")
-                processed.append(f"- LSTM: {lstm_hours[0]:.2f} → {lstm_hours[-1]:.2f}")
-                processed.append(f"- MLP: {mlp_hours[0]:.2f} → {mlp_hours[-1]:.2f}")
-
-            if 'next 7 days' in section.lower() and len(lines) >= 7:
-                # long-term forecast
-                lstm_days = [float(x) for x in lines[5].split(':')[1].split()]
-                mlp_days = [float(x) for x in lines[6].split(':')[1].split()]
-                processed.append("Long-term (7d):")
-                processed.append(f"- LSTM: {lstm_days[0]:.2f} → {lstm_days[-1]:.2f}")
-                processed.append(f"- MLP: {mlp_days[0]:.2f} → {mlp_days[-1]:.2f}")
-
-        return "\n".join(processed)
-
-    def _build_prompt(self, market_data: Dict[str, float], context: Dict[str, Any]) -> str:
+    def _build_delta(self, stats: Dict[str, Any], portfolio_str: str, risk_metrics: Dict[str, Any] = None) -> str:
         """
-        Create a single prompt string by combining the strategy prompt (mode),
-        market data (prices), portfolio info, sentiment analysis, and forecast data.
+        The part of the prompt specific to this trader: strategy (mode), portfolio and risk metrics.
 
-        :param market_data: Mapping of {stock_symbol -> current_price}.
-        :param context: Dictionary containing:
-                        - total_equity, current_balance, portfolio_value, realized_profit
-                        - holdings, holdings_value, realized_profit_by_stock
-                        - sentiment_analysis, forecast, etc.
-        :return: A large text prompt to be passed to OpenAI.
+        :param stats: The trader's `Trader.get_performance_stats`.
+        :param portfolio_str: Its encoded portfolio block.
+        :param risk_metrics: This trader's entry of `risk.portfolio_risk` (optional).
         """
-        # 1. Strategy text
-        base_prompt = MODES[self.mode]
-
-        # 2. Current prices
-        prices_str = "\nCurrent Prices:\n" + "\n".join(
-            f"- {sym}: ${float(price):.2f}"
-            for sym, price in market_data.items()
+        risk_metrics_str = (
+            format_risk_metrics(risk_metrics, stats.get('realized_profit_by_stock')) if risk_metrics else ""
         )
-
-        # 3. Portfolio info, sentiment, forecast
-        portfolio_str = self._process_portfolio_data(context)
-        sentiment_str = self._process_sentiment_data(context)
-        forecast_str = self._process_forecast_data(context.get('forecast', ''))
-
-        # 4. Risk metrics (example: show each stock’s share of total_equity)
-        # risk_metrics = "\nRisk Metrics:"
-        # total_equity = float(context['total_equity'])
-        # for symbol, value in context.get('holdings_value', {}).items():
-        #     position_size = float(value)
-        #     position_risk = (position_size / total_equity) * 100
-        #     realized_pnl = float(context.get('realized_profit_by_stock', {}).get(symbol, 0))
-        #     risk_metrics += (
-        #         f"\n- {symbol}: {position_risk:.1f}% of portfolio, "
-        #         f"Realized P/L: ${realized_pnl:,.2f}"
-        #     )
-
-        # 5. Construct final combined prompt
-        final_prompt = (
-            f"{base_prompt}\n\n"
-            "Market Context:\n"
-            f"{prices_str}\n"
+        return (
+            f"Your strategy:\n{MODES[self.mode]}\n\n"
             f"{portfolio_str}\n"
-            # f"{risk_metrics}\n"
-            f"{sentiment_str}\n"
-            f"{forecast_str}\n\n"
-            f"{OUTPUT_FORMAT_PROMPT}"
+            f"{risk_metrics_str}\n\n"
+            "Analyze the provided data and generate trading decisions. "
+            "Consider portfolio balance, risk management, and position sizing."
         )
-        return final_prompt
+
+    def portfolio_stats(self, session: Session, market_data: Dict[str, float]) -> Dict[str, Any]:
+        """The trader's `Trader.get_performance_stats` at `market_data` prices, as seen by `session`."""
+        return session.get(Trader, self.trader_id).get_performance_stats(session, market_data)
+
+    def build_messages(
+        self,
+        session: Session,
+        market_data: Dict[str, float],
+        context: Dict[str, Any],
+        risk_metrics: Dict[str, Any] = None,
+        prompts: PromptAssembler = None,
+        stats: Dict[str, Any] = None
+    ) -> List[Dict[str, str]]:
+        """
+        Chat messages of this trader's decision: the cycle's shared market message,
+        then this trader's delta. Token counts are recorded in `prompts`.
+
+        :param session: Session to read the trader's portfolio with.
+        :param market_data: Mapping of {stock_symbol -> current_price}.
+        :param context: Dictionary containing sentiment_analysis, forecast, etc.
+        :param risk_metrics: This trader's entry of `risk.portfolio_risk` (optional).
+        :param prompts: The cycle's PromptAssembler, built for this trader alone if omitted.
+        :param stats: The trader's `portfolio_stats` when already read.
+        :return: The messages to send to the chat completion API.
+        """
+        prompts = prompts or self.shared_prompt(market_data, context)
+        stats = stats or self.portfolio_stats(session, market_data)
+        portfolio_str = prompts.portfolio(self.trader_id, stats)
+        return prompts.messages(self.trader_id, self._build_delta(stats, portfolio_str, risk_metrics))
 
     # ------------------------------------------------------------------------
     #       OPENAI API CALL
     # ------------------------------------------------------------------------
     
-    def _call_openai_api(self, prompt: str) -> str:
+    @staticmethod
+    def fallback_plan(reason: str = "API error occurred") -> str:
+        """JSON plan that does nothing, used when the API call failed."""
+        return json.dumps([{
+            "action": "HOLD",
+            "stock": "ERROR",
+            "quantity": 0,
+            "confidence": 0.0,
+            "reasoning": reason
+        }])
+
+    def request_plan(self, messages: List[Dict[str, str]]) -> str:
         """
         Make the actual request to OpenAI using a ChatCompletion call.
-        Returns the raw text from OpenAI, which should be valid JSON.
+        Returns the raw text from OpenAI, which should be valid JSON. Raises on API errors.
 
-        :param prompt: The full text prompt to send to the model.
+        :param messages: The chat messages of `build_messages`.
         :return: The model's raw response content (expected to be JSON).
         """
         openai.api_key = self.openai_api_key
+        response = openai.ChatCompletion.create(
+            model=self.model,
+            messages=messages,
+            temperature=0.4,
+            response_format=PLAN_RESPONSE_FORMAT,
+        )
+        print(f"[LLMTrader] OpenAI response: {response.choices[0].message['content']}")
+        return response.choices[0].message["content"]
 
+    def _call_openai_api(self, messages: List[Dict[str, str]]) -> str:
+        """
+        `request_plan`, with the fallback plan (do nothing) on API errors.
+
+        :param messages: The chat messages of `build_messages`.
+        :return: The model's raw response content (expected to be JSON).
+        """
         try:
-            response = openai.ChatCompletion.create(
-                model=self.model,
-                messages=[
-                    {"role": "system", "content": prompt},
-                    {"role": "user", "content": (
-                        "Analyze the provided data and generate trading decisions. "
-                        "Consider portfolio balance, risk management, and position sizing. "
-                    )}
-                ],
-                temperature=0.4,
-            )
-            print(f"[LLMTrader] OpenAI response: {response.choices[0].message['content']}")
-            return response.choices[0].message["content"]
+            return self.request_plan(messages)
         except Exception as e:
             # On API error, return a fallback JSON plan that does nothing
             print(f"[LLMTrader] OpenAI API error: {e}")
-            fallback = [{
-                "action": "HOLD",
-                "stock": "ERROR",
-                "quantity": 0,
-                "confidence": 0.0,
-                "reasoning": "API error occurred"
-            }]
-            return json.dumps(fallback)
+            return self.fallback_plan()
 
     # ------------------------------------------------------------------------
     #       MAIN ENTRY POINT: DECISION & EXECUTION
@@ -312,79 +250,197 @@ class LLMTrader:
         self,
         session: Session,
         market_data: Dict[str, float],
-        context: Dict[str, Any]
-    ) -> None:
+        context: Dict[str, Any],
+        risk_metrics: Dict[str, Any] = None,
+        plan_json: str = None,
+        prompts: PromptAssembler = None
+    ) -> List[Dict[str, Any]]:
         """
-        1. Build an LLM prompt from the strategy, market data, and context.
+        1. Build the LLM messages: the cycle's shared market context, then this
+           trader's strategy, portfolio and risk metrics.
         2. Call OpenAI to get a JSON plan (list of trade actions).
-        3. Parse and execute the plan using the underlying Trader’s buy/sell methods,
-           subject to risk constraints (e.g., max position size).
+        3. Parse the plan (`plan_parser`: each decision validated, invalid ones dropped)
+           and execute it atomically with the underlying Trader’s `execute_plan`
+           (validated as a whole, one commit, all or nothing). Orders on symbols
+           without a price are dropped first. The thoughts are recorded either way,
+           with the plan's outcome as status.
 
         :param session: An active SQLAlchemy Session for database operations.
         :param market_data: Dict of {symbol -> current_price}.
-        :param context: Dict containing portfolio, sentiment, forecast, etc.
-                        Must include 'total_equity' at minimum.
+        :param context: Dict containing sentiment, forecast, etc.
+        :param risk_metrics: This trader's risk metrics, rendered as the prompt's Risk Metrics block.
+        :param plan_json: The model's reply when it was already obtained (e.g. by the async
+                          client of `registry.DecisionScheduler`), skips steps 1 and 2.
+        :param prompts: The cycle's PromptAssembler (`shared_prompt`), shared by all traders.
+        :return: The executed orders.
         """
-        # 1. Build prompt
-        prompt = self._build_prompt(market_data, context)
+        # Work on the trader as seen by `session`
+        self.trader = session.get(Trader, self.trader_id)
 
-        # 2. Call OpenAI to get plan in JSON form
-        plan_json = self._call_openai_api(prompt)
+        if plan_json is None:
+            # 1. Build messages
+            messages = self.build_messages(session, market_data, context, risk_metrics, prompts)
 
-        # 3. Parse the plan
-        try:
-            plan = json.loads(plan_json)
-        except json.JSONDecodeError:
-            print("[LLMTrader] Error parsing JSON response.")
-            return
+            # 2. Call OpenAI to get plan in JSON form
+            plan_json = self._call_openai_api(messages)
+
+        # 3. Parse the plan: fenced or truncated replies are repaired, invalid decisions dropped
+        plan = parse_plan(plan_json)
+        for error in plan.errors:
+            print(f"[LLMTrader] Ignored part of the reply: {error}")
 
         # total_equity = float(context['total_equity'])
         # max_position_fraction = 0.25  # e.g. max 25% of total equity in any single stock
 
-        # 4. Execute plan
-        for item in plan:
-            action = item.get("action", "HOLD").upper()
-            stock = item.get("stock")
-            quantity = item.get("quantity", 0)
-            confidence = float(item.get("confidence", 0.0))
-            reasoning = item.get("reasoning", "No reasoning provided")
-            
-            if action == "HOLD":
-                self.trader.add_thought(session, action, stock, quantity, confidence, reasoning, self.mode)
-                print(f"[LLMTrader] Decision for {stock}: HOLD")
-                
-            # Current price from market_data (fall back to 0.0 if not found)
-            current_price = float(market_data.get(stock, 0.0))
-
-            # Summarize the decision
-            print(f"\n[LLMTrader] Decision for {stock}:")
-            print(f"Action: {action} | Quantity: {quantity} | Confidence: {confidence:.2f}")
-            print(f"Price: ${current_price:.2f}")
-            print(f"Reasoning: {reasoning}")
-
-            # Fetch how many shares we currently hold (for SELL checks)
-            current_holdings = context.get('holdings', {}).get(stock, 0)
-
-            # Decide whether to buy or sell (with minimal risk checks)
-            if action == "BUY" and confidence >= 0.6:
-                future_position_value = (current_holdings + quantity) * current_price
-                try:
-                    self.trader.buy_stock(session, stock, quantity, current_price)
-                    self.trader.add_thought(session, action, stock, quantity, confidence, reasoning, self.mode)
-                    print(f"[LLMTrader] Executed BUY: {quantity} {stock} @ ${current_price:.2f}")
-                except ValueError as e:
-                    print(f"[LLMTrader] BUY failed: {e}")
-
-            elif action == "SELL" and confidence >= 0.6:
-                if quantity > current_holdings:
-                    print(f"[LLMTrader] SELL rejected: Trying to sell more than currently held.")
-                    continue
-                try:
-                    self.trader.sell_stock(session, stock, quantity, current_price)
-                    self.trader.add_thought(session, action, stock, quantity, confidence, reasoning, self.mode)
-                    print(f"[LLMTrader] Executed SELL: {quantity} {stock} @ ${current_price:.2f}")
-                except ValueError as e:
-                    print(f"[LLMTrader] SELL failed: {e}")
+        # 4. Collect the executable orders and their reasoning, then execute them as one batch
+        orders = []
+        thoughts = []
+        for decision in plan.decisions:
+            order, thought = self._to_order(decision, market_data)
+            if order is not None:
+                orders.append(order)
+            if thought is not None:
+                thoughts.append(thought)
+
+        # 5. All or nothing, in a single commit
+        try:
+            self.trader.execute_plan(session, orders, with_status(thoughts, "executed"))
+        except ValueError as e:
+            print(f"[LLMTrader] Plan rejected, nothing executed: {e}")
+            # the reasoning stays in the history, flagged as rejected
+            self.trader.add_thoughts(session, with_status(thoughts, "rejected"))
+            return []
+        for order in orders:
+            print(f"[LLMTrader] Executed {order['action']}: {order['quantity']} {order['stock']} @ ${order['price']:.2f}")
+        return orders
+
+    def _to_order(self, decision: TradeDecision, market_data: Dict[str, float]):
+        """
+        The order (None unless a confident BUY/SELL of a symbol of `market_data`) and the thought
+        to record (None for low confidence decisions) of one validated decision.
+        """
+        action, stock, quantity = decision.action, decision.stock, decision.quantity
+        confidence, reasoning = decision.confidence, decision.reasoning
+        thought = {"action": action, "stock": stock, "quantity": quantity,
+                   "confidence": confidence, "reasoning": reasoning, "mode": self.mode}
+
+        if action == "HOLD":
+            print(f"[LLMTrader] Decision for {stock}: HOLD")
+            return None, thought
+
+        # Current price from market_data: no order without one, the rest of the plan still goes through
+        current_price = float(market_data.get(stock) or 0.0)
+        if current_price <= 0:
+            print(f"[LLMTrader] No price for {stock}, {action} order dropped.")
+            return None, {**thought, "status": "skipped"}
+
+        # Summarize the decision
+        print(f"\n[LLMTrader] Decision for {stock}:")
+        print(f"Action: {action} | Quantity: {quantity} | Confidence: {confidence:.2f}")
+        print(f"Price: ${current_price:.2f}")
+        print(f"Reasoning: {reasoning}")
+
+        # Balance and holdings are checked by Trader.execute_plan
+        if action in ("BUY", "SELL") and confidence >= 0.6:
+            return {"action": action, "stock": stock, "quantity": quantity, "price": current_price}, thought
+        print(f"[LLMTrader] No action taken for {stock} (confidence too low).")
+        return None, None
+
+    async def run_streaming(
+        self,
+        session,
+        market_data: Dict[str, float],
+        chunks: AsyncIterator[str],
+        cancel_on_invalid: bool = True
+    ) -> Dict[str, Any]:
+        """
+        Execute a plan while it streams: each decision is validated as soon as its JSON object
+        is complete, and its order applied right away (`Trader.apply_order`) inside one open
+        transaction, on the balance and positions left by the previous ones. The transaction
+        is committed, with the thoughts, once the reply is complete. A decision failing
+        validation, or an order that could not be executed, cancels the stream (the provider
+        stops generating) and rolls back everything the plan had executed, its thoughts
+        are then recorded as rejected.
+
+        :param session: A scoped_session. The stream uses a private session of its factory:
+                        its transaction stays open across awaits, while the event loop shares
+                        the thread's scoped session with the other traders' streams.
+        :param market_data: Dict of {symbol -> current_price}.
+        :param chunks: The reply's text deltas, e.g. `AsyncLLMClient.chat_stream`.
+        :param cancel_on_invalid: Cancel the plan at the first invalid decision, else skip it.
+        :return: Timings since the call (first_token, first_action: first order executed, total),
+                 executed orders, the reply text and the cancellation reason if any.
+        """
+        start = time.perf_counter()
+        extractor = PlanExtractor()
+        result = {"first_token": None, "first_action": None, "orders": [], "decisions": 0, "cancelled": None}
+        orders, thoughts = [], []
+        stream_session = session.session_factory()
+        # SQLite has a single writer: flushing would hold the database lock until the end of
+        # the stream and stall every other trader, the trades stay in the unit of work until commit
+        flush = stream_session.get_bind().dialect.name != "sqlite"
+        trader = self.trader = stream_session.get(Trader, self.trader_id)
+
+        def execute(item) -> bool:
+            """Validate and execute one decision object, False when the plan is cancelled."""
+            plan = ParsedPlan()
+            validate_decision(item, plan)
+            if plan.errors:
+                print(f"[LLMTrader] Ignored part of the reply: {plan.errors[0]}")
+                if cancel_on_invalid:
+                    result["cancelled"] = plan.errors[0]
+                return not cancel_on_invalid
+            result["decisions"] += 1
+            order, thought = self._to_order(plan.decisions[0], market_data)
+            if thought is not None:
+                thoughts.append(thought)
+            if order is None:
+                return True
+            try:
+                with stream_session.no_autoflush:
+                    trader.apply_order(stream_session, order)
+                if flush:
+                    stream_session.flush()
+            except ValueError as e:
+                print(f"[LLMTrader] Plan rejected, {len(orders)} executed order(s) rolled back: {e}")
+                result["cancelled"] = str(e)
+                return False
+            orders.append(order)
+            if result["first_action"] is None:
+                result["first_action"] = time.perf_counter() - start
+            print(f"[LLMTrader] Executed {order['action']}: {order['quantity']} {order['stock']} @ ${order['price']:.2f}")
+            return True
 
+        try:
+            try:
+                async for chunk in chunks:
+                    if result["first_token"] is None:
+                        result["first_token"] = time.perf_counter() - start
+                    if not all(execute(item) for item in extractor.feed(chunk)):
+                        break
+                else:
+                    # a lone decision object only completes with the reply
+                    all(execute(item) for item in extractor.close())
+                    for error in extractor.errors:
+                        print(f"[LLMTrader] Ignored part of the reply: {error}")
+            finally:
+                # closes the HTTP response when cancelled: the provider stops generating
+                await chunks.aclose()
+            if result["cancelled"] is None:
+                # all or nothing: the executed orders and the thoughts in a single commit
+                trader.add_thoughts(stream_session, with_status(thoughts, "executed"), commit=False)
+                stream_session.commit()
+                result["orders"] = orders
             else:
-                print(f"[LLMTrader] No action taken for {stock} (confidence too low or HOLD).")
+                stream_session.rollback()
+                trader.add_thoughts(stream_session, with_status(thoughts, "rejected"))
+        except BaseException:
+            stream_session.rollback()
+            raise
+        finally:
+            stream_session.close()
+        if result["cancelled"] is not None:
+            result["first_action"] = None
+        result["total"] = time.perf_counter() - start
+        result["reply"] = extractor.buffer
+        return result
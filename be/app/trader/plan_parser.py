@@ -0,0 +1,171 @@
+"""
+Parsing and validation of the LLM trading plans.
+
+Chat completions are requested with the `PLAN_RESPONSE_FORMAT` JSON schema
+(structured outputs), so a compliant provider always answers {"decisions": [...]}. Other
+replies (a bare list, markdown fences, text around the JSON, a reply cut
+short) still go through `PlanExtractor`, which picks every complete decision
+object out of the text as it arrives. Each decision is validated by
+`TradeDecision`: an invalid item is dropped, never the whole plan, and the
+call is never re-issued.
+"""
+import json
+from dataclasses import dataclass, field
+from typing import Any, Dict, Iterable, List, Literal
+
+from pydantic import BaseModel, Field, ValidationError, field_validator
+
+
+class TradeDecision(BaseModel):
+    action: Literal["BUY", "SELL", "HOLD"]
+    stock: str = Field(min_length=1)
+    quantity: int = Field(default=0, ge=0)
+    confidence: float = Field(default=0.0, ge=0.0, le=1.0)
+    reasoning: str = "No reasoning provided"
+
+    @field_validator("action", "stock", mode="before")
+    @classmethod
+    def _upper(cls, value):
+        return value.strip().upper() if isinstance(value, str) else value
+
+
+# OpenAI structured outputs: strict schemas need every property required and no extra ones
+PLAN_RESPONSE_FORMAT = {
+    "type": "json_schema",
+    "json_schema": {
+        "name": "trade_plan",
+        "strict": True,
+        "schema": {
+            "type": "object",
+            "properties": {
+                "decisions": {
+                    "type": "array",
+                    "items": {
+                        "type": "object",
+                        "properties": {
+                            "action": {"type": "string", "enum": ["BUY", "SELL", "HOLD"]},
+                            "stock": {"type": "string"},
+                            "quantity": {"type": "integer"},
+                            "confidence": {"type": "number"},
+                            "reasoning": {"type": "string"},
+                        },
+                        "required": ["action", "stock", "quantity", "confidence", "reasoning"],
+                        "additionalProperties": False,
+                    },
+                },
+            },
+            "required": ["decisions"],
+            "additionalProperties": False,
+        },
+    },
+}
+
+
+class PlanExtractor:
+    """
+    Incremental extractor of the decision objects of a reply: `feed` the text
+    (whole, or chunk by chunk while it streams) and get back every object that
+    completed inside a JSON array. Text outside the JSON (fences, comments) is
+    skipped, and an object left open when the reply ends is dropped by `close`.
+    """
+
+    def __init__(self):
+        self.buffer = ""
+        self.position = 0
+        self.stack: List[str] = []
+        self.in_string = False
+        self.escape = False
+        self.item_start = None
+        self.items = 0
+        self.errors: List[str] = []
+
+    def feed(self, chunk: str) -> List[Dict[str, Any]]:
+        self.buffer += chunk
+        completed = []
+        text = self.buffer
+        for i in range(self.position, len(text)):
+            char = text[i]
+            if self.in_string:
+                if self.escape:
+                    self.escape = False
+                elif char == "\\":
+                    self.escape = True
+                elif char == '"':
+                    self.in_string = False
+                continue
+            if char == '"' and self.stack:
+                self.in_string = True
+            elif char in "[{":
+                if char == "{" and self.stack and self.stack[-1] == "[" and self.item_start is None:
+                    self.item_start = i
+                self.stack.append(char)
+            elif char in "]}" and self.stack:
+                self.stack.pop()
+                if char == "}" and self.item_start is not None and (not self.stack or self.stack[-1] == "["):
+                    item = self._load(text[self.item_start:i + 1])
+                    self.item_start = None
+                    if item is not None:
+                        completed.append(item)
+        self.position = len(text)
+        return completed
+
+    def _load(self, text: str):
+        try:
+            item = json.loads(text)
+        except json.JSONDecodeError as e:
+            self.errors.append(f"unreadable decision ({e.msg})")
+            return None
+        self.items += 1
+        return item
+
+    def close(self) -> List[Dict[str, Any]]:
+        """End of the reply: a lone decision object (no array) is returned, a truncated item dropped."""
+        if self.items == 0 and self.buffer.strip():
+            # e.g. {"action": ...} on its own
+            start = self.buffer.find("{")
+            if start >= 0:
+                try:
+                    item, _ = json.JSONDecoder().raw_decode(self.buffer[start:])
+                    if isinstance(item, dict) and "action" in item:
+                        self.items += 1
+                        return [item]
+                except json.JSONDecodeError:
+                    pass
+        if self.item_start is not None:
+            self.errors.append("truncated decision dropped")
+        return []
+
+
+@dataclass
+class ParsedPlan:
+    decisions: List[TradeDecision] = field(default_factory=list)
+    errors: List[str] = field(default_factory=list)
+
+
+def validate_decision(item: Any, plan: ParsedPlan):
+    """Append `item` to `plan.decisions` if it is a valid TradeDecision, else record why in `plan.errors`."""
+    try:
+        plan.decisions.append(TradeDecision.model_validate(item))
+    except ValidationError as e:
+        details = "; ".join(f"{'.'.join(map(str, error['loc'])) or 'item'}: {error['msg']}" for error in e.errors())
+        plan.errors.append(f"invalid decision {item!r}: {details}")
+
+
+def parse_plan(reply: str) -> ParsedPlan:
+    """Every valid decision of a reply, whatever its wrapping (see `PlanExtractor`)."""
+    plan = ParsedPlan()
+    for item in iter_plan_items([reply or ""], plan.errors):
+        validate_decision(item, plan)
+    if not plan.decisions and not plan.errors:
+        plan.errors.append("no decision found in the reply")
+    return plan
+
+
+def iter_plan_items(chunks: Iterable[str], errors: List[str] = None):
+    """Yield the decision objects of a reply given as chunks, as soon as each one is complete."""
+    extractor = PlanExtractor()
+    for chunk in chunks:
+        yield from extractor.feed(chunk)
+    yield from extractor.close()
+    if errors is not None:
+        errors.extend(extractor.errors)
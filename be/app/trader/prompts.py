@@ -0,0 +1,204 @@
+"""
+Prompt assembly of the decision cycle.
+
+The market context (prices, sentiment, forecasts) is the same for every
+trader: `PromptAssembler` encodes it once per cycle (`context_encoder`) into
+the first message,
+byte for byte identical across traders, and each trader only appends its
+strategy, portfolio and risk deltas in a second message. Providers caching
+prompt prefixes (OpenAI: prompts of 1024+ tokens) then bill the shared part
+at the cached rate for every trader after the first.
+"""
+import json
+import threading
+from typing import Any, Dict, List
+
+try:
+    import tiktoken
+except ImportError:
+    tiktoken = None
+
+SHARED_INSTRUCTIONS = """You are one of several trading agents managing a stock portfolio.
+The market context below is shared by all agents, your strategy, portfolio and risk metrics follow in the next message.
+"""
+
+# tokens added by the chat format: per message, and to prime the reply
+TOKENS_PER_MESSAGE = 3
+TOKENS_PER_REPLY = 3
+
+_encodings = {}
+
+
+def _encoding(model: str):
+    if model not in _encodings:
+        try:
+            _encodings[model] = tiktoken.encoding_for_model(model)
+        except KeyError:
+            _encodings[model] = tiktoken.get_encoding("o200k_base")
+    return _encodings[model]
+
+
+def count_tokens(text: str, model: str = "gpt-4o-mini") -> int:
+    """Tokens of `text` with tiktoken when installed, else estimated (~4 characters per token)."""
+    if tiktoken is not None:
+        return len(_encoding(model).encode(text))
+    return (len(text) + 3) // 4
+
+
+def count_message_tokens(messages: List[Dict[str, str]], model: str = "gpt-4o-mini") -> int:
+    """Input tokens of a chat completion request made of `messages`."""
+    return sum(TOKENS_PER_MESSAGE + count_tokens(m["content"], model) for m in messages) + TOKENS_PER_REPLY
+
+
+# ----------------------------------------------------------------------------
+#    BLOCKS
+# ----------------------------------------------------------------------------
+
+def format_prices(market_data: Dict[str, float]) -> str:
+    return "\nCurrent Prices:\n" + "\n".join(
+        f"- {symbol}: ${float(price):.2f}" for symbol, price in sorted(market_data.items())
+    )
+
+
+def format_sentiment(sentiment: Dict[str, Any]) -> str:
+    """Sentiment analysis (reddit / news per symbol), keys sorted so the text is stable across cycles."""
+    if not sentiment:
+        return ""
+    return "\nSentiment Analysis:\n" + json.dumps(sentiment, sort_keys=True, default=str)
+
+
+def format_forecasts(forecast_str: str) -> str:
+    """
+    Summarize the forecast text of `Predictor.forcast_and_format` by stock:
+    first and last predicted price of the LSTM and MLP models, short and long term.
+    """
+    processed = ["\nPrice Forecasts:"]
+
+    for section in forecast_str.split('\n\n'):
+        section = section.strip()
+        if not section:
+            continue
+        lines = section.split('\n')
+        stock = lines[0].replace(':', '').strip()
+        if not stock:
+            continue
+
+        processed.append(f"\n{stock}:")
+
+        # lines 2-3 are the short-term LSTM/MLP forecasts, lines 5-6 the long-term ones
+        if 'next 7 hours' in section.lower() and len(lines) >= 4:
+            lstm_hours = [float(x) for x in lines[2].split(':')[1].split()]
+            mlp_hours = [float(x) for x in lines[3].split(':')[1].split()]
+            processed.append("Short-term (7h):")
+            processed.append(f"- LSTM: {lstm_hours[0]:.2f} → {lstm_hours[-1]:.2f}")
+            processed.append(f"- MLP: {mlp_hours[0]:.2f} → {mlp_hours[-1]:.2f}")
+
+        if 'next 7 days' in section.lower() and len(lines) >= 7:
+            lstm_days = [float(x) for x in lines[5].split(':')[1].split()]
+            mlp_days = [float(x) for x in lines[6].split(':')[1].split()]
+            processed.append("Long-term (7d):")
+            processed.append(f"- LSTM: {lstm_days[0]:.2f} → {lstm_days[-1]:.2f}")
+            processed.append(f"- MLP: {mlp_days[0]:.2f} → {mlp_days[-1]:.2f}")
+
+    return "\n".join(processed)
+
+
+def format_portfolio(stats: Dict[str, Any]) -> str:
+    """Verbose portfolio block of one trader from `Trader.get_performance_stats`."""
+    lines = ["\nPortfolio:"]
+    lines.append(f"- Total equity: ${stats['total_equity']:,.2f} (cash ${stats['current_balance']:,.2f}, "
+                 f"stocks ${stats['portfolio_value']:,.2f})")
+    lines.append(f"- Realized P/L: ${stats['realized_profit']:,.2f}, unrealized P/L: ${stats['unrealized_profit']:,.2f}")
+    for symbol, quantity in sorted(stats["holdings"].items()):
+        lines.append(f"- {symbol}: {quantity} shares, ${stats['holdings_value'][symbol]:,.2f}, "
+                     f"unrealized P/L ${stats['unrealized_profit_by_stock'].get(symbol, 0.0):,.2f}")
+    realized = {s: p for s, p in stats["realized_profit_by_stock"].items() if p and s not in stats["holdings"]}
+    for symbol, profit in sorted(realized.items()):
+        lines.append(f"- {symbol}: closed, realized P/L ${profit:,.2f}")
+    return "\n".join(lines)
+
+
+def render_market_block(market_data: Dict[str, float], context: Dict[str, Any]) -> str:
+    """Verbose Market Context block, the baseline `context_encoder` is measured against."""
+    return (
+        "Market Context:\n"
+        f"{format_prices(market_data)}\n"
+        f"{format_sentiment(context.get('sentiment_analysis'))}\n"
+        f"{format_forecasts(context.get('forecast', ''))}\n"
+    )
+
+
+# ----------------------------------------------------------------------------
+#    ASSEMBLER
+# ----------------------------------------------------------------------------
+
+class PromptAssembler:
+    """
+    One decision cycle's prompts: the shared message is built once, `messages`
+    appends a trader's delta and records its token counts for `report`.
+
+    :param market_data: Mapping of {stock_symbol -> current_price}.
+    :param context: The cycle context (sentiment_analysis, forecast, ...).
+    :param instructions: Output format instructions, part of the shared message.
+    :param encoder: `context_encoder.ContextEncoder` of the market and portfolio blocks.
+    """
+
+    def __init__(self, market_data: Dict[str, float], context: Dict[str, Any], instructions: str = "",
+                 model: str = "gpt-4o-mini", encoder=None):
+        # imported here, context_encoder depends on this module
+        from .context_encoder import ContextEncoder
+        self.model = model
+        self.encoder = encoder or ContextEncoder(model=model)
+        self.market = self.encoder.encode_market(market_data, context)
+        self.shared_message = {
+            "role": "system",
+            "content": f"{SHARED_INSTRUCTIONS}\n{instructions}\nMarket Context:\n{self.market.text}\n",
+        }
+        self.shared_tokens = count_message_tokens([self.shared_message], model) - TOKENS_PER_REPLY
+        self.prompt_tokens: Dict[Any, int] = {}
+        self.portfolios: Dict[Any, Any] = {}
+        self._lock = threading.Lock()
+
+    def portfolio(self, key, stats: Dict[str, Any]) -> str:
+        """Encoded portfolio block of the trader `key` from its `Trader.get_performance_stats`."""
+        encoded = self.encoder.encode_portfolio(stats)
+        with self._lock:
+            self.portfolios[key] = encoded
+        return encoded.text
+
+    def messages(self, key, delta: str) -> List[Dict[str, str]]:
+        """Messages of the trader `key` (e.g. its id): the shared message, then `delta`."""
+        messages = [self.shared_message, {"role": "user", "content": delta}]
+        tokens = self.shared_tokens + count_message_tokens(messages[1:], self.model)
+        with self._lock:
+            self.prompt_tokens[key] = tokens
+        return messages
+
+    def report(self) -> Dict[str, Any]:
+        """
+        Input tokens of the cycle: per prompt, the shared prefix, and how many of the
+        total are repeats of the prefix (billed at the cached rate when the provider caches it).
+        `context` compares the encoded market and portfolio blocks to their verbose rendering.
+        """
+        with self._lock:
+            tokens = dict(self.prompt_tokens)
+            portfolios = list(self.portfolios.values())
+        total = sum(tokens.values())
+        context = self.market.to_dict()
+        context.update(
+            tokens_before=self.market.tokens_before + sum(p.tokens_before for p in portfolios),
+            tokens_after=self.market.tokens_after + sum(p.tokens_after for p in portfolios),
+            encode_ms=(self.market.encode_time + sum(p.encode_time for p in portfolios)) * 1000,
+            market_tokens_before=self.market.tokens_before,
+            market_tokens_after=self.market.tokens_after,
+        )
+        return {
+            "tokenizer": "tiktoken" if tiktoken is not None else "estimate",
+            "prompts": len(tokens),
+            "shared_tokens": self.shared_tokens,
+            "delta_tokens": (total - self.shared_tokens * len(tokens)) / len(tokens) if tokens else 0.0,
+            "input_tokens": total,
+            "cacheable_tokens": self.shared_tokens * max(len(tokens) - 1, 0),
+            "context": context,
+            "per_prompt": tokens,
+        }
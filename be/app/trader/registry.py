@@ -0,0 +1,259 @@
+"""
+Database-backed registry of the traders and the scheduler running their
+decision cycles concurrently.
+"""
+import os
+import time
+import asyncio
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List, Tuple
+
+import numpy as np
+
+from .trader import Trader
+from .llm_trader import LLMTrader, MODES
+from .llm_client import AsyncLLMClient, LLMError
+from .decision_cache import DecisionCache
+from .plan_parser import PLAN_RESPONSE_FORMAT, parse_plan
+
+# the original five demo traders, created on first start
+DEFAULT_PROFILES = {
+    "Alice": "value",
+    "Bob": "growth",
+    "Charlie": "momentum",
+    "David": "defensive",
+    "Eve": "ideal",
+}
+DEFAULT_BALANCE = 10_000
+
+
+def default_concurrency() -> int:
+    """`DECISION_CONCURRENCY` or 8: decision cycles mostly wait on the LLM API."""
+    return int(os.getenv("DECISION_CONCURRENCY", 8))
+
+
+def seed_traders(session, profiles: Dict[str, str] = None, balance: float = DEFAULT_BALANCE):
+    """
+    Create the traders of `profiles` (name -> mode, DEFAULT_PROFILES by default) that do not exist yet,
+    and give a mode to rows created before the `mode` column (their profile, or "ideal").
+    """
+    profiles = DEFAULT_PROFILES if profiles is None else profiles
+    existing = {trader.name: trader for trader in session.query(Trader)}
+    for name, mode in profiles.items():
+        if name not in existing:
+            session.add(Trader(name=name, balance=balance, mode=mode))
+    for name, trader in existing.items():
+        if trader.mode is None:
+            trader.mode = profiles.get(name, "ideal")
+    session.commit()
+
+
+class DecisionScheduler:
+    """
+    Run the decision cycle of every registered trader.
+
+    With an `llm_client`, every prompt is sent at once on one event loop (the client
+    bounds concurrency and rate) and the plans are executed as the replies arrive:
+    the cycle takes about as long as the slowest call. Without one, up to
+    `max_concurrency` blocking cycles run in worker threads. Either way each trader
+    uses its own thread-local session from `session` (a scoped_session).
+
+    With a `cache`, traders whose prompt inputs match a recent cycle's (within its
+    tolerance) reuse the plan of that cycle instead of calling the LLM.
+
+    With `stream` (async client only), the replies are streamed and each decision
+    is executed as soon as it is parsed, in one transaction per plan committed with
+    the reply: a plan that cannot be executed cancels its stream early and is rolled
+    back (`LLMTrader.run_streaming`).
+    """
+
+    def __init__(self, session, max_concurrency: int = None, openai_api_key: str = "",
+                 llm_client: AsyncLLMClient = None, cache: DecisionCache = None, stream: bool = False):
+        self.session = session
+        self.max_concurrency = max_concurrency or default_concurrency()
+        self.openai_api_key = openai_api_key
+        self.llm_client = llm_client
+        self.cache = cache
+        self.stream = stream
+        self.logger = logging.getLogger(__name__)
+        self._llms: Dict[int, LLMTrader] = {}
+
+    def llm_trader(self, trader: Trader) -> LLMTrader:
+        """The LLMTrader of a trader, rebuilt if its mode changed."""
+        llm = self._llms.get(trader.id)
+        if llm is None or llm.mode != (trader.mode if trader.mode in MODES else "ideal"):
+            llm = self._llms[trader.id] = LLMTrader(trader, self.openai_api_key, trader.mode or "ideal")
+        return llm
+
+    def _prepare(self, llm: LLMTrader, cycle: Dict[str, Any]) -> Tuple[str, str, List[Dict[str, str]]]:
+        """Cache key and cached plan of a trader, or the messages to send when there is none."""
+        market_data = cycle["market_data"]
+        try:
+            stats = llm.portfolio_stats(self.session, market_data)
+            key = self.cache.key(llm.mode, cycle["market_key"], stats, llm.model) if self.cache is not None else None
+            plan_json = self.cache.get(key) if key is not None else None
+            messages = None
+            if plan_json is None:
+                messages = llm.build_messages(self.session, market_data, cycle["context"],
+                                              cycle["risk"].get(llm.trader_id), cycle["prompts"], stats)
+        finally:
+            # the async path shares this thread's session between coroutines, none stays open across an await
+            self.session.remove()
+        return key, plan_json, messages
+
+    def _store(self, key: str, plan_json: str):
+        # a reply without a single valid decision is not worth reusing
+        if key is not None and parse_plan(plan_json).decisions:
+            self.cache.put(key, plan_json)
+
+    def _execute(self, llm: LLMTrader, name: str, cycle: Dict[str, Any], plan_json: str) -> Dict[str, Any]:
+        start = time.perf_counter()
+        status, error, orders = "ok", None, []
+        try:
+            orders = llm.run_decision_making(session=self.session, context=cycle["context"], market_data=cycle["market_data"],
+                                    risk_metrics=cycle["risk"].get(llm.trader_id), plan_json=plan_json)
+        except Exception as e:
+            status, error = "error", str(e)
+            self.logger.exception(f"Decision cycle of {name} failed: {e}")
+        finally:
+            self.session.remove()
+        return {"trader_id": llm.trader_id, "status": status, "duration": time.perf_counter() - start, "error": error,
+                "prompt_tokens": cycle["prompts"].prompt_tokens.get(llm.trader_id), "orders": len(orders)}
+
+    def _run_one(self, llm: LLMTrader, name: str, cycle: Dict[str, Any]) -> Dict[str, Any]:
+        start = time.perf_counter()
+        cached = False
+        try:
+            key, plan_json, messages = self._prepare(llm, cycle)
+            cached = plan_json is not None
+            if not cached:
+                plan_json = llm.request_plan(messages)
+                self._store(key, plan_json)
+        except Exception as e:
+            self.logger.error(f"LLM call of {name} failed: {e}")
+            plan_json = llm.fallback_plan(str(e))
+        llm_time = time.perf_counter() - start
+        result = self._execute(llm, name, cycle, plan_json)
+        duration = time.perf_counter() - start
+        result.update(duration=duration, llm_time=llm_time, cached=cached,
+                      first_action=duration if result["orders"] else None)
+        return result
+
+    async def _stream(self, llm: LLMTrader, name: str, cycle: Dict[str, Any], key: str,
+                      messages: List[Dict[str, str]], start: float) -> Dict[str, Any]:
+        """Stream the reply of a trader, executing its decisions as they are parsed."""
+        chunks = self.llm_client.chat_stream(messages, model=llm.model, temperature=0.4,
+                                             response_format=PLAN_RESPONSE_FORMAT)
+        offset = time.perf_counter() - start
+        try:
+            streamed = await llm.run_streaming(self.session, cycle["market_data"], chunks)
+        except LLMError as e:
+            # never re-issued once the stream started, and nothing of the plan was executed
+            self.logger.error(f"LLM stream of {name} failed: {e}")
+            llm_time = time.perf_counter() - start
+            result = self._execute(llm, name, cycle, llm.fallback_plan(str(e)))
+            result.update(duration=time.perf_counter() - start, llm_time=llm_time, cached=False,
+                          first_action=None, first_token=None, cancelled=str(e))
+            return result
+        finally:
+            self.session.remove()
+        if streamed["cancelled"] is None:
+            self._store(key, streamed["reply"])
+        duration = time.perf_counter() - start
+        return {"trader_id": llm.trader_id, "status": "ok", "duration": duration, "error": None,
+                "prompt_tokens": cycle["prompts"].prompt_tokens.get(llm.trader_id), "orders": len(streamed["orders"]),
+                "llm_time": duration, "cached": False, "cancelled": streamed["cancelled"],
+                "first_token": offset + streamed["first_token"] if streamed["first_token"] is not None else None,
+                "first_action": offset + streamed["first_action"] if streamed["first_action"] is not None else None}
+
+    async def _decide(self, llm: LLMTrader, name: str, cycle: Dict[str, Any]) -> Dict[str, Any]:
+        start = time.perf_counter()
+        cached = False
+        try:
+            key, plan_json, messages = self._prepare(llm, cycle)
+            cached = plan_json is not None
+            if not cached and self.stream:
+                return await self._stream(llm, name, cycle, key, messages, start)
+            if not cached:
+                plan_json = await self.llm_client.chat(messages, model=llm.model, temperature=0.4,
+                                                      response_format=PLAN_RESPONSE_FORMAT)
+                self._store(key, plan_json)
+        except Exception as e:
+            self.logger.error(f"LLM call of {name} failed: {e}")
+            plan_json = llm.fallback_plan(str(e))
+        llm_time = time.perf_counter() - start
+        # DB writes are short: executed on the loop thread as soon as the reply is in
+        result = self._execute(llm, name, cycle, plan_json)
+        duration = time.perf_counter() - start
+        result.update(duration=duration, llm_time=llm_time, cached=cached,
+                      first_action=duration if result["orders"] else None)
+        return result
+
+    async def _run_async(self, jobs, cycle: Dict[str, Any]) -> Dict[str, Dict[str, Any]]:
+        async with self.llm_client:
+            results = await asyncio.gather(*(self._decide(llm, name, cycle) for llm, name in jobs))
+        return {name: result for (_, name), result in zip(jobs, results)}
+
+    @staticmethod
+    def _first_actions(per_trader: Dict[str, Dict[str, Any]]) -> Dict[str, Any]:
+        """Seconds from the start of a trader's cycle to its first executed order, over the traders that traded."""
+        times = np.array([r["first_action"] for r in per_trader.values() if r.get("first_action") is not None])
+        if not len(times):
+            return {"traders": 0, "mean": None, "p95": None, "max": None}
+        return {"traders": len(times), "mean": float(times.mean()), "p95": float(np.percentile(times, 95)),
+                "max": float(times.max())}
+
+    def run(self, context: Dict[str, Any], market_data: Dict[str, float], risk: Dict[int, Dict[str, Any]] = None) -> Dict[str, Any]:
+        """
+        Run one decision cycle for every trader. Returns the cycle report: wall time,
+        summed and percentile per-trader durations, time to the first executed order,
+        prompt tokens, cache hits, and the timing of each trader by name. The shared market part of the prompts is rendered
+        (and fingerprinted for the cache) once for all.
+        """
+        try:
+            traders = self.session.query(Trader).order_by(Trader.id).all()
+            jobs = [(self.llm_trader(trader), trader.name) for trader in traders]
+        finally:
+            self.session.remove()
+
+        start = time.perf_counter()
+        cycle = {
+            "context": context,
+            "market_data": market_data,
+            "risk": risk or {},
+            "prompts": LLMTrader.shared_prompt(market_data, context),
+            "market_key": self.cache.market_key(market_data, context) if self.cache is not None else None,
+        }
+        if self.llm_client is not None:
+            # the pipeline runs stages in worker threads, this thread has no event loop of its own
+            per_trader = asyncio.run(self._run_async(jobs, cycle))
+        else:
+            with ThreadPoolExecutor(max_workers=self.max_concurrency, thread_name_prefix="decisions") as executor:
+                futures = {name: executor.submit(self._run_one, llm, name, cycle) for llm, name in jobs}
+                per_trader = {name: future.result() for name, future in futures.items()}
+        wall_time = time.perf_counter() - start
+
+        durations = np.array([result["duration"] for result in per_trader.values()]) if per_trader else np.zeros(1)
+        report = {
+            "traders": len(per_trader),
+            "max_concurrency": self.max_concurrency,
+            "wall_time": wall_time,
+            "total_time": float(durations.sum()),
+            "mean_time": float(durations.mean()),
+            "p95_time": float(np.percentile(durations, 95)),
+            "max_time": float(durations.max()),
+            "errors": sum(result["status"] != "ok" for result in per_trader.values()),
+            "cached": sum(result["cached"] for result in per_trader.values()),
+            "cancelled": sum(result.get("cancelled") is not None for result in per_trader.values()),
+            "time_to_first_action": self._first_actions(per_trader),
+            "prompt": {key: value for key, value in cycle["prompts"].report().items() if key != "per_prompt"},
+            "per_trader": per_trader,
+        }
+        if self.llm_client is not None:
+            report["llm"] = self.llm_client.stats()
+        if self.cache is not None:
+            report["cache"] = self.cache.stats()
+        self.logger.info(f"Decision cycle: {report['traders']} traders in {wall_time:.1f}s "
+                         f"(sum {report['total_time']:.1f}s, {report['cached']} cached, {report['errors']} errors)")
+        return report
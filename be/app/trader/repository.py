@@ -0,0 +1,160 @@
+"""
+Async queries on the trading models, awaited by the FastAPI handlers
+with an AsyncSession from `storage.AsyncStorage`.
+"""
+import json
+import base64
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+from sqlalchemy import select, tuple_, type_coerce, String
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from .trader import Trader, Transaction, TransactionType, Thought, Position, EquitySnapshot, performance_stats
+
+
+async def get_trader(session: AsyncSession, trader_id: int) -> Optional[Trader]:
+    return await session.get(Trader, trader_id)
+
+
+async def get_trader_by_name(session: AsyncSession, name: str) -> Optional[Trader]:
+    result = await session.execute(select(Trader).where(Trader.name == name))
+    return result.scalars().first()
+
+
+async def list_traders(session: AsyncSession) -> List[Trader]:
+    result = await session.execute(select(Trader).order_by(Trader.id))
+    return list(result.scalars())
+
+
+async def create_trader(session: AsyncSession, name: str, mode: str, balance: float) -> Trader:
+    """Register a new trader, raises ValueError if the name is taken."""
+    if await get_trader_by_name(session, name) is not None:
+        raise ValueError(f"Trader {name} already exists.")
+    trader = Trader(name=name, mode=mode, balance=balance)
+    session.add(trader)
+    await session.commit()
+    return trader
+
+
+async def get_positions(session: AsyncSession, trader_id: int, open_only: bool = False) -> List[Position]:
+    query = select(Position).where(Position.trader_id == trader_id)
+    if open_only:
+        query = query.where(Position.quantity > 0)
+    result = await session.execute(query.order_by(Position.symbol))
+    return list(result.scalars())
+
+
+async def get_recent_transactions(session: AsyncSession, trader_id: int, limit: int = 50) -> List[Transaction]:
+    result = await session.execute(
+        select(Transaction)
+        .where(Transaction.trader_id == trader_id)
+        .order_by(Transaction.timestamp.desc(), Transaction.id.desc())
+        .limit(limit)
+    )
+    return list(result.scalars())
+
+
+async def get_recent_thoughts(session: AsyncSession, trader_id: int, limit: int = 50) -> List[Thought]:
+    result = await session.execute(
+        select(Thought)
+        .where(Thought.trader_id == trader_id)
+        .order_by(Thought.timestamp.desc(), Thought.id.desc())
+        .limit(limit)
+    )
+    return list(result.scalars())
+
+
+async def get_performance_stats(session: AsyncSession, trader: Trader, stocks_current_value: Dict[str, float]) -> Dict[str, Any]:
+    """Same stats as Trader.get_performance_stats (position ledger, average cost)."""
+    if stocks_current_value is None:
+        raise ValueError("No current value data for the stocks.")
+    positions = await get_positions(session, trader.id)
+    return performance_stats(trader.balance, positions, stocks_current_value)
+
+
+def encode_cursor(timestamp: datetime, row_id: int) -> str:
+    """Opaque keyset cursor pointing after the row (timestamp, id)."""
+    return base64.urlsafe_b64encode(json.dumps([timestamp.isoformat(), row_id]).encode()).decode()
+
+
+def decode_cursor(cursor: str) -> Tuple[datetime, int]:
+    """Inverse of encode_cursor, raises ValueError on a malformed cursor."""
+    try:
+        timestamp, row_id = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+        return datetime.fromisoformat(timestamp), int(row_id)
+    except (TypeError, ValueError, UnicodeDecodeError) as e:
+        raise ValueError(f"Invalid cursor: {cursor!r}") from e
+
+
+def _naive_utc(value: datetime) -> datetime:
+    """Timestamps are stored as naive UTC, convert aware filters to match."""
+    return value.astimezone(timezone.utc).replace(tzinfo=None) if value.tzinfo else value
+
+
+async def _keyset_page(session: AsyncSession, model, query, limit: int, cursor: Optional[str]):
+    """
+    One page of `query`, newest first, continuing after `cursor`.
+    The seek condition on (timestamp, id) uses the (trader_id, timestamp, id) index,
+    so the cost of a page does not depend on how deep it is in the history.
+    """
+    if cursor:
+        timestamp, row_id = decode_cursor(cursor)
+        query = query.where(tuple_(model.timestamp, model.id) < tuple_(timestamp, row_id))
+    # one extra row tells whether there is a next page
+    result = await session.execute(query.order_by(model.timestamp.desc(), model.id.desc()).limit(limit + 1))
+    rows = list(result.scalars())
+    next_cursor = encode_cursor(rows[limit - 1].timestamp, rows[limit - 1].id) if len(rows) > limit else None
+    return rows[:limit], next_cursor
+
+
+async def page_thoughts(session: AsyncSession, trader_id: int, limit: int = 50, cursor: str = None,
+                        stock: str = None, action: str = None,
+                        since: datetime = None, until: datetime = None) -> Tuple[List[Thought], Optional[str]]:
+    """A page of the reasoning history of a trader, with the cursor of the next page (None on the last one)."""
+    query = select(Thought).where(Thought.trader_id == trader_id)
+    if stock:
+        query = query.where(Thought.stock == stock)
+    if action:
+        query = query.where(Thought.action == action.upper())
+    if since:
+        query = query.where(Thought.timestamp >= _naive_utc(since))
+    if until:
+        query = query.where(Thought.timestamp < _naive_utc(until))
+    return await _keyset_page(session, Thought, query, limit, cursor)
+
+
+async def page_transactions(session: AsyncSession, trader_id: int, limit: int = 50, cursor: str = None,
+                            stock: str = None, action: str = None,
+                            since: datetime = None, until: datetime = None) -> Tuple[List[Transaction], Optional[str]]:
+    """A page of the trade history of a trader, with the cursor of the next page (None on the last one)."""
+    query = select(Transaction).where(Transaction.trader_id == trader_id)
+    if stock:
+        query = query.where(Transaction.symbol == stock)
+    if action:
+        query = query.where(Transaction.transaction_type == TransactionType(action.upper()))
+    if since:
+        query = query.where(Transaction.timestamp >= _naive_utc(since))
+    if until:
+        query = query.where(Transaction.timestamp < _naive_utc(until))
+    return await _keyset_page(session, Transaction, query, limit, cursor)
+
+
+async def get_equity_curve(session: AsyncSession, trader_id: int, since: datetime = None,
+                           until: datetime = None) -> Tuple[np.ndarray, np.ndarray]:
+    """Equity curve of a trader over [since, until): epoch milliseconds and total equity arrays."""
+    # raw ISO strings parsed by NumPy in one call, much faster than a datetime object per row
+    query = (
+        select(type_coerce(EquitySnapshot.timestamp, String), EquitySnapshot.total_equity)
+        .where(EquitySnapshot.trader_id == trader_id)
+    )
+    if since:
+        query = query.where(EquitySnapshot.timestamp >= _naive_utc(since))
+    if until:
+        query = query.where(EquitySnapshot.timestamp < _naive_utc(until))
+    rows = (await session.execute(query.order_by(EquitySnapshot.timestamp))).all()
+    if not rows:
+        return np.empty(0, dtype=np.int64), np.empty(0)
+    timestamps, equity = zip(*rows)
+    return np.array(timestamps, dtype="datetime64[ms]").astype(np.int64), np.array(equity, dtype=np.float64)
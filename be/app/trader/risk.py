@@ -0,0 +1,152 @@
+"""
+Portfolio risk metrics of every trader at once: the equity snapshots are read
+into one (timestamp x trader) panel and the positions into one (trader x symbol)
+weight matrix, so each metric is a single vectorized pandas/NumPy operation.
+"""
+from typing import Any, Dict, List
+
+import numpy as np
+import pandas as pd
+from sqlalchemy import select
+
+from .trader import Trader, Position, EquitySnapshot
+
+# equity snapshots are written once per update cycle, i.e. hourly around the clock
+PERIODS_PER_YEAR = 24 * 365
+ROLLING_WINDOW = 24 * 7
+
+
+def load_equity_panel(session, since=None) -> pd.DataFrame:
+    """Total equity of every trader as a DataFrame indexed by snapshot time, one column per trader id."""
+    query = select(EquitySnapshot.timestamp, EquitySnapshot.trader_id, EquitySnapshot.total_equity)
+    if since is not None:
+        query = query.where(EquitySnapshot.timestamp >= since)
+    rows = session.execute(query).all()
+    if not rows:
+        return pd.DataFrame()
+    frame = pd.DataFrame(rows, columns=["timestamp", "trader_id", "total_equity"])
+    return frame.pivot_table(index="timestamp", columns="trader_id", values="total_equity", aggfunc="last").sort_index()
+
+
+def load_exposure(session, stocks_current_value: Dict[str, float]) -> pd.DataFrame:
+    """Market value of the open positions, one row per trader id, one column per symbol."""
+    rows = session.execute(
+        select(Position.trader_id, Position.symbol, Position.quantity).where(Position.quantity > 0)
+    ).all()
+    if not rows:
+        return pd.DataFrame()
+    frame = pd.DataFrame(rows, columns=["trader_id", "symbol", "quantity"])
+    frame["value"] = frame["quantity"] * frame["symbol"].map(stocks_current_value).fillna(0.0)
+    return frame.pivot_table(index="trader_id", columns="symbol", values="value", aggfunc="sum", fill_value=0.0)
+
+
+def equity_metrics(equity: pd.DataFrame, periods_per_year: int = PERIODS_PER_YEAR,
+                   window: int = ROLLING_WINDOW) -> pd.DataFrame:
+    """
+    Per trader (column of `equity`): annualized volatility (full history and last
+    `window` periods), max drawdown, Sharpe and Sortino ratios (zero risk-free rate), total return.
+    """
+    returns = equity.pct_change(fill_method=None)
+    scale = np.sqrt(periods_per_year)
+    mean = returns.mean()
+    std = returns.std()
+    # downside deviation: root mean square of the negative returns only
+    downside = np.sqrt((returns.clip(upper=0.0) ** 2).mean())
+    drawdown = equity / equity.cummax() - 1.0
+    first = equity.bfill().iloc[0] if len(equity) else np.nan
+    return pd.DataFrame({
+        "volatility": std * scale,
+        "rolling_volatility": returns.iloc[-window:].std() * scale,
+        "max_drawdown": drawdown.min(),
+        "current_drawdown": drawdown.ffill().iloc[-1] if len(drawdown) else np.nan,
+        "sharpe": (mean / std.replace(0.0, np.nan)) * scale,
+        "sortino": (mean / downside.replace(0.0, np.nan)) * scale,
+        "total_return": equity.ffill().iloc[-1] / first - 1.0 if len(equity) else np.nan,
+    })
+
+
+def holdings_correlation(weights: pd.DataFrame, price_history: pd.DataFrame) -> pd.Series:
+    """
+    Average pairwise correlation of the returns of the symbols each trader holds,
+    weighted by position size: (w'Cw - sum w^2) / (1 - sum w^2) with w the
+    normalized weights, computed for all traders with one matrix product.
+    """
+    symbols = [symbol for symbol in weights.columns if symbol in price_history.columns]
+    if len(symbols) < 2:
+        return pd.Series(np.nan, index=weights.index)
+    correlation = price_history[symbols].pct_change(fill_method=None).corr().fillna(0.0).to_numpy()
+    w = weights[symbols].to_numpy()
+    w = w / np.where(w.sum(axis=1, keepdims=True) > 0, w.sum(axis=1, keepdims=True), 1.0)
+    self_weight = (w ** 2).sum(axis=1)
+    quadratic = np.einsum("ij,jk,ik->i", w, correlation, w)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        average = (quadratic - self_weight) / (1.0 - self_weight)
+    # undefined without at least two holdings
+    return pd.Series(np.where((self_weight > 0.0) & (self_weight < 1.0), average, np.nan), index=weights.index)
+
+
+def portfolio_risk(session, stocks_current_value: Dict[str, float], price_history: pd.DataFrame = None,
+                   since=None) -> Dict[int, Dict[str, Any]]:
+    """
+    Risk metrics of every trader, keyed by trader id:
+    equity metrics (see `equity_metrics`), exposure (market value / total equity) per symbol,
+    concentration (Herfindahl index of the position weights), largest position, and
+    the average correlation of the holdings when a `price_history` (time x symbol closes) is given.
+    NaN values (not enough history yet) are reported as None.
+    """
+    balances = dict(session.execute(select(Trader.id, Trader.balance)).all())
+    equity = load_equity_panel(session, since)
+    metrics = equity_metrics(equity) if not equity.empty else pd.DataFrame()
+    holdings = load_exposure(session, stocks_current_value)
+    if holdings.empty:
+        holdings = pd.DataFrame(index=pd.Index([], name="trader_id"))
+    holdings = holdings.reindex(list(balances), fill_value=0.0)
+
+    total_equity = holdings.sum(axis=1) + pd.Series(balances)
+    exposure = holdings.div(total_equity.replace(0.0, np.nan), axis=0).fillna(0.0)
+    invested = holdings.sum(axis=1)
+    position_weights = holdings.div(invested.replace(0.0, np.nan), axis=0).fillna(0.0)
+    concentration = (position_weights ** 2).sum(axis=1)
+    correlation = (holdings_correlation(holdings, price_history)
+                   if price_history is not None and not holdings.empty else pd.Series(np.nan, index=holdings.index))
+
+    def clean(value):
+        return None if value is None or pd.isna(value) else float(value)
+
+    report = {}
+    for trader_id in balances:
+        row = metrics.loc[trader_id] if trader_id in metrics.index else pd.Series(dtype=float)
+        trader_exposure = exposure.loc[trader_id]
+        trader_exposure = trader_exposure[trader_exposure > 0]
+        report[trader_id] = {
+            **{name: clean(row.get(name)) for name in ("volatility", "rolling_volatility", "max_drawdown", "current_drawdown",
+                                                       "sharpe", "sortino", "total_return")},
+            "exposure": {symbol: float(value) for symbol, value in trader_exposure.sort_values(ascending=False).items()},
+            "cash_weight": clean(1.0 - trader_exposure.sum()),
+            "concentration": clean(concentration.get(trader_id)) if invested.get(trader_id, 0) > 0 else None,
+            "largest_position": trader_exposure.idxmax() if len(trader_exposure) else None,
+            "holdings_correlation": clean(correlation.get(trader_id)),
+        }
+    return report
+
+
+def format_risk_metrics(risk: Dict[str, Any], realized_profit_by_stock: Dict[str, float] = None) -> str:
+    """Risk Metrics block of the LLM prompt."""
+    def pct(value):
+        return "n/a" if value is None else f"{value * 100:.1f}%"
+
+    def ratio(value):
+        return "n/a" if value is None else f"{value:.2f}"
+
+    lines: List[str] = ["\nRisk Metrics:"]
+    lines.append(f"- Volatility (annualized): {pct(risk.get('volatility'))}, last week: {pct(risk.get('rolling_volatility'))}")
+    lines.append(f"- Max drawdown: {pct(risk.get('max_drawdown'))}, current: {pct(risk.get('current_drawdown'))}")
+    lines.append(f"- Sharpe: {ratio(risk.get('sharpe'))}, Sortino: {ratio(risk.get('sortino'))}")
+    lines.append(f"- Cash: {pct(risk.get('cash_weight'))}, concentration (HHI): {ratio(risk.get('concentration'))}, "
+                 f"holdings correlation: {ratio(risk.get('holdings_correlation'))}")
+    for symbol, weight in risk.get("exposure", {}).items():
+        line = f"- {symbol}: {pct(weight)} of portfolio"
+        if realized_profit_by_stock and symbol in realized_profit_by_stock:
+            line += f", Realized P/L: ${float(realized_profit_by_stock[symbol]):,.2f}"
+        lines.append(line)
+    return "\n".join(lines)
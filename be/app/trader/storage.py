@@ -0,0 +1,214 @@
+import os
+from dataclasses import dataclass
+from typing import Iterator, AsyncIterator
+
+from sqlalchemy import create_engine, event, inspect, text
+from sqlalchemy.engine import Engine, make_url
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession, create_async_engine, async_sessionmaker
+from sqlalchemy.orm import Session, sessionmaker, scoped_session
+from sqlalchemy.pool import StaticPool
+from sqlalchemy.schema import CreateColumn
+
+from .trader import Base
+
+
+@dataclass
+class StorageConfig:
+    """
+    Engine settings of the trading database.
+
+    For SQLite the pragmas are applied to every new connection:
+    - WAL lets dashboard reads run while a trade is being written (one writer, many readers)
+    - synchronous=NORMAL only fsyncs the WAL at checkpoints, commits stay durable
+      against application crashes (a power loss may drop the last transactions)
+    - mmap_size / cache_size (KiB) keep the hot pages in memory
+    - busy_timeout makes a second writer wait instead of failing with "database is locked"
+    """
+    url: str = "sqlite:///db.sqlite"
+    journal_mode: str = "WAL"
+    synchronous: str = "NORMAL"
+    mmap_size: int = 256 * 1024 * 1024
+    cache_size_kib: int = 64 * 1024
+    busy_timeout_ms: int = 5000
+    pool_size: int = 8
+    max_overflow: int = 8
+    pool_timeout: float = 30.0
+    echo: bool = False
+
+    @classmethod
+    def from_env(cls, **overrides) -> "StorageConfig":
+        """Read `DB_URL`, `DB_POOL_SIZE`, `DB_MAX_OVERFLOW`, `DB_JOURNAL_MODE`, `DB_SYNCHRONOUS`."""
+        config = cls(
+            url=os.getenv("DB_URL", cls.url),
+            pool_size=int(os.getenv("DB_POOL_SIZE", cls.pool_size)),
+            max_overflow=int(os.getenv("DB_MAX_OVERFLOW", cls.max_overflow)),
+            journal_mode=os.getenv("DB_JOURNAL_MODE", cls.journal_mode),
+            synchronous=os.getenv("DB_SYNCHRONOUS", cls.synchronous),
+        )
+        for key, value in overrides.items():
+            setattr(config, key, value)
+        return config
+
+    @property
+    def is_sqlite(self) -> bool:
+        return self.url.startswith("sqlite")
+
+    @property
+    def is_memory(self) -> bool:
+        return self.is_sqlite and (self.url in ("sqlite://", "sqlite:///:memory:") or "mode=memory" in self.url)
+
+
+def sqlite_pragmas(config: StorageConfig):
+    """`connect` event listener applying the SQLite pragmas of `config`."""
+    def on_connect(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        if not config.is_memory:
+            cursor.execute(f"PRAGMA journal_mode={config.journal_mode}")
+            cursor.execute(f"PRAGMA mmap_size={config.mmap_size}")
+        cursor.execute(f"PRAGMA synchronous={config.synchronous}")
+        cursor.execute(f"PRAGMA cache_size=-{config.cache_size_kib}")
+        cursor.execute(f"PRAGMA busy_timeout={config.busy_timeout_ms}")
+        cursor.execute("PRAGMA foreign_keys=ON")
+        cursor.close()
+    return on_connect
+
+
+def async_url(url: str) -> str:
+    """Map a database URL to its asyncio driver: SQLite to aiosqlite, PostgreSQL to asyncpg."""
+    parsed = make_url(url)
+    backend = parsed.get_backend_name()
+    if backend == "sqlite":
+        parsed = parsed.set(drivername="sqlite+aiosqlite")
+    elif backend == "postgresql":
+        parsed = parsed.set(drivername="postgresql+asyncpg")
+    return parsed.render_as_string(hide_password=False)
+
+
+def create_storage_engine(config: StorageConfig, asynchronous: bool = False):
+    """
+    Create the engine described by `config`, with its pool and (for SQLite) pragmas.
+    `asynchronous` returns an AsyncEngine on the asyncio driver of the same database.
+    """
+    factory = create_async_engine if asynchronous else create_engine
+    url = async_url(config.url) if asynchronous else config.url
+    if config.is_memory:
+        # a single shared connection, otherwise every pooled connection gets its own empty database
+        connect_args = {} if asynchronous else {"check_same_thread": False}
+        engine = factory(url, echo=config.echo, poolclass=StaticPool, connect_args=connect_args)
+    else:
+        kwargs = {}
+        if config.is_sqlite:
+            kwargs["connect_args"] = {"timeout": config.busy_timeout_ms / 1000}
+            if not asynchronous:
+                # sessions are used from the pipeline worker threads and the event loop thread
+                kwargs["connect_args"]["check_same_thread"] = False
+        engine = factory(
+            url,
+            echo=config.echo,
+            pool_size=config.pool_size,
+            max_overflow=config.max_overflow,
+            pool_timeout=config.pool_timeout,
+            pool_pre_ping=not config.is_sqlite,
+            **kwargs,
+        )
+    if config.is_sqlite:
+        sync_engine = engine.sync_engine if asynchronous else engine
+        event.listen(sync_engine, "connect", sqlite_pragmas(config))
+    return engine
+
+
+def add_missing_columns(bind):
+    """
+    create_all never alters an existing table: add the columns declared after it was
+    created. Only nullable columns (or columns with a server default) can be added this way.
+    """
+    if isinstance(bind, Engine):
+        with bind.begin() as connection:
+            return add_missing_columns(connection)
+    inspector = inspect(bind)
+    for table in Base.metadata.sorted_tables:
+        if not inspector.has_table(table.name):
+            continue
+        existing = {column["name"] for column in inspector.get_columns(table.name)}
+        for column in table.columns:
+            if column.name in existing:
+                continue
+            if not column.nullable and column.server_default is None:
+                raise RuntimeError(f"Cannot add NOT NULL column {table.name}.{column.name} without a server default.")
+            definition = CreateColumn(column).compile(dialect=bind.dialect)
+            bind.execute(text(f"ALTER TABLE {table.name} ADD COLUMN {definition}"))
+
+
+def init_schema(bind):
+    """
+    Create missing tables and columns, and the indexes declared after their table
+    was created (Engine or Connection).
+    """
+    Base.metadata.create_all(bind)
+    add_missing_columns(bind)
+    for table in Base.metadata.sorted_tables:
+        for index in table.indexes:
+            index.create(bind, checkfirst=True)
+
+
+class Storage:
+    """
+    Engine, session factory and thread-local `scoped` session of the trading database.
+
+    Background work (pipeline stages) uses `scoped` and calls `scoped.remove()` when done;
+    HTTP handlers get a short-lived session of their own through `session_dependency`
+    (`Depends(storage.session_dependency)`), so a request never shares a connection
+    or an open transaction with the update cycle.
+    """
+
+    def __init__(self, config: StorageConfig = None):
+        self.config = config or StorageConfig()
+        self.engine = create_storage_engine(self.config)
+        init_schema(self.engine)
+        self.factory = sessionmaker(bind=self.engine)
+        self.scoped = scoped_session(self.factory)
+
+    def session(self) -> Session:
+        return self.factory()
+
+    def session_dependency(self) -> Iterator[Session]:
+        session = self.factory()
+        try:
+            yield session
+        finally:
+            session.close()
+
+    def dispose(self):
+        self.scoped.remove()
+        self.engine.dispose()
+
+
+class AsyncStorage:
+    """
+    asyncio counterpart of Storage for the FastAPI handlers: AsyncSession on aiosqlite
+    (or asyncpg for a postgresql:// URL, `pip install asyncpg`), same StorageConfig.
+
+    Queries awaited through it release the event loop while SQLite waits on a lock
+    held by the update cycle, so one slow query no longer stalls every request.
+    Call `await init_schema()` once at startup.
+    """
+
+    def __init__(self, config: StorageConfig = None):
+        self.config = config or StorageConfig()
+        self.engine: AsyncEngine = create_storage_engine(self.config, asynchronous=True)
+        # handlers serialize the objects after commit, keep their loaded state
+        self.factory = async_sessionmaker(self.engine, expire_on_commit=False)
+
+    async def init_schema(self):
+        async with self.engine.begin() as connection:
+            await connection.run_sync(init_schema)
+
+    def session(self) -> AsyncSession:
+        return self.factory()
+
+    async def session_dependency(self) -> AsyncIterator[AsyncSession]:
+        async with self.factory() as session:
+            yield session
+
+    async def dispose(self):
+        await self.engine.dispose()
@@ -1,21 +1,23 @@
 from datetime import datetime
 import enum
-from typing import Dict, Any
+from typing import Dict, Any, List
 from sqlalchemy import (
-    create_engine,
     Column,
     Integer,
     String,
     Float,
     DateTime,
     Enum,
-    ForeignKey
+    ForeignKey,
+    Index,
+    JSON,
+    case,
+    func,
+    insert
 )
 from sqlalchemy.orm import (
-    sessionmaker,
     declarative_base,
-    relationship,
-    scoped_session
+    relationship
 )
 
 Base = declarative_base()
@@ -36,86 +38,185 @@ class Trader(Base):
     id = Column(Integer, primary_key=True, autoincrement=True)
     name = Column(String, nullable=False)
     balance = Column(Float, nullable=False, default=0.0)
+    # strategy prompt of llm_trader.MODES, NULL on rows created before the column existed (see registry.seed_traders)
+    mode = Column(String, nullable=True)
 
     transactions = relationship("Transaction", back_populates="trader", cascade="all, delete-orphan")
     thoughts = relationship("Thought", back_populates="trader", cascade="all, delete-orphan")
+    positions = relationship("Position", back_populates="trader", cascade="all, delete-orphan")
+    equity_snapshots = relationship("EquitySnapshot", back_populates="trader", cascade="all, delete-orphan")
 
-    def buy_stock(self, session, symbol: str, quantity: int, price: float):
+    def to_dict(self) -> Dict[str, Any]:
+        """Return the column values, JSON ready."""
+        return {"id": self.id, "name": self.name, "mode": self.mode, "balance": self.balance}
+
+    def get_position(self, session, symbol: str, create: bool = False):
+        """
+        Return the ledger row of `symbol` (None if never traded),
+        creating an empty one in the session when `create` is set.
+        """
+        if self.id is None:
+            session.flush()
+        position = session.get(Position, (self.id, symbol))
+        if position is None:
+            # opened by an earlier trade of the same unit of work, not flushed yet (see `apply_order`)
+            position = next((p for p in session.new
+                             if isinstance(p, Position) and p.trader_id == self.id and p.symbol == symbol), None)
+        if position is None and create:
+            position = Position(trader_id=self.id, symbol=symbol, quantity=0, average_cost=0.0, realized_pnl=0.0)
+            session.add(position)
+        return position
+
+    def buy_stock(self, session, symbol: str, quantity: int, price: float, commit: bool = True):
         """
         Attempt to buy `quantity` shares of `symbol` at `price`.
         Deducts cost from the trader's balance if sufficient funds are available.
         Raises ValueError if not enough balance.
+        With `commit=False` the caller commits (see `execute_plan`).
         """
         total_cost = price * quantity
         if self.balance < total_cost:
             raise ValueError("Insufficient balance to execute buy.")
-        
-        # Deduct balance
-        self.balance -= total_cost
-        
-        # Create a transaction record
-        tx = Transaction(
-            trader=self,
-            symbol=symbol,
-            quantity=quantity,
-            price=price,
-            transaction_type=TransactionType.BUY
-        )
-        session.add(tx)
-        session.commit()
 
-    def sell_stock(self, session, symbol: str, quantity: int, price: float):
+        self._apply_trade(session, TransactionType.BUY, symbol, quantity, price)
+        if commit:
+            session.commit()
+
+    def sell_stock(self, session, symbol: str, quantity: int, price: float, commit: bool = True):
         """
         Attempt to sell `quantity` shares of `symbol` at `price`.
         Ensures the trader actually holds at least `quantity` shares of that symbol.
         Raises ValueError if not enough shares.
         Adds proceeds to the trader's balance.
+        With `commit=False` the caller commits (see `execute_plan`).
         """
         # Check holdings
-        holdings = self.get_holdings(session)
-        current_holding = holdings.get(symbol, 0)
+        position = self.get_position(session, symbol)
+        current_holding = position.quantity if position is not None else 0
         if current_holding < quantity:
             raise ValueError(f"Not enough shares of {symbol} to sell.")
 
-        # Increase balance
-        proceeds = price * quantity
-        self.balance += proceeds
-        
+        self._apply_trade(session, TransactionType.SELL, symbol, quantity, price)
+        if commit:
+            session.commit()
+
+    def _apply_trade(self, session, transaction_type: TransactionType, symbol: str, quantity: int, price: float):
+        """Update balance, position ledger and transaction log for an already validated trade (no commit)."""
+        position = self.get_position(session, symbol, create=True)
+        if transaction_type == TransactionType.BUY:
+            self.balance -= price * quantity
+            position.apply_buy(quantity, price)
+        else:
+            self.balance += price * quantity
+            position.apply_sell(quantity, price)
+
         # Create a transaction record
         tx = Transaction(
             trader=self,
             symbol=symbol,
             quantity=quantity,
             price=price,
-            transaction_type=TransactionType.SELL
+            transaction_type=transaction_type
         )
         session.add(tx)
-        session.commit()
+
+    def apply_order(self, session, order: Dict[str, Any]):
+        """
+        Check one order {"action": "BUY"|"SELL", "stock", "quantity", "price"} against the current
+        balance and position, trades of the session not yet committed included, and apply it
+        (no flush, no commit). Raises ValueError, leaving the session unchanged, if it could not be executed.
+        """
+        action, symbol, quantity, price = order["action"], order["stock"], order["quantity"], order["price"]
+        if quantity <= 0 or price <= 0:
+            raise ValueError(f"{action} {quantity} {symbol} @ {price}: invalid quantity or price.")
+        if action == "BUY":
+            self.buy_stock(session, symbol, quantity, price, commit=False)
+        elif action == "SELL":
+            self.sell_stock(session, symbol, quantity, price, commit=False)
+        else:
+            raise ValueError(f"Unknown action {action!r}.")
+
+    def validate_plan(self, session, orders: List[Dict[str, Any]]):
+        """
+        Check a list of orders {"action": "BUY"|"SELL", "stock", "quantity", "price"} in order
+        against a snapshot of the balance and holdings, as if each previous order had been executed.
+        Raises ValueError on the first order that could not be executed.
+        """
+        balance = self.balance
+        holdings = self.get_holdings(session)
+        for i, order in enumerate(orders):
+            action, symbol, quantity, price = order["action"], order["stock"], order["quantity"], order["price"]
+            if quantity <= 0 or price <= 0:
+                raise ValueError(f"Order {i} ({action} {quantity} {symbol} @ {price}): invalid quantity or price.")
+            if action == "BUY":
+                if balance < price * quantity:
+                    raise ValueError(f"Order {i} ({action} {quantity} {symbol}): insufficient balance to execute buy.")
+                balance -= price * quantity
+                holdings[symbol] = holdings.get(symbol, 0) + quantity
+            elif action == "SELL":
+                if holdings.get(symbol, 0) < quantity:
+                    raise ValueError(f"Order {i} ({action} {quantity} {symbol}): not enough shares of {symbol} to sell.")
+                balance += price * quantity
+                holdings[symbol] -= quantity
+            else:
+                raise ValueError(f"Order {i}: unknown action {action!r}.")
+
+    def execute_plan(self, session, orders: List[Dict[str, Any]], thoughts: List[Dict[str, Any]] = None):
+        """
+        Execute a whole plan atomically: every order is validated first (see `validate_plan`),
+        then all trades and the `thoughts` (bulk inserted) are written in a single commit.
+        Either everything is applied or, on ValueError or DB error, nothing is.
+        """
+        self.validate_plan(session, orders)
+        try:
+            for order in orders:
+                self._apply_trade(session, TransactionType(order["action"]), order["stock"], order["quantity"], order["price"])
+            if thoughts:
+                self.add_thoughts(session, thoughts, commit=False)
+            session.commit()
+        except Exception:
+            session.rollback()
+            raise
+
+    def _amount_by_type(self, transaction_type: TransactionType, column):
+        """SQL expression summing `column` over the transactions of the given type only."""
+        return func.coalesce(func.sum(case((Transaction.transaction_type == transaction_type, column), else_=0)), 0)
+
+    def get_symbol_totals(self, session) -> Dict[str, Dict[str, float]]:
+        """
+        Return, in a single grouped query over the transactions, the bought/sold quantity and amount per symbol:
+            { 'SYMBOL': {'bought': qty, 'sold': qty, 'buy_amount': float, 'sell_amount': float}, ... }
+        Holdings and P&L are read from the position ledger, these totals check it (`ledger.verify_positions`).
+        """
+        amount = Transaction.price * Transaction.quantity
+        rows = (
+            session.query(
+                Transaction.symbol,
+                self._amount_by_type(TransactionType.BUY, Transaction.quantity),
+                self._amount_by_type(TransactionType.SELL, Transaction.quantity),
+                self._amount_by_type(TransactionType.BUY, amount),
+                self._amount_by_type(TransactionType.SELL, amount),
+            )
+            .filter(Transaction.trader_id == self.id)
+            .group_by(Transaction.symbol)
+            .all()
+        )
+        return {
+            symbol: {"bought": bought, "sold": sold, "buy_amount": float(buy_amount), "sell_amount": float(sell_amount)}
+            for symbol, bought, sold, buy_amount, sell_amount in rows
+        }
 
     def get_holdings(self, session) -> Dict[str, int]:
         """
         Return the current holdings of the trader as a dictionary:
             { 'SYMBOL': quantity, ... }
         """
-        # Aggregate all BUY - SELL
-        buys = (
-            session.query(Transaction.symbol, Transaction.quantity)
-            .filter_by(trader_id=self.id, transaction_type=TransactionType.BUY)
-            .all()
-        )
-        sells = (
-            session.query(Transaction.symbol, Transaction.quantity)
-            .filter_by(trader_id=self.id, transaction_type=TransactionType.SELL)
+        rows = (
+            session.query(Position.symbol, Position.quantity)
+            .filter(Position.trader_id == self.id, Position.quantity > 0)
             .all()
         )
-
-        holdings = {}
-        for symbol, qty in buys:
-            holdings[symbol] = holdings.get(symbol, 0) + qty
-        for symbol, qty in sells:
-            holdings[symbol] = holdings.get(symbol, 0) - qty
-
-        return {s: q for s, q in holdings.items() if q > 0}
+        return {symbol: quantity for symbol, quantity in rows}
 
     def get_transaction_history(self):
         """Return a list of all transactions (for convenience)."""
@@ -123,74 +224,54 @@ class Trader(Base):
 
     def get_realized_profit(self, session) -> float:
         """
-        Naive realized profit calculation:
-        Sum of (sell proceeds) - (buy costs) for matching sold quantity.
-        This is an *extremely* simplified version (no partial-lot handling).
+        Realized profit of all closed quantities, at average cost,
+        read from the position ledger.
         """
-        # Sum total buy cost
-        total_buy = (
-            session.query(Transaction)
-            .filter_by(trader_id=self.id, transaction_type=TransactionType.BUY)
+        realized = (
+            session.query(func.coalesce(func.sum(Position.realized_pnl), 0.0))
+            .filter(Position.trader_id == self.id)
+            .scalar()
         )
-        total_buy_amount = sum(tx.price * tx.quantity for tx in total_buy)
-
-        # Sum total sell proceeds
-        total_sell = (
-            session.query(Transaction)
-            .filter_by(trader_id=self.id, transaction_type=TransactionType.SELL)
-        )
-        total_sell_amount = sum(tx.price * tx.quantity for tx in total_sell)
-
-        return total_sell_amount - total_buy_amount
+        return float(realized)
     
     def get_realized_profit_by_stock(self, session) -> Dict[str, float]:
         """
         Return the realized profit by stock symbol.
         """
-        realized_profit_by_stock = {}
-        for tx in self.transactions:
-            if tx.transaction_type == TransactionType.SELL:
-                realized_profit_by_stock[tx.symbol] = realized_profit_by_stock.get(tx.symbol, 0.0) + tx.price * tx.quantity
-            elif tx.transaction_type == TransactionType.BUY:
-                realized_profit_by_stock[tx.symbol] = realized_profit_by_stock.get(tx.symbol, 0.0) - tx.price * tx.quantity
-        return realized_profit_by_stock
+        rows = (
+            session.query(Position.symbol, Position.realized_pnl)
+            .filter(Position.trader_id == self.id)
+            .all()
+        )
+        return {symbol: realized_pnl for symbol, realized_pnl in rows}
         
-    def get_performance_stats(self, session, stocks_current_value) -> Dict[str, Any]:
+    def get_performance_stats(self, session, stocks_current_value, cost_basis: str = None) -> Dict[str, Any]:
         """
         Return some basic performance stats, e.g.:
         - current balance
-        - total realized profit by summing all sell proceeds - buy costs
+        - total realized / unrealized profit over all positions
         - total real-time portfolio value by summing all current stock values
         - total equity by adding balance and portfolio value
         - current holdings
-        - total realized profit by each stock
+        - total realized / unrealized profit by each stock
         - total equity by stock
+
+        By default everything is read from the position ledger (average cost) in one
+        query, O(positions). `cost_basis` ("FIFO", "LIFO" or "AVERAGE") replays the
+        transactions through the lot engine of `trader.cost_basis` instead.
         """
-        print(stocks_current_value)
-        holdings = self.get_holdings(session)
-        
-        portfolio_value = 0.0
-        for symbol, qty in holdings.items():
-            # Use the current value of the stock
-            stock_current_value = stocks_current_value.get(symbol, 0.0)
-            
-            if stocks_current_value is None:
-                raise ValueError(f"Stock {symbol} not found in current value data.")
-            else:
-                portfolio_value += stock_current_value * qty
-
-        stats = {
-            "current_balance": self.balance,
-            "realized_profit": self.get_realized_profit(session),
-            "portfolio_value": portfolio_value,
-            "total_equity": self.balance + portfolio_value,
-            "holdings": holdings,
-            "holdings_value": {symbol: stocks_current_value.get(symbol, 0.0) * qty for symbol, qty in holdings.items()},
-            "realized_profit_by_stock": self.get_realized_profit_by_stock(session),
-        }
-        return stats
+        if stocks_current_value is None:
+            raise ValueError("No current value data for the stocks.")
+        if cost_basis is None:
+            positions = session.query(Position).filter(Position.trader_id == self.id).all()
+        else:
+            # imported here, cost_basis depends on this module
+            from .cost_basis import load_transactions, compute_pnl
+            positions = compute_pnl(load_transactions(session, self.id), cost_basis, stocks_current_value).values()
+        return performance_stats(self.balance, positions, stocks_current_value)
 
-    def add_thought(self, session, action: str, stock: str, quantity: int, confidence: float, reasoning: str, mode: str):
+    def add_thought(self, session, action: str, stock: str, quantity: int, confidence: float, reasoning: str, mode: str,
+                    commit: bool = True):
         """
         Add a reasoning entry to the trader's history.
         """
@@ -204,28 +285,49 @@ class Trader(Base):
             mode=mode
         )
         session.add(thought)
-        session.commit()
-        
-    def add_thoughts(self, session, thoughts):
+        if commit:
+            session.commit()
+
+    def add_thoughts(self, session, thoughts, commit: bool = True):
         """
-        Add multiple reasoning entries to the trader's history.
+        Add multiple reasoning entries to the trader's history,
+        as one bulk INSERT instead of one ORM object per entry.
         """
-        for thought in thoughts:
-            thought = Thought(
-                trader=self,
-                action=thought["action"],
-                stock=thought["stock"],
-                quantity=thought["quantity"],
-                confidence=thought["confidence"],
-                reasoning=thought["reasoning"],
-                mode=thought["mode"]
-            )
-            session.add(thought)
-        session.commit()
-        
+        if not thoughts:
+            return
+        if self.id is None:
+            session.flush()
+        session.execute(insert(Thought), [
+            {
+                "trader_id": self.id,
+                "action": thought["action"],
+                "stock": thought["stock"],
+                "quantity": thought["quantity"],
+                "confidence": thought["confidence"],
+                "reasoning": thought["reasoning"],
+                "mode": thought["mode"],
+                "status": thought.get("status"),
+            }
+            for thought in thoughts
+        ])
+        # the rows bypassed the unit of work, reload the collection on next access
+        session.expire(self, ["thoughts"])
+        if commit:
+            session.commit()
+
     def get_thoughts(self):
         """Return a list of all reasoning entries (for convenience)."""
         return self.thoughts
+
+    def get_recent_thoughts(self, session, limit: int = 20):
+        """Return the `limit` most recent reasoning entries, newest first (index backed)."""
+        return (
+            session.query(Thought)
+            .filter(Thought.trader_id == self.id)
+            .order_by(Thought.timestamp.desc(), Thought.id.desc())
+            .limit(limit)
+            .all()
+        )
 class Transaction(Base):
     """
     A Transaction ORM model to record buy/sell events, with a relationship back to the Trader.
@@ -243,6 +345,68 @@ class Transaction(Base):
 
     trader = relationship("Trader", back_populates="transactions")
 
+    __table_args__ = (
+        # serves the per-symbol BUY/SELL aggregates of a trader
+        Index("ix_transactions_trader_symbol_type", "trader_id", "symbol", "transaction_type"),
+        # keyset pagination of the history, newest first
+        Index("ix_transactions_trader_timestamp_id", "trader_id", "timestamp", "id"),
+    )
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Return the column values, JSON ready."""
+        return {
+            "id": self.id,
+            "trader_id": self.trader_id,
+            "symbol": self.symbol,
+            "quantity": self.quantity,
+            "price": self.price,
+            "transaction_type": self.transaction_type.value,
+            "timestamp": self.timestamp.isoformat(),
+        }
+
+class Position(Base):
+    """
+    Position ledger: one row per (trader, symbol) with the quantity held,
+    its average cost and the realized P&L of everything sold so far.
+    Maintained by Trader.buy_stock/sell_stock in the same DB transaction as
+    the Transaction insert; `ledger.py` can rebuild or verify it from the
+    transactions table.
+    """
+    __tablename__ = "positions"
+
+    trader_id = Column(Integer, ForeignKey("traders.id"), primary_key=True)
+    symbol = Column(String, primary_key=True)
+    quantity = Column(Integer, nullable=False, default=0)
+    average_cost = Column(Float, nullable=False, default=0.0)
+    realized_pnl = Column(Float, nullable=False, default=0.0)
+
+    trader = relationship("Trader", back_populates="positions")
+
+    def apply_buy(self, quantity: int, price: float):
+        total_cost = self.average_cost * self.quantity + price * quantity
+        self.quantity += quantity
+        self.average_cost = total_cost / self.quantity if self.quantity else 0.0
+
+    def apply_sell(self, quantity: int, price: float):
+        self.realized_pnl += (price - self.average_cost) * quantity
+        self.quantity -= quantity
+        if self.quantity == 0:
+            self.average_cost = 0.0
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Return the column values, JSON ready."""
+        return {
+            "symbol": self.symbol,
+            "quantity": self.quantity,
+            "average_cost": self.average_cost,
+            "realized_pnl": self.realized_pnl,
+        }
+
+# outcome recorded with each thought: its plan was executed (HOLDs included), the whole plan
+# was rejected and nothing of it executed, or its order was dropped (no price for the symbol)
+THOUGHT_STATUSES = ("executed", "rejected", "skipped")
+
+
 class Thought(Base):
     """
     A model to record one or more 'reasoning' entries associated with a Trader.
@@ -271,16 +435,89 @@ class Thought(Base):
     confidence = Column(Float, nullable=False)
     reasoning = Column(String, nullable=False)
     timestamp = Column(DateTime, default=datetime.utcnow, nullable=False)
+    # THOUGHT_STATUSES outcome of the decision, NULL on rows recorded before the column existed
+    status = Column(String, nullable=True)
 
     # Relationship back to Trader
     trader = relationship("Trader", back_populates="thoughts")
 
-def get_scoped_session(db_url: str = "sqlite:///:memory:"):
+    __table_args__ = (
+        # keyset pagination of the history, newest first
+        Index("ix_thoughts_trader_timestamp_id", "trader_id", "timestamp", "id"),
+    )
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Return the column values, JSON ready."""
+        return {
+            "id": self.id,
+            "trader_id": self.trader_id,
+            "mode": self.mode,
+            "action": self.action,
+            "stock": self.stock,
+            "quantity": self.quantity,
+            "confidence": self.confidence,
+            "reasoning": self.reasoning,
+            "status": self.status,
+            "timestamp": self.timestamp.isoformat(),
+        }
+
+class EquitySnapshot(Base):
+    """
+    Equity time series: one row per trader and update cycle, written by
+    `equity.record_equity_snapshots` at the end of each cycle.
+    `holdings_value` is a compact {symbol: value} of the open positions.
+    """
+    __tablename__ = "equity_snapshots"
+
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    trader_id = Column(Integer, ForeignKey("traders.id"), nullable=False)
+    timestamp = Column(DateTime, default=datetime.utcnow, nullable=False)
+    balance = Column(Float, nullable=False)
+    portfolio_value = Column(Float, nullable=False)
+    total_equity = Column(Float, nullable=False)
+    holdings_value = Column(JSON, nullable=False, default=dict)
+
+    trader = relationship("Trader", back_populates="equity_snapshots")
+
+    __table_args__ = (
+        # range scans of one trader's curve
+        Index("ix_equity_snapshots_trader_timestamp", "trader_id", "timestamp"),
+    )
+
+def performance_stats(balance: float, positions, stocks_current_value) -> Dict[str, Any]:
+    """
+    Build the stats of Trader.get_performance_stats from a balance and per-symbol positions
+    (anything with symbol, quantity, average_cost and realized_pnl: Position rows or
+    cost_basis.SymbolPnL). Shared by the sync model and the async repository.
+    """
+    positions = list(positions)
+    holdings = {p.symbol: p.quantity for p in positions if p.quantity > 0}
+    realized_profit_by_stock = {p.symbol: p.realized_pnl for p in positions}
+    unrealized_profit_by_stock = {
+        p.symbol: p.quantity * (stocks_current_value.get(p.symbol, 0.0) - p.average_cost) for p in positions if p.quantity > 0
+    }
+    holdings_value = {symbol: stocks_current_value.get(symbol, 0.0) * qty for symbol, qty in holdings.items()}
+    portfolio_value = sum(holdings_value.values())
+
+    stats = {
+        "current_balance": balance,
+        "realized_profit": sum(realized_profit_by_stock.values()),
+        "portfolio_value": portfolio_value,
+        "total_equity": balance + portfolio_value,
+        "holdings": holdings,
+        "holdings_value": holdings_value,
+        "realized_profit_by_stock": realized_profit_by_stock,
+        "unrealized_profit": sum(unrealized_profit_by_stock.values()),
+        "unrealized_profit_by_stock": unrealized_profit_by_stock,
+    }
+    return stats
+
+def get_scoped_session(db_url: str = "sqlite:///:memory:", config=None):
     """
     Return a thread-safe scoped session connected to the given database URL.
     By default, uses an in-memory SQLite DB for demonstration.
+    Engine, pool and SQLite pragmas come from `storage.StorageConfig` (`config`, or the defaults for `db_url`).
     """
-    engine = create_engine(db_url, echo=False)
-    Base.metadata.create_all(engine)
-    factory = sessionmaker(bind=engine)
-    return scoped_session(factory)
+    # imported here, storage depends on this module
+    from .storage import Storage, StorageConfig
+    return Storage(config or StorageConfig(url=db_url)).scoped
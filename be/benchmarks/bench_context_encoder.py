@@ -0,0 +1,90 @@
+"""
+Prompt tokens of the decision context: the raw context dict as the prompts
+used to embed it, the verbose blocks of trader.prompts, and the compact
+encoding of trader.context_encoder at several token budgets.
+
+    python benchmarks/bench_context_encoder.py [--symbols 6]
+"""
+import os
+import sys
+import argparse
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'app'))
+
+from trader.prompts import count_tokens, render_market_block, tiktoken
+from trader.context_encoder import ContextEncoder
+
+BUDGETS = [None, 400, 200]
+SYMBOLS = ["AAPL", "AMZN", "GOOGL", "MSFT", "TSLA", "NVDA", "META", "NFLX", "AMD", "INTC"]
+
+
+def synthetic(symbols, rng):
+    prices = {s: float(rng.uniform(50, 500)) for s in symbols}
+    reddit = {s: {
+        "total_posts": int(rng.integers(1, 20)),
+        "sentiment_distribution": {"positive": 3, "neutral": 2, "negative": 1},
+        "comment_statistics": {"total_comments": 60, "positive_comments": 25, "neutral_comments": 20, "negative_comments": 15},
+        "subreddits": ["stocks", "wallstreetbets", "investing"],
+        "average_compound_score": float(rng.normal(0.1, 0.2)),
+    } for s in symbols}
+    rss = {s: {
+        "total_articles": int(rng.integers(5, 80)),
+        "sentiment_distribution": {"positive": 20, "neutral": 15, "negative": 5},
+        "sentiment_percentages": {"positive": 50.0, "neutral": 37.5, "negative": 12.5},
+        "average_confidence": np.float64(rng.uniform(0.5, 0.95)),
+        "average_scores": {k: np.float64(v) for k, v in zip(["negative", "neutral", "positive"], rng.dirichlet([1, 1, 1]))},
+    } for s in symbols}
+    comparison = pd.DataFrame({s: {
+        "article_count": 50,
+        "avg_sentiment": rng.normal(0.15, 0.1),
+        "recent_sentiment": rng.normal(0.15, 0.1),
+        "sentiment_std": rng.uniform(0.1, 0.3),
+        "latest_article_time": pd.Timestamp("2025-01-10 14:30"),
+        "most_common_sentiment": "Somewhat-Bullish",
+    } for s in symbols}).T
+    forecast = ""
+    for s in symbols:
+        forecast += "\n\n" + f"{s} : " + "\n"
+        for label in ("hours", "days"):
+            forecast += f" Predictions for the next 7 {label} : " + "\n"
+            for model in ("LSTM_univariate", "MLP_univariate"):
+                values = prices[s] * np.cumprod(1 + rng.normal(0, 0.01, 7))
+                forecast += f"{model} : {' '.join(str(np.float32(v)) for v in values)} " + "\n"
+    context = {
+        "sentiment_analysis": {"reddit": reddit, "news": (rss, comparison)},
+        "forecast": forecast,
+        "current_prices": prices,
+    }
+    return prices, context
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--symbols", type=int, default=6)
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    prices, context = synthetic(SYMBOLS[:args.symbols], np.random.default_rng(0))
+    # the prompt used to embed the context dict as is, twice (portfolio and sentiment)
+    raw = count_tokens(f"{context}\n{context}")
+    verbose = count_tokens(render_market_block(prices, context))
+    print(f"tokenizer: {'tiktoken' if tiktoken is not None else 'estimate (~4 chars/token)'}, {args.symbols} symbols")
+    print(f"raw context dict x2: {raw:>6} tokens")
+    print(f"verbose blocks:      {verbose:>6} tokens")
+    print(f"{'budget':>8} {'tokens':>7} {'vs raw':>7} {'encode (ms)':>12}  dropped")
+    for budget in BUDGETS:
+        encoder = ContextEncoder(budget=budget)
+        # encode_time excludes measuring the verbose baseline
+        times = []
+        for _ in range(args.repeat):
+            encoded = encoder.encode_market(prices, context)
+            times.append(encoded.encode_time)
+        elapsed = float(np.median(times))
+        print(f"{encoder.budget:>8} {encoded.tokens_after:>7} {encoded.tokens_after / raw:>7.1%} {elapsed * 1000:>12.2f}  {encoded.dropped}")
+    print("\n" + ContextEncoder().encode_market(prices, context).text)
+
+
+if __name__ == '__main__':
+    main()
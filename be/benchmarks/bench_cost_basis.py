@@ -0,0 +1,139 @@
+"""
+Time the lot engine of trader.cost_basis on synthetic transaction histories,
+from in-memory arrays and from the database (load_transactions + FIFO), and
+check its average cost results against a row-by-row Position replay and its
+LIFO results against a stack of lots. From the database, most of the time
+is sqlite3 materializing the rows (fetchall), not the lot engine.
+
+    python benchmarks/bench_cost_basis.py
+"""
+import os
+import sys
+import time
+import tempfile
+from datetime import datetime, timedelta
+
+import numpy as np
+from sqlalchemy import insert
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'app'))
+
+from trader.trader import Trader, Transaction, TransactionType, Position
+from trader.storage import Storage, StorageConfig
+from trader.cost_basis import TransactionArrays, CostBasisMethod, compute_pnl, load_transactions
+
+SIZES = [10_000, 100_000, 1_000_000]
+SYMBOLS = ["AAPL", "NVDA", "MSFT", "AMZN", "GOOGL", "META", "TSLA", "AMD", "NFLX", "INTC"]
+
+
+def synthetic_transactions(n, rng):
+    """Random buys and sells that never sell more than the current holdings."""
+    symbol_index = rng.integers(len(SYMBOLS), size=n)
+    wants_buy = rng.random(n) < 0.55
+    buy_quantity = rng.integers(1, 100, size=n)
+    sell_fraction = rng.random(n)
+    held = [0] * len(SYMBOLS)
+    is_buy = np.empty(n, dtype=bool)
+    quantity = np.empty(n)
+    for i, (k, buy, q, f) in enumerate(zip(symbol_index.tolist(), wants_buy.tolist(), buy_quantity.tolist(), sell_fraction.tolist())):
+        if buy or held[k] == 0:
+            held[k] += q
+            is_buy[i], quantity[i] = True, q
+        else:
+            # sell part of the position, or all of it one time in four
+            q = held[k] if f < 0.25 else max(1, int(held[k] * f))
+            held[k] -= q
+            is_buy[i], quantity[i] = False, q
+    price = 100 + np.cumsum(rng.normal(0, 0.5, size=n))
+    return TransactionArrays(np.array(SYMBOLS, dtype=object)[symbol_index], is_buy, quantity, price)
+
+
+def replay(transactions):
+    positions = {}
+    for symbol, buy, quantity, price in zip(transactions.symbol, transactions.is_buy.tolist(),
+                                            transactions.quantity.tolist(), transactions.price.tolist()):
+        position = positions.get(symbol)
+        if position is None:
+            position = positions[symbol] = Position(symbol=symbol, quantity=0, average_cost=0.0, realized_pnl=0.0)
+        if buy:
+            position.apply_buy(quantity, price)
+        else:
+            position.apply_sell(quantity, price)
+    return positions
+
+
+def lifo_stack(transactions):
+    """Realized P&L per symbol, consuming the most recent open lot first."""
+    lots, realized = {}, {}
+    for symbol, buy, quantity, price in zip(transactions.symbol, transactions.is_buy.tolist(),
+                                            transactions.quantity.tolist(), transactions.price.tolist()):
+        stack = lots.setdefault(symbol, [])
+        realized.setdefault(symbol, 0.0)
+        if buy:
+            stack.append([quantity, price])
+            continue
+        while quantity > 0 and stack:
+            taken = min(stack[-1][0], quantity)
+            realized[symbol] += taken * (price - stack[-1][1])
+            stack[-1][0] -= taken
+            quantity -= taken
+            if stack[-1][0] == 0:
+                stack.pop()
+    return realized
+
+
+def time_database(transactions):
+    """Seconds to read the transactions of a trader from SQLite and compute its FIFO P&L."""
+    with tempfile.TemporaryDirectory() as tmp:
+        storage = Storage(StorageConfig(url=f"sqlite:///{os.path.join(tmp, 'bench.sqlite')}"))
+        session = storage.scoped
+        trader = Trader(name="bench", balance=0.0)
+        session.add(trader)
+        session.commit()
+        start_time = datetime(2025, 1, 1)
+        session.execute(insert(Transaction), [
+            {"trader_id": trader.id, "symbol": symbol, "quantity": int(quantity), "price": price,
+             "transaction_type": TransactionType.BUY if buy else TransactionType.SELL,
+             "timestamp": start_time + timedelta(seconds=i)}
+            for i, (symbol, buy, quantity, price) in enumerate(zip(
+                transactions.symbol, transactions.is_buy.tolist(), transactions.quantity.tolist(), transactions.price.tolist()))
+        ])
+        session.commit()
+        start = time.perf_counter()
+        compute_pnl(load_transactions(session, trader.id), CostBasisMethod.FIFO)
+        elapsed = time.perf_counter() - start
+        session.remove()
+        storage.dispose()
+    return elapsed
+
+
+def main():
+    rng = np.random.default_rng(0)
+    prices = {symbol: 100.0 for symbol in SYMBOLS}
+    print(f"{'rows':>10} {'replay (s)':>11} " + " ".join(f"{m.value + ' (s)':>12}" for m in CostBasisMethod)
+          + f" {'DB + FIFO (s)':>14}")
+    for n in SIZES:
+        transactions = synthetic_transactions(n, rng)
+
+        start = time.perf_counter()
+        positions = replay(transactions)
+        t_replay = time.perf_counter() - start
+
+        timings = []
+        for method in CostBasisMethod:
+            start = time.perf_counter()
+            pnl = compute_pnl(transactions, method, prices)
+            timings.append(time.perf_counter() - start)
+            if method == CostBasisMethod.AVERAGE:
+                for symbol, position in positions.items():
+                    assert np.isclose(pnl[symbol].realized_pnl, position.realized_pnl, rtol=1e-8, atol=1e-6)
+                    assert np.isclose(pnl[symbol].quantity, position.quantity)
+            if method == CostBasisMethod.LIFO:
+                for symbol, realized in lifo_stack(transactions).items():
+                    assert np.isclose(pnl[symbol].realized_pnl, realized, rtol=1e-8, atol=1e-6)
+        t_database = time_database(transactions)
+        print(f"{n:>10} {t_replay:>11.3f} " + " ".join(f"{t:>12.3f}" for t in timings) + f" {t_database:>14.3f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,77 @@
+"""
+LLM calls and cycle time of a day of hourly decision cycles in a quiet market
+(prices drifting by ~0.2% an hour, sentiment and forecasts unchanged), with
+and without the DecisionCache. The LLM call is replaced by a fixed latency.
+
+    python benchmarks/bench_decision_cache.py [--traders 25] [--volatility 0.002]
+"""
+import os
+import io
+import sys
+import json
+import time
+import argparse
+import tempfile
+import contextlib
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'app'))
+sys.path.insert(0, os.path.dirname(__file__))
+
+from trader.trader import Trader
+from trader.storage import Storage, StorageConfig
+from trader.llm_trader import LLMTrader, MODES
+from trader.registry import DecisionScheduler
+from trader.decision_cache import DecisionCache, DecisionCacheConfig
+from bench_context_encoder import synthetic
+
+CYCLES = 24
+PLAN = [{"action": "HOLD", "stock": "AAPL", "quantity": 0, "confidence": 0.5, "reasoning": "bench"}]
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--traders", type=int, default=25)
+    parser.add_argument("--latency", type=float, default=0.2, help="simulated LLM latency (s)")
+    parser.add_argument("--volatility", type=float, default=0.002, help="hourly price volatility")
+    parser.add_argument("--tolerance", type=float, default=0.01)
+    args = parser.parse_args()
+
+    def fake_call(self, messages):
+        time.sleep(args.latency)
+        return json.dumps(PLAN)
+
+    LLMTrader.request_plan = fake_call
+    rng = np.random.default_rng(0)
+    prices, context = synthetic(["AAPL", "AMZN", "MSFT", "TSLA", "NVDA"], rng)
+    walks = np.exp(np.cumsum(rng.normal(0, args.volatility, (CYCLES, len(prices))), axis=0))
+    path = [{s: p * float(w) for (s, p), w in zip(prices.items(), row)} for row in walks]
+
+    print(f"{args.traders} traders, {CYCLES} hourly cycles, {args.volatility:.1%} hourly volatility, "
+          f"{args.tolerance:.1%} tolerance")
+    print(f"{'cache':>6} {'LLM calls':>10} {'hit rate':>9} {'mean cycle (s)':>15}")
+    for use_cache in (False, True):
+        with tempfile.TemporaryDirectory() as tmp:
+            storage = Storage(StorageConfig(url=f"sqlite:///{os.path.join(tmp, 'bench.sqlite')}"))
+            session = storage.scoped
+            modes = list(MODES)
+            session.add_all([Trader(name=f"T{i}", balance=1e4 + i, mode=modes[i % len(modes)]) for i in range(args.traders)])
+            session.commit()
+            session.remove()
+            cache = DecisionCache(DecisionCacheConfig(path=os.path.join(tmp, "cache.sqlite"), tolerance=args.tolerance)) if use_cache else None
+            scheduler = DecisionScheduler(session, max_concurrency=8, cache=cache)
+            calls, cycle_times = 0, []
+            with contextlib.redirect_stdout(io.StringIO()):
+                for market_data in path:
+                    report = scheduler.run(context, market_data)
+                    calls += report["traders"] - report["cached"]
+                    cycle_times.append(report["wall_time"])
+            hit_rate = cache.stats()["hit_rate"] if cache else 0.0
+            if cache:
+                cache.close()
+            storage.dispose()
+        print(f"{'on' if use_cache else 'off':>6} {calls:>10} {hit_rate:>9.0%} {np.mean(cycle_times):>15.2f}")
+
+
+if __name__ == '__main__':
+    main()
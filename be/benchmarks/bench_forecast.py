@@ -0,0 +1,58 @@
+"""
+Latency of Predictor.forecast() with the per-step `model.predict` calls
+(before) and with the traced direct model call (after).
+
+    python benchmarks/bench_forecast.py [--fixtures DIR] [--stocks AMZN MSFT ...]
+
+Run from the directory holding `models/` (and `data/bars`). With --fixtures,
+bars are read from `<DIR>/<SYMBOL>_<interval>.csv` instead of yfinance.
+Missing or expired models are trained first.
+"""
+import os
+import sys
+import time
+import argparse
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'app'))
+
+from time_series.bar_store import BarStore, CSVProvider
+from time_series.predictor import Predictor
+
+
+def set_compiled(predictor: Predictor, compiled: bool):
+    for stock in predictor.predictors.values():
+        for stock_predictor in stock.values():
+            stock_predictor.compiled_predict = compiled
+
+
+def time_forecast(predictor: Predictor, repeat: int):
+    predictor.forecast()  # warm-up: model loads and graph tracing
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        predictor.forecast()
+        timings.append(time.perf_counter() - start)
+    timings.sort()
+    return timings[len(timings) // 2], timings[-1]
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--fixtures', default=None)
+    parser.add_argument('--stocks', nargs='+', default=['AMZN', 'MSFT', 'TSLA', 'NVDA'])
+    parser.add_argument('--period', default='2y')
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    provider = CSVProvider(args.fixtures) if args.fixtures else None
+    predictor = Predictor(period=args.period, stocks=args.stocks, bar_store=BarStore(provider=provider))
+    predictor.train(force=False)
+
+    for name, compiled in [('model.predict (before)', False), ('tf.function (after)', True)]:
+        set_compiled(predictor, compiled)
+        median, worst = time_forecast(predictor, args.repeat)
+        print(f"{name:<24} median {median * 1000:8.1f} ms   max {worst * 1000:8.1f} ms")
+
+
+if __name__ == '__main__':
+    main()
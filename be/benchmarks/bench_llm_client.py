@@ -0,0 +1,75 @@
+"""
+Decision cycle time with the AsyncLLMClient against the local stub of the
+chat completions API (trader.llm_stub), started on a free port: all prompts
+are in flight at once, the cycle takes about as long as the slowest call.
+
+    python benchmarks/bench_llm_client.py [--latency 0.5] [--jitter 0.2] [--failure-rate 0.05]
+"""
+import os
+import io
+import sys
+import time
+import socket
+import logging
+import argparse
+import tempfile
+import threading
+import contextlib
+
+import uvicorn
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'app'))
+
+from trader.trader import Trader
+from trader.storage import Storage, StorageConfig
+from trader.registry import DecisionScheduler
+from trader.llm_client import AsyncLLMClient
+from trader.llm_stub import create_app
+
+TRADERS = [5, 25, 100]
+
+
+def start_stub(latency, jitter, failure_rate):
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        port = sock.getsockname()[1]
+    server = uvicorn.Server(uvicorn.Config(create_app(latency, jitter, failure_rate), port=port, log_level="error"))
+    threading.Thread(target=server.run, daemon=True).start()
+    while not server.started:
+        time.sleep(0.05)
+    return server, f"http://127.0.0.1:{port}/v1"
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--latency", type=float, default=0.5, help="stub latency (s)")
+    parser.add_argument("--jitter", type=float, default=0.2)
+    parser.add_argument("--failure-rate", type=float, default=0.05, help="fraction of 429 answers")
+    parser.add_argument("--concurrency", type=int, default=100)
+    args = parser.parse_args()
+
+    # the retried 429s are counted in the report
+    logging.getLogger("trader.llm_client").setLevel(logging.ERROR)
+    server, base_url = start_stub(args.latency, args.jitter, args.failure_rate)
+    print(f"{'traders':>8} {'summed LLM (s)':>15} {'slowest (s)':>12} {'cycle (s)':>10} {'retries':>8} {'errors':>7}")
+    for n in TRADERS:
+        with tempfile.TemporaryDirectory() as tmp:
+            storage = Storage(StorageConfig(url=f"sqlite:///{os.path.join(tmp, 'bench.sqlite')}"))
+            session = storage.scoped
+            session.add_all([Trader(name=f"T{i}", balance=1e6, mode="ideal") for i in range(n)])
+            session.commit()
+            session.remove()
+            client = AsyncLLMClient(base_url=base_url, api_key="stub", max_concurrency=args.concurrency,
+                                    requests_per_minute=60_000, backoff_base=0.1)
+            scheduler = DecisionScheduler(session, llm_client=client)
+            with contextlib.redirect_stdout(io.StringIO()):
+                report = scheduler.run({}, {"AAPL": 100.0})
+            storage.dispose()
+        llm_times = [result["llm_time"] for result in report["per_trader"].values()]
+        print(f"{n:>8} {sum(llm_times):>15.2f} {max(llm_times):>12.2f} {report['wall_time']:>10.2f} "
+              f"{report['llm']['retries']:>8} {report['errors']:>7}")
+    server.should_exit = True
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,64 @@
+"""
+Time trader.risk on synthetic histories of hundreds of traders, vectorized
+over the whole (time x trader) equity panel vs one trader at a time.
+
+    python benchmarks/bench_risk.py
+"""
+import os
+import sys
+import time
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'app'))
+
+from trader.risk import equity_metrics, holdings_correlation
+
+TRADERS = [10, 100, 500]
+SNAPSHOTS = 24 * 365
+SYMBOLS = 50
+
+
+def synthetic(traders, rng):
+    index = pd.date_range("2024-01-01", periods=SNAPSHOTS, freq="h")
+    returns = rng.normal(0.00005, 0.002, size=(SNAPSHOTS, traders))
+    equity = pd.DataFrame(10_000 * np.cumprod(1 + returns, axis=0), index=index, columns=range(traders))
+    prices = pd.DataFrame(100 * np.cumprod(1 + rng.normal(0, 0.01, size=(365, SYMBOLS)), axis=0),
+                          columns=[f"S{k}" for k in range(SYMBOLS)])
+    # each trader holds a handful of symbols
+    values = rng.random((traders, SYMBOLS)) * (rng.random((traders, SYMBOLS)) < 0.1)
+    holdings = pd.DataFrame(values * 1000, index=range(traders), columns=prices.columns)
+    return equity, holdings, prices
+
+
+def per_trader(equity, holdings, prices):
+    results = []
+    for trader in equity.columns:
+        metrics = equity_metrics(equity[[trader]])
+        correlation = holdings_correlation(holdings.loc[[trader]], prices)
+        results.append((metrics, correlation))
+    return results
+
+
+def vectorized(equity, holdings, prices):
+    return equity_metrics(equity), holdings_correlation(holdings, prices)
+
+
+def main():
+    rng = np.random.default_rng(0)
+    print(f"{'traders':>8} {'snapshots':>10} {'loop (s)':>10} {'vectorized (s)':>15} {'speedup':>8}")
+    for traders in TRADERS:
+        equity, holdings, prices = synthetic(traders, rng)
+        start = time.perf_counter()
+        loop = per_trader(equity, holdings, prices)
+        t_loop = time.perf_counter() - start
+        start = time.perf_counter()
+        metrics, correlation = vectorized(equity, holdings, prices)
+        t_vectorized = time.perf_counter() - start
+        assert np.allclose(pd.concat([m for m, _ in loop]).to_numpy(), metrics.to_numpy(), equal_nan=True)
+        assert np.allclose(pd.concat([c for _, c in loop]).to_numpy(), correlation.to_numpy(), equal_nan=True)
+        print(f"{traders:>8} {SNAPSHOTS:>10} {t_loop:>10.3f} {t_vectorized:>15.3f} {t_loop / t_vectorized:>7.0f}x")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,55 @@
+"""
+Decision cycle time of the DecisionScheduler against the number of traders,
+with the LLM call replaced by a fixed latency (no API key needed).
+
+    python benchmarks/bench_scheduler.py [--latency 0.5] [--concurrency 16]
+"""
+import os
+import io
+import sys
+import json
+import time
+import argparse
+import tempfile
+import contextlib
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'app'))
+
+from trader.trader import Trader
+from trader.storage import Storage, StorageConfig
+from trader.llm_trader import LLMTrader
+from trader.registry import DecisionScheduler
+
+TRADERS = [5, 25, 100, 250]
+PLAN = [{"action": "BUY", "stock": "AAPL", "quantity": 1, "confidence": 0.9, "reasoning": "bench"}]
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--latency", type=float, default=0.5, help="simulated LLM latency (s)")
+    parser.add_argument("--concurrency", type=int, default=16)
+    args = parser.parse_args()
+
+    def fake_call(self, messages):
+        time.sleep(args.latency)
+        return json.dumps(PLAN)
+
+    LLMTrader.request_plan = fake_call
+
+    print(f"{'traders':>8} {'summed (s)':>15} {'cycle (s)':>10} {'p95 trader (s)':>15} {'errors':>7}")
+    for n in TRADERS:
+        with tempfile.TemporaryDirectory() as tmp:
+            storage = Storage(StorageConfig(url=f"sqlite:///{os.path.join(tmp, 'bench.sqlite')}"))
+            session = storage.scoped
+            session.add_all([Trader(name=f"T{i}", balance=1e6, mode="ideal") for i in range(n)])
+            session.commit()
+            session.remove()
+            scheduler = DecisionScheduler(session, max_concurrency=args.concurrency)
+            with contextlib.redirect_stdout(io.StringIO()):
+                report = scheduler.run({}, {"AAPL": 100.0})
+            storage.dispose()
+        print(f"{n:>8} {report['total_time']:>15.2f} {report['wall_time']:>10.2f} {report['p95_time']:>15.2f} {report['errors']:>7}")
+
+
+if __name__ == '__main__':
+    main()
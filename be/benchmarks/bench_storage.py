@@ -0,0 +1,120 @@
+"""
+Concurrent read/write benchmark of the trading database: one writer thread
+executing trades while reader threads compute performance stats (what the
+dashboard does), with SQLAlchemy defaults vs the tuned StorageConfig.
+
+    python benchmarks/bench_storage.py [--seconds 10] [--readers 4]
+"""
+import os
+import sys
+import time
+import random
+import argparse
+import tempfile
+import threading
+
+import numpy as np
+from sqlalchemy import create_engine
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.orm import sessionmaker, scoped_session
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'app'))
+
+from trader.trader import Trader
+from trader.storage import StorageConfig, Storage, init_schema
+
+SYMBOLS = ["AAPL", "NVDA", "MSFT", "AMZN", "GOOGL"]
+PRICES = {symbol: 100.0 for symbol in SYMBOLS}
+
+
+def default_session(url):
+    engine = create_engine(url)
+    init_schema(engine)
+    return scoped_session(sessionmaker(bind=engine)), engine
+
+
+def tuned_session(url):
+    storage = Storage(StorageConfig(url=url))
+    return storage.scoped, storage.engine
+
+
+def run(make_session, seconds, readers):
+    with tempfile.TemporaryDirectory() as tmp:
+        session, engine = make_session(f"sqlite:///{os.path.join(tmp, 'bench.sqlite')}")
+        trader = Trader(name="bench", balance=1e12)
+        session.add(trader)
+        session.commit()
+        trader_id = trader.id
+        session.remove()
+
+        stop = threading.Event()
+        writes, write_errors, read_errors = [0], [0], [0]
+        read_latencies = [[] for _ in range(readers)]
+
+        def writer():
+            rng = random.Random(0)
+            while not stop.is_set():
+                try:
+                    t = session.get(Trader, trader_id)
+                    symbol = rng.choice(SYMBOLS)
+                    t.buy_stock(session, symbol, 2, 100.0, commit=False)
+                    t.sell_stock(session, symbol, 1, 101.0, commit=False)
+                    t.add_thought(session, "BUY", symbol, 2, 0.9, "bench", "bench")
+                    writes[0] += 1
+                except OperationalError:
+                    session.rollback()
+                    write_errors[0] += 1
+            session.remove()
+
+        def reader(k):
+            while not stop.is_set():
+                start = time.perf_counter()
+                try:
+                    t = session.get(Trader, trader_id)
+                    t.get_performance_stats(session, PRICES)
+                    session.query(Trader).count()
+                    read_latencies[k].append(time.perf_counter() - start)
+                except OperationalError:
+                    session.rollback()
+                    read_errors[0] += 1
+                # each dashboard read is a short-lived session
+                session.remove()
+
+        threads = [threading.Thread(target=writer)] + [threading.Thread(target=reader, args=(k,)) for k in range(readers)]
+        for thread in threads:
+            thread.start()
+        time.sleep(seconds)
+        stop.set()
+        for thread in threads:
+            thread.join()
+        engine.dispose()
+
+    latencies = np.concatenate([np.array(l) for l in read_latencies if l]) * 1000 if any(read_latencies) else np.zeros(1)
+    return {
+        "writes/s": writes[0] / seconds,
+        "reads/s": len(latencies) / seconds,
+        "read p50 (ms)": float(np.percentile(latencies, 50)),
+        "read p99 (ms)": float(np.percentile(latencies, 99)),
+        "read max (ms)": float(latencies.max()),
+        "errors": write_errors[0] + read_errors[0],
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--seconds", type=float, default=10)
+    parser.add_argument("--readers", type=int, default=4)
+    args = parser.parse_args()
+
+    results = {
+        "defaults": run(default_session, args.seconds, args.readers),
+        "tuned": run(tuned_session, args.seconds, args.readers),
+    }
+    columns = list(results["defaults"])
+    print(f"{'':>10} " + " ".join(f"{c:>14}" for c in columns))
+    for name, result in results.items():
+        print(f"{name:>10} " + " ".join(f"{result[c]:>14.1f}" for c in columns))
+
+
+if __name__ == '__main__':
+    main()
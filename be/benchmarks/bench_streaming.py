@@ -0,0 +1,90 @@
+"""
+Decision time per trader with the replies of the local chat completions stub
+(trader.llm_stub) streamed, each decision executed as soon as it is parsed,
+against waiting for the whole reply. Plans are committed or rolled back whole
+either way: streaming brings the first executed order forward to the first
+parsed decision, and cancels a plan that cannot be executed at its first
+rejected order instead of generating it to the end.
+
+    python benchmarks/bench_streaming.py [--traders 25] [--latency 2.0]
+"""
+import os
+import io
+import sys
+import time
+import socket
+import logging
+import argparse
+import tempfile
+import threading
+import contextlib
+
+import numpy as np
+import uvicorn
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'app'))
+
+from trader.trader import Trader
+from trader.storage import Storage, StorageConfig
+from trader.registry import DecisionScheduler
+from trader.llm_client import AsyncLLMClient
+from trader.llm_stub import create_app
+
+SYMBOLS = ["AAPL", "AMZN", "MSFT", "TSLA", "NVDA"]
+REASONING = "Strong forecast and positive sentiment over the week."
+PLANS = {
+    "valid": [{"action": "BUY", "stock": s, "quantity": 1, "confidence": 0.8, "reasoning": REASONING} for s in SYMBOLS],
+    # the first order is over the balance: the whole plan is rejected
+    "rejected": [{"action": "BUY", "stock": s, "quantity": 10_000 if i == 0 else 1, "confidence": 0.8,
+                  "reasoning": REASONING} for i, s in enumerate(SYMBOLS)],
+}
+
+
+def start_stub(latency, chunk, plan):
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        port = sock.getsockname()[1]
+    server = uvicorn.Server(uvicorn.Config(create_app(latency, plan=plan, chunk=chunk), port=port, log_level="error"))
+    threading.Thread(target=server.run, daemon=True).start()
+    while not server.started:
+        time.sleep(0.05)
+    return server, f"http://127.0.0.1:{port}/v1"
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--traders", type=int, default=25)
+    parser.add_argument("--latency", type=float, default=2.0, help="stub generation time of a reply (s)")
+    parser.add_argument("--chunk", type=int, default=16, help="characters per streamed event")
+    args = parser.parse_args()
+
+    logging.getLogger("trader.llm_client").setLevel(logging.ERROR)
+    print(f"{args.traders} traders, {len(SYMBOLS)} BUY decisions per reply, {args.latency:.1f}s per reply")
+    print(f"{'plan':>9} {'stream':>7} {'mean trader (s)':>16} {'first action (s)':>17} {'cycle (s)':>10} "
+          f"{'orders':>7} {'cancelled':>10}")
+    for name, plan in PLANS.items():
+        server, base_url = start_stub(args.latency, args.chunk, plan)
+        for stream in (False, True):
+            with tempfile.TemporaryDirectory() as tmp:
+                storage = Storage(StorageConfig(url=f"sqlite:///{os.path.join(tmp, 'bench.sqlite')}"))
+                session = storage.scoped
+                session.add_all([Trader(name=f"T{i}", balance=10_000, mode="ideal") for i in range(args.traders)])
+                session.commit()
+                session.remove()
+                client = AsyncLLMClient(base_url=base_url, api_key="stub", max_concurrency=args.traders,
+                                        requests_per_minute=60_000)
+                scheduler = DecisionScheduler(session, llm_client=client, stream=stream)
+                with contextlib.redirect_stdout(io.StringIO()):
+                    report = scheduler.run({}, {s: 100.0 for s in SYMBOLS})
+                storage.dispose()
+            durations = [result["duration"] for result in report["per_trader"].values()]
+            orders = sum(result["orders"] for result in report["per_trader"].values())
+            first_action = report["time_to_first_action"]["mean"]
+            first_action = f"{first_action:>17.2f}" if first_action is not None else f"{'-':>17}"
+            print(f"{name:>9} {'on' if stream else 'off':>7} {np.mean(durations):>16.2f} {first_action} "
+                  f"{report['wall_time']:>10.2f} {orders:>7} {report['cancelled']:>10}")
+        server.should_exit = True
+
+
+if __name__ == '__main__':
+    main()
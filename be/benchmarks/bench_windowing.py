@@ -0,0 +1,74 @@
+"""
+Compare the old Python-loop windowing of StockPredictor with the strided
+views of time_series.windowing.
+
+    python benchmarks/bench_windowing.py
+"""
+import os
+import sys
+import time
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'app'))
+
+from time_series.windowing import window_univariate, window_multivariate
+
+WINDOW_SIZE = 6
+SIZES = [10_000, 100_000, 1_000_000]
+
+
+def loop_univariate(data, window_size):
+    X = []
+    y = []
+    for i in range(len(data) - window_size - 1):
+        X.append(data[i:(i + window_size)])
+        y.append(data[i + window_size])
+    return np.array(X), np.array(y).reshape(-1, 1)
+
+
+def loop_multivariate(data, close_data, window_size):
+    X = []
+    y = []
+    for i in range(len(data) - window_size - 1):
+        X.append(data[i:(i + window_size), :])
+        y.append(close_data[i + window_size])
+    return np.array(X), np.array(y).reshape(-1, 1)
+
+
+def timeit(fn, *args, repeat=3):
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn(*args)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main():
+    rng = np.random.default_rng(0)
+    print(f"{'rows':>10} {'path':>13} {'loop (s)':>10} {'strided (s)':>12} {'speedup':>8}")
+    for n in SIZES:
+        close = rng.random((n, 1))
+        features = rng.random((n, 4))
+
+        X_old, y_old = loop_univariate(close, WINDOW_SIZE)
+        X_new, y_new = window_univariate(close, WINDOW_SIZE)
+        assert X_old.shape == X_new.shape and np.array_equal(X_old, X_new)
+        assert y_old.shape == y_new.shape and np.array_equal(y_old, y_new)
+
+        X_old, y_old = loop_multivariate(features, close, WINDOW_SIZE)
+        X_new, y_new = window_multivariate(features, close, WINDOW_SIZE)
+        assert X_old.shape == X_new.shape and np.array_equal(X_old, X_new)
+        assert y_old.shape == y_new.shape and np.array_equal(y_old, y_new)
+
+        for name, old, new, args in [
+            ('univariate', loop_univariate, window_univariate, (close, WINDOW_SIZE)),
+            ('multivariate', loop_multivariate, window_multivariate, (features, close, WINDOW_SIZE)),
+        ]:
+            t_old = timeit(old, *args)
+            t_new = timeit(new, *args)
+            print(f"{n:>10} {name:>13} {t_old:>10.4f} {t_new:>12.6f} {t_old / t_new:>7.0f}x")
+
+
+if __name__ == '__main__':
+    main()
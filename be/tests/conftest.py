@@ -0,0 +1,29 @@
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'app'))
+
+from trader.trader import Trader
+from trader.storage import Storage, StorageConfig
+
+
+@pytest.fixture
+def storage(tmp_path):
+    storage = Storage(StorageConfig(url=f"sqlite:///{tmp_path / 'test.sqlite'}"))
+    yield storage
+    storage.dispose()
+
+
+@pytest.fixture
+def session(storage):
+    return storage.scoped
+
+
+@pytest.fixture
+def trader(session):
+    trader = Trader(name="Alice", balance=10_000.0, mode="ideal")
+    session.add(trader)
+    session.commit()
+    return trader
@@ -0,0 +1,97 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from time_series.bar_store import BAR_COLUMNS, BarStore, CSVProvider
+
+
+def write_bars(csv_dir, start, count, symbol="AAPL", interval="1h"):
+    """`count` hourly bars from `start` in the yf.download(...).to_csv() format, Close = bar number."""
+    index = pd.date_range(start, periods=count, freq="h", tz="UTC", name="Datetime")
+    close = np.arange(count, dtype=float)
+    data = pd.DataFrame(np.column_stack([close, close + 1, close - 1, close, close * 10]), index=index,
+                        columns=pd.MultiIndex.from_product([BAR_COLUMNS, [symbol]], names=["Price", "Ticker"]))
+    data.to_csv(csv_dir / f"{symbol}_{interval}.csv")
+    return data
+
+
+class RecordingProvider(CSVProvider):
+    def __init__(self, root):
+        super().__init__(root)
+        self.calls = []
+
+    def fetch(self, symbol, interval, start=None, period=None):
+        self.calls.append((symbol, interval, start, period))
+        return super().fetch(symbol, interval, start=start, period=period)
+
+
+@pytest.fixture
+def csv_dir(tmp_path):
+    path = tmp_path / "csv"
+    path.mkdir()
+    return path
+
+
+@pytest.fixture
+def start():
+    return pd.Timestamp.now(tz="UTC").floor("h") - pd.Timedelta(hours=99)
+
+
+@pytest.fixture
+def provider(csv_dir):
+    return RecordingProvider(str(csv_dir))
+
+
+@pytest.fixture
+def store(tmp_path, provider):
+    return BarStore(str(tmp_path / "bars"), provider=provider, refresh_interval=300)
+
+
+def test_first_read_fetches_the_whole_period(csv_dir, start, provider, store):
+    expected = write_bars(csv_dir, start, 100)
+    bars = store.get_bars("AAPL", "1h", "60d")
+    assert list(bars.columns) == BAR_COLUMNS
+    assert bars.index.equals(expected.index.rename(None))
+    np.testing.assert_array_equal(bars["Close"], np.arange(100))
+    assert provider.calls == [("AAPL", "1h", None, "60d")]
+
+
+def test_refresh_is_throttled_then_fetches_the_tail_only(csv_dir, start, provider, store):
+    write_bars(csv_dir, start, 100)
+    store.get_bars("AAPL", "1h", "60d")
+    # the last bar was still forming: it changes, and two new bars arrive
+    data = write_bars(csv_dir, start, 102)
+    data.iloc[99, :] = 500.0
+    data.to_csv(csv_dir / "AAPL_1h.csv")
+
+    assert len(store.get_bars("AAPL", "1h", "60d")) == 100
+    assert len(provider.calls) == 1
+
+    store.refresh("AAPL", "1h", "60d", force=True)
+    assert provider.calls[-1][2] == (start + pd.Timedelta(hours=99)).to_pydatetime()
+    bars = store.get_bars("AAPL", "1h", "60d", refresh=False)
+    assert len(bars) == 102
+    assert bars["Close"].iloc[98:].tolist() == [98.0, 500.0, 100.0, 101.0]
+    assert store.get_last_close("AAPL") == 101.0
+
+
+def test_period_filters_the_stored_bars(csv_dir, start, store):
+    write_bars(csv_dir, start, 100)
+    store.refresh("AAPL", "1h", "60d")
+    assert len(store.get_bars("AAPL", "1h", "1d", refresh=False)) == 25
+    assert len(store.get_bars("AAPL", "1h", "max", refresh=False)) == 100
+
+
+def test_stale_store_is_fetched_again(csv_dir, provider, store):
+    write_bars(csv_dir, pd.Timestamp("2020-01-01", tz="UTC"), 10)
+    store.refresh("AAPL", "1h", "60d")
+    store.refresh("AAPL", "1h", "60d", force=True)
+    assert [call[2] for call in provider.calls] == [None, None]
+
+
+def test_symbol_without_bars(tmp_path, provider):
+    store = BarStore(str(tmp_path / "bars"), provider=provider)
+    provider.fetch = lambda *args, **kwargs: pd.DataFrame()
+    assert store.get_bars("MSFT", "1h").empty
+    with pytest.raises(ValueError):
+        store.get_last_close("MSFT")
@@ -0,0 +1,137 @@
+import pandas as pd
+import pytest
+
+from trader.context_encoder import SECTION_PRIORITIES, ContextEncoder, parse_forecast
+from trader.prompts import count_tokens
+
+SYMBOLS = [f"S{i:02d}" for i in range(30)]
+# kept first to last when the budget runs out, prices are required
+ORDER = sorted((name for name in SECTION_PRIORITIES if name != "prices"), key=SECTION_PRIORITIES.get)
+
+
+def forecast_text(symbols):
+    """Text of `Predictor.format_forcast`."""
+    text = ""
+    for i, symbol in enumerate(symbols):
+        text += f"\n\n{symbol} : \n"
+        for label, base in (("hours", 100.0), ("days", 110.0)):
+            text += f" Predictions for the next 7 {label} : \n"
+            for model in ("LSTM_univariate", "MLP_univariate"):
+                text += f"{model} : {' '.join(str(base + i + step) for step in range(7))} \n"
+    return text
+
+
+@pytest.fixture
+def market():
+    market_data = {symbol: 100.0 + i for i, symbol in enumerate(SYMBOLS)}
+    rss = {symbol: {"total_articles": 40 - i, "sentiment_percentages": {"positive": 50.0, "negative": 20.0},
+                    "average_confidence": 0.81} for i, symbol in enumerate(SYMBOLS)}
+    comparison = pd.DataFrame({
+        "article_count": [30 - i for i in range(len(SYMBOLS))],
+        "avg_sentiment": 0.12, "recent_sentiment": 0.2, "sentiment_std": 0.31, "most_common_sentiment": "Neutral",
+    }, index=SYMBOLS)
+    reddit = {symbol: {"total_posts": 20 - i % 20, "average_compound_score": 0.05,
+                       "comment_statistics": {"positive_comments": 3, "neutral_comments": 2, "negative_comments": 1}}
+              for i, symbol in enumerate(SYMBOLS)}
+    context = {"forecast": forecast_text(SYMBOLS), "sentiment_analysis": {"news": (rss, comparison), "reddit": reddit}}
+    return market_data, context
+
+
+def sections(text):
+    """Encoded text -> {section name: rows}."""
+    names = {"PRICES": "prices", "FORECAST": "forecast", "NEWS": "news", "NEWS_AV": "news_av", "REDDIT": "reddit"}
+    parsed, current = {}, None
+    for line in text.split("\n"):
+        header = line.split(" ", 1)[0]
+        if "(" in line and header in names:
+            current = parsed[names[header]] = []
+        else:
+            current.append(line)
+    return parsed
+
+
+def test_forecast_is_parsed_from_the_predictor_text():
+    forecasts = parse_forecast(forecast_text(["AAPL", "MSFT"]))
+    assert forecasts["AAPL"][("7h", "LSTM_univariate")] == [100.0 + step for step in range(7)]
+    assert forecasts["MSFT"][("7d", "MLP_univariate")][-1] == 117.0
+
+
+def test_everything_fits_a_large_budget(market):
+    market_data, context = market
+    encoded = ContextEncoder(budget=100_000).encode_market(market_data, context)
+    assert encoded.dropped == {}
+    assert {name: len(rows) for name, rows in sections(encoded.text).items()} == {name: len(SYMBOLS) for name in SECTION_PRIORITIES}
+    assert encoded.tokens_after < encoded.tokens_before
+
+
+@pytest.mark.parametrize("budget", [150, 300, 450, 600, 750])
+def test_output_stays_within_the_budget(market, budget):
+    market_data, context = market
+    encoded = ContextEncoder(budget=budget).encode_market(market_data, context)
+    assert encoded.tokens_after == count_tokens(encoded.text)
+    assert encoded.tokens_after <= budget
+    assert encoded.dropped
+
+
+@pytest.mark.parametrize("budget", range(150, 850, 25))
+def test_sections_are_truncated_by_priority(market, budget):
+    market_data, context = market
+    full = sections(ContextEncoder(budget=100_000).encode_market(market_data, context).text)
+    encoded = ContextEncoder(budget=budget).encode_market(market_data, context)
+    kept = sections(encoded.text)
+
+    # prices are never dropped
+    assert kept["prices"] == full["prices"]
+    kept_counts = [len(kept.get(name, [])) for name in ORDER]
+    # a section only loses rows once every lower priority one is gone, and keeps its first rows
+    cut = next((i for i, name in enumerate(ORDER) if kept_counts[i] < len(full[name])), len(ORDER))
+    assert all(count == len(SYMBOLS) for count in kept_counts[:cut])
+    assert all(count == 0 for count in kept_counts[cut + 1:])
+    for name in ORDER:
+        assert kept.get(name, []) == full[name][:len(kept.get(name, []))]
+        assert encoded.dropped.get(name, 0) == len(full[name]) - len(kept.get(name, []))
+
+
+def test_rows_are_kept_in_section_order(market):
+    market_data, context = market
+    kept = sections(ContextEncoder(budget=100_000).encode_market(market_data, context).text)
+    # most covered symbols first, forecasts as the last predicted price vs the current one
+    assert [row.split("|")[0] for row in kept["news"]] == SYMBOLS
+    assert kept["reddit"][0].startswith("S00|20|")
+    assert kept["forecast"][0] == "S00|+6.0|+6.0|+16.0|+16.0"
+
+
+def test_priorities_change_the_truncation_order(market):
+    market_data, context = market
+    priorities = {**SECTION_PRIORITIES, "reddit": 1, "forecast": 4}
+    kept = sections(ContextEncoder(budget=400, priorities=priorities).encode_market(market_data, context).text)
+    assert len(kept["reddit"]) == len(SYMBOLS)
+    assert "forecast" not in kept
+
+
+def test_required_prices_exceed_a_tiny_budget(market):
+    market_data, context = market
+    encoded = ContextEncoder(budget=1).encode_market(market_data, context)
+    assert list(sections(encoded.text)) == ["prices"]
+    assert encoded.dropped == {name: len(SYMBOLS) for name in ORDER}
+
+
+def test_portfolio_keeps_the_summary_then_the_largest_holdings():
+    holdings = {symbol: 10 + i for i, symbol in enumerate(SYMBOLS[:20])}
+    stats = {
+        "total_equity": 25_000.0, "current_balance": 5_000.0, "portfolio_value": 20_000.0,
+        "realized_profit": 120.0, "unrealized_profit": -40.0,
+        "holdings": holdings,
+        "holdings_value": {symbol: 100.0 * quantity for symbol, quantity in holdings.items()},
+        "unrealized_profit_by_stock": {symbol: 1.5 for symbol in holdings},
+        "realized_profit_by_stock": {symbol: 10.0 + i for i, symbol in enumerate(SYMBOLS)},
+    }
+    encoded = ContextEncoder(portfolio_budget=120).encode_portfolio(stats)
+    lines = encoded.text.split("\n")
+    assert lines[0].startswith("PORTFOLIO") and lines[1] == "25000|5000|20000|120|-40"
+    assert encoded.tokens_after <= 120
+    # by value, the largest holding first; closed positions only once every holding fits
+    assert lines[3].startswith("S19|29|2900|")
+    assert encoded.dropped["holdings"] > 0
+    assert encoded.dropped["closed"] == len(SYMBOLS) - len(holdings)
+    assert "CLOSED" not in encoded.text
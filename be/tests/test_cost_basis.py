@@ -0,0 +1,107 @@
+import numpy as np
+import pytest
+
+from trader.cost_basis import CostBasisMethod, TransactionArrays, compute_pnl, load_transactions
+
+
+def replay(is_buy, quantity, price, method):
+    """Naive lot by lot reference: (open lots as [quantity, price], realized P&L per lot)."""
+    lots, realized = [], []
+    for buy, q, p in zip(is_buy, quantity, price):
+        if buy:
+            lots.append([q, p])
+            realized.append(0.0)
+            continue
+        open_lots = [i for i, lot in enumerate(lots) if lot[0] > 0]
+        if method == CostBasisMethod.LIFO:
+            open_lots.reverse()
+        for i in open_lots:
+            if q <= 0:
+                break
+            taken = min(q, lots[i][0])
+            lots[i][0] -= taken
+            realized[i] += taken * (p - lots[i][1])
+            q -= taken
+    return lots, realized
+
+
+def replay_average(is_buy, quantity, price):
+    held = average = realized = 0.0
+    for buy, q, p in zip(is_buy, quantity, price):
+        if buy:
+            average = (held * average + q * p) / (held + q)
+            held += q
+        else:
+            realized += q * (p - average)
+            held -= q
+    return held, average, realized
+
+
+def random_history(rng, n):
+    """`n` transactions of one symbol that never sell more than is held."""
+    is_buy, quantity, held = [], [], 0.0
+    for _ in range(n):
+        buy = held == 0 or rng.random() < 0.55
+        q = float(rng.integers(1, 20)) if buy else float(rng.integers(1, held + 1))
+        held += q if buy else -q
+        is_buy.append(buy)
+        quantity.append(q)
+    return np.array(is_buy), np.array(quantity), rng.uniform(50, 150, n).round(2)
+
+
+@pytest.mark.parametrize("method", [CostBasisMethod.FIFO, CostBasisMethod.LIFO])
+@pytest.mark.parametrize("seed", range(20))
+def test_lots_match_the_reference(method, seed):
+    rng = np.random.default_rng(seed)
+    is_buy, quantity, price = random_history(rng, int(rng.integers(1, 60)))
+    pnl = compute_pnl(TransactionArrays(np.full(len(price), "AAPL", dtype=object), is_buy, quantity, price),
+                      method, {"AAPL": 100.0})["AAPL"]
+
+    lots, realized = replay(is_buy, quantity, price, method)
+    open_quantity = np.array([lot[0] for lot in lots])
+    np.testing.assert_allclose(pnl.lot_open_quantity, open_quantity, atol=1e-9)
+    np.testing.assert_allclose(pnl.lot_realized_pnl, realized, atol=1e-6)
+    assert pnl.quantity == pytest.approx(open_quantity.sum())
+    assert pnl.realized_pnl == pytest.approx(sum(realized))
+    assert pnl.cost_basis == pytest.approx(sum(q * p for q, p in lots))
+    assert pnl.unrealized_pnl == pytest.approx(sum(q * (100.0 - p) for q, p in lots))
+
+
+@pytest.mark.parametrize("seed", range(20))
+def test_average_matches_the_reference(seed):
+    rng = np.random.default_rng(seed)
+    is_buy, quantity, price = random_history(rng, int(rng.integers(1, 60)))
+    pnl = compute_pnl(TransactionArrays(np.full(len(price), "AAPL", dtype=object), is_buy, quantity, price),
+                      CostBasisMethod.AVERAGE, {"AAPL": 100.0})["AAPL"]
+
+    held, average, realized = replay_average(is_buy, quantity, price)
+    assert pnl.quantity == pytest.approx(held)
+    assert pnl.realized_pnl == pytest.approx(realized)
+    if held:
+        assert pnl.average_cost == pytest.approx(average)
+        assert pnl.unrealized_pnl == pytest.approx(held * (100.0 - average))
+
+
+def test_lifo_and_fifo_differ_on_the_lot_sold():
+    transactions = TransactionArrays(np.array(["AAPL"] * 3, dtype=object), np.array([True, True, False]),
+                                     np.array([10.0, 10.0, 10.0]), np.array([100.0, 120.0, 130.0]))
+    assert compute_pnl(transactions, CostBasisMethod.FIFO)["AAPL"].realized_pnl == pytest.approx(300.0)
+    assert compute_pnl(transactions, CostBasisMethod.LIFO)["AAPL"].realized_pnl == pytest.approx(100.0)
+    assert compute_pnl(transactions, CostBasisMethod.AVERAGE)["AAPL"].realized_pnl == pytest.approx(200.0)
+
+
+def test_load_transactions_reads_the_trades_in_order(session, trader):
+    trader.buy_stock(session, "AAPL", 10, 100.0)
+    trader.buy_stock(session, "MSFT", 5, 50.0)
+    trader.sell_stock(session, "AAPL", 4, 110.0)
+
+    transactions = load_transactions(session, trader.id)
+    assert list(transactions.symbol) == ["AAPL", "MSFT", "AAPL"]
+    assert list(transactions.is_buy) == [True, True, False]
+    np.testing.assert_array_equal(transactions.quantity, [10.0, 5.0, 4.0])
+    np.testing.assert_array_equal(transactions.price, [100.0, 50.0, 110.0])
+
+    pnl = compute_pnl(transactions, CostBasisMethod.FIFO, {"AAPL": 120.0, "MSFT": 40.0})
+    assert pnl["AAPL"].realized_pnl == pytest.approx(40.0)
+    assert pnl["AAPL"].unrealized_pnl == pytest.approx(6 * 20.0)
+    assert pnl["MSFT"].unrealized_pnl == pytest.approx(-50.0)
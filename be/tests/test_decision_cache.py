@@ -0,0 +1,95 @@
+import pytest
+
+from trader import decision_cache
+from trader.decision_cache import DecisionCache, DecisionCacheConfig
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1_000_000.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(decision_cache.time, "time", clock)
+    return clock
+
+
+@pytest.fixture
+def make_cache(tmp_path):
+    caches = []
+
+    def make(**options):
+        cache = DecisionCache(DecisionCacheConfig(path=str(tmp_path / "cache.sqlite"), **options))
+        caches.append(cache)
+        return cache
+    yield make
+    for cache in caches:
+        cache.close()
+
+
+def test_entries_expire_after_the_ttl(clock, make_cache):
+    cache = make_cache(ttl=60)
+    cache.put("a", "plan a")
+    clock.now += 59
+    assert cache.get("a") == "plan a"
+    clock.now += 2
+    assert cache.get("a") is None
+    stats = cache.stats()
+    assert (stats["entries"], stats["hits"], stats["misses"], stats["expired"]) == (0, 1, 1, 1)
+
+
+def test_put_drops_the_expired_entries(clock, make_cache):
+    cache = make_cache(ttl=60)
+    cache.put("old", "plan")
+    clock.now += 61
+    cache.put("new", "plan")
+    assert cache.stats()["entries"] == 1
+    assert cache.stats()["expired"] == 1
+
+
+def test_least_recently_used_entries_are_evicted(clock, make_cache):
+    cache = make_cache(max_entries=3)
+    for key in "abc":
+        cache.put(key, f"plan {key}")
+        clock.now += 1
+    # reading "a" makes "b" the least recently used
+    assert cache.get("a") == "plan a"
+    clock.now += 1
+    cache.put("d", "plan d")
+    assert cache.get("b") is None
+    assert [cache.get(key) for key in "acd"] == ["plan a", "plan c", "plan d"]
+    assert cache.stats()["evicted"] == 1
+    assert cache.stats()["entries"] == 3
+
+
+def test_entries_survive_a_restart(clock, make_cache):
+    make_cache().put("a", "plan a")
+    assert make_cache().get("a") == "plan a"
+
+
+def test_bypass_skips_reads_but_stores(clock, make_cache):
+    cache = make_cache(bypass=True)
+    cache.put("a", "plan a")
+    assert cache.get("a") is None
+    cache.bypass = False
+    assert cache.get("a") == "plan a"
+    assert cache.stats()["bypassed"] == 1
+
+
+def test_keys_tolerate_small_moves(make_cache):
+    cache = make_cache(tolerance=0.01)
+    stats = {"holdings": {"AAPL": 3, "MSFT": 0}, "current_balance": 5_000.0}
+
+    def key(price, balance=5_000.0, holdings=None):
+        market = cache.market_key({"AAPL": price}, {})
+        return cache.key("ideal", market, {**stats, "current_balance": balance, "holdings": holdings or stats["holdings"]})
+
+    assert key(100.0) == key(100.2) == key(100.0, balance=5_010.0)
+    assert key(100.0) != key(105.0)
+    assert key(100.0) != key(100.0, balance=6_000.0)
+    assert key(100.0) != key(100.0, holdings={"AAPL": 4})
@@ -0,0 +1,113 @@
+import numpy as np
+import pytest
+
+from trader.equity import downsample, lttb, minmax_buckets
+
+
+def loop_lttb(x, y, threshold):
+    """Textbook LTTB, one bucket at a time, on the same bucket bounds as `lttb`."""
+    n = len(x)
+    buckets = threshold - 2
+    bounds = [1 + (i * (n - 2)) // buckets for i in range(buckets + 1)]
+    selected, a = [0], 0
+    for i in range(buckets):
+        if i + 1 < buckets:
+            start, end = bounds[i + 1], bounds[i + 2]
+            cx, cy = np.mean(x[start:end]), np.mean(y[start:end])
+        else:
+            cx, cy = x[n - 1], y[n - 1]
+        best, best_area = None, -1.0
+        for j in range(bounds[i], bounds[i + 1]):
+            area = abs((x[a] - cx) * (y[j] - y[a]) - (x[a] - x[j]) * (cy - y[a]))
+            if area > best_area:
+                best, best_area = j, area
+        selected.append(best)
+        a = best
+    return np.array(selected + [n - 1])
+
+
+@pytest.fixture
+def curve():
+    rng = np.random.default_rng(0)
+    x = np.arange(1_000, dtype=np.float64) * 60_000
+    return x, 10_000 + np.cumsum(rng.normal(size=len(x)))
+
+
+@pytest.mark.parametrize("threshold", [3, 4, 17, 100, 999])
+def test_lttb_matches_the_loop(curve, threshold):
+    x, y = curve
+    np.testing.assert_array_equal(lttb(x, y, threshold), loop_lttb(x, y, threshold))
+
+
+@pytest.mark.parametrize("threshold", [3, 10, 250])
+def test_lttb_keeps_the_first_and_last_points(curve, threshold):
+    x, y = curve
+    indices = lttb(x, y, threshold)
+    assert len(indices) == threshold
+    assert indices[0] == 0 and indices[-1] == len(x) - 1
+    assert np.all(np.diff(indices) > 0)
+
+
+@pytest.mark.parametrize("n, threshold", [(0, 10), (1, 10), (5, 5), (5, 10), (100, 2), (100, 0)])
+def test_lttb_returns_every_point_when_there_is_nothing_to_drop(n, threshold):
+    # n <= threshold, or a threshold too small to keep the first, last and one interior point
+    x = np.arange(n, dtype=np.float64)
+    np.testing.assert_array_equal(lttb(x, np.ones(n), threshold), np.arange(n))
+
+
+def test_lttb_constant_series():
+    x = np.arange(100, dtype=np.float64)
+    indices = lttb(x, np.full(100, 5.0), 10)
+    # every triangle is flat: one point per bucket, still in order and ending on the last point
+    assert len(indices) == 10
+    assert indices[0] == 0 and indices[-1] == 99
+    assert np.all(np.diff(indices) > 0)
+
+
+def test_minmax_keeps_every_peak_and_trough(curve):
+    _, y = curve
+    indices = minmax_buckets(y, 10)
+    assert indices[0] == 0 and indices[-1] == len(y) - 1
+    assert np.all(np.diff(indices) > 0)
+    assert np.argmin(y) in indices and np.argmax(y) in indices
+    for rows in np.array_split(np.arange(len(y)), 10):
+        assert rows[np.argmin(y[rows])] in indices
+        assert rows[np.argmax(y[rows])] in indices
+    assert len(indices) <= 2 * 10 + 2
+
+
+def test_minmax_uneven_buckets():
+    # 23 points in buckets of 3: the last bucket is padded, the padding is never picked
+    y = np.arange(23, dtype=np.float64)
+    indices = minmax_buckets(y, 8)
+    assert indices.max() == 22
+    np.testing.assert_array_equal(indices, np.unique(np.concatenate([[0, 22], np.arange(0, 23, 3), np.arange(2, 23, 3)[:7]])))
+
+
+@pytest.mark.parametrize("n, buckets", [(0, 3), (1, 3), (8, 3), (100, 0)])
+def test_minmax_returns_every_point_when_there_is_nothing_to_drop(n, buckets):
+    np.testing.assert_array_equal(minmax_buckets(np.ones(n), buckets), np.arange(n))
+
+
+def test_minmax_constant_series():
+    indices = minmax_buckets(np.full(100, 5.0), 10)
+    # minimum and maximum are the same point of each bucket
+    assert indices[0] == 0 and indices[-1] == 99
+    assert len(indices) == 11
+
+
+@pytest.mark.parametrize("method", ["lttb", "minmax"])
+def test_downsample(curve, method):
+    x, y = curve
+    timestamps = x.astype(np.int64)
+    sampled_timestamps, sampled = downsample(timestamps, y, 50, method)
+    assert len(sampled) <= 50
+    assert sampled_timestamps[0] == timestamps[0] and sampled_timestamps[-1] == timestamps[-1]
+    assert sampled_timestamps.dtype == timestamps.dtype
+    np.testing.assert_array_equal(sampled, y[np.searchsorted(timestamps, sampled_timestamps)])
+
+
+def test_downsample_rejects_unknown_methods(curve):
+    x, y = curve
+    with pytest.raises(ValueError, match="Unknown downsampling method"):
+        downsample(x, y, 50, "average")
@@ -0,0 +1,59 @@
+import pytest
+
+from trader.trader import Transaction, Thought, Position
+
+
+def thought(action, stock, quantity):
+    return {"action": action, "stock": stock, "quantity": quantity, "confidence": 0.9,
+            "reasoning": "test", "mode": "ideal"}
+
+
+def test_valid_plan_is_executed_in_one_commit(session, trader):
+    orders = [
+        {"action": "BUY", "stock": "AAPL", "quantity": 10, "price": 100.0},
+        {"action": "SELL", "stock": "AAPL", "quantity": 4, "price": 110.0},
+    ]
+    trader.execute_plan(session, orders, [thought("BUY", "AAPL", 10), thought("SELL", "AAPL", 4)])
+
+    assert trader.balance == pytest.approx(10_000 - 1_000 + 440)
+    assert session.query(Transaction).count() == 2
+    assert session.query(Thought).count() == 2
+    position = session.get(Position, (trader.id, "AAPL"))
+    assert position.quantity == 6
+    assert position.realized_pnl == pytest.approx(40.0)
+
+
+@pytest.mark.parametrize("orders", [
+    # the second buy is only affordable without the first one
+    [{"action": "BUY", "stock": "AAPL", "quantity": 60, "price": 100.0},
+     {"action": "BUY", "stock": "MSFT", "quantity": 50, "price": 100.0}],
+    # selling shares bought earlier in the same plan is allowed, not more than that
+    [{"action": "BUY", "stock": "AAPL", "quantity": 5, "price": 100.0},
+     {"action": "SELL", "stock": "AAPL", "quantity": 6, "price": 100.0}],
+    [{"action": "BUY", "stock": "AAPL", "quantity": 0, "price": 100.0}],
+    [{"action": "SHORT", "stock": "AAPL", "quantity": 1, "price": 100.0}],
+])
+def test_invalid_plan_executes_nothing(session, trader, orders):
+    with pytest.raises(ValueError):
+        trader.execute_plan(session, orders, [thought("BUY", "AAPL", 1)])
+
+    session.expire_all()
+    assert trader.balance == 10_000.0
+    assert session.query(Transaction).count() == 0
+    assert session.query(Thought).count() == 0
+    assert session.query(Position).count() == 0
+
+
+def test_database_error_rolls_back_the_applied_trades(session, trader, monkeypatch):
+    def fail(*args, **kwargs):
+        raise RuntimeError("insert failed")
+
+    monkeypatch.setattr(type(trader), "add_thoughts", fail)
+    with pytest.raises(RuntimeError):
+        trader.execute_plan(session, [{"action": "BUY", "stock": "AAPL", "quantity": 10, "price": 100.0}],
+                            [thought("BUY", "AAPL", 10)])
+
+    session.expire_all()
+    assert trader.balance == 10_000.0
+    assert session.query(Transaction).count() == 0
+    assert session.query(Position).count() == 0
@@ -0,0 +1,90 @@
+import datetime as dt
+
+import numpy as np
+import pandas as pd
+import pytest
+
+pytest.importorskip("tensorflow")
+
+from time_series import stock_predictor
+from time_series.bar_store import BAR_COLUMNS, BarStore, CSVProvider
+from time_series.model_registry import ModelRegistry
+from time_series.stock_predictor import StockPredictor
+
+N_BARS = 120
+
+
+def write_bars(csv_dir, index):
+    close = 100.0 + np.sin(np.arange(len(index)) / 5.0)
+    data = pd.DataFrame(np.column_stack([close, close + 0.5, close - 0.5, close, np.full(len(index), 1e6)]), index=index,
+                        columns=pd.MultiIndex.from_product([BAR_COLUMNS, ["AAPL"]], names=["Price", "Ticker"]))
+    data.to_csv(csv_dir / "AAPL_1h.csv")
+
+
+@pytest.fixture
+def bars(tmp_path, monkeypatch):
+    # models/ and the manifests are relative to the working directory
+    monkeypatch.chdir(tmp_path)
+    (tmp_path / "csv").mkdir()
+    start = pd.Timestamp.now(tz="UTC").floor("h") - pd.Timedelta(hours=N_BARS + 10)
+    index = pd.date_range(start, periods=N_BARS + 5, freq="h", tz="UTC", name="Datetime")
+    write_bars(tmp_path / "csv", index[:N_BARS])
+    return lambda count: write_bars(tmp_path / "csv", index[:count])
+
+
+@pytest.fixture
+def predictor(tmp_path, bars):
+    store = BarStore(str(tmp_path / "bars"), provider=CSVProvider(str(tmp_path / "csv")), refresh_interval=0)
+    predictor = StockPredictor("AAPL", interval="1h", period="60d", bar_store=store, model_registry=ModelRegistry())
+    assert predictor.train(force=True)
+    return predictor
+
+
+def expire(predictor):
+    """Age the manifest past EXPIRY_CST, return it as it was."""
+    manifest = predictor.read_manifest()
+    predictor.write_manifest({
+        key: {**entry, "creation_date": entry["creation_date"] - stock_predictor.EXPIRY_CST - 1}
+        for key, entry in manifest.items()
+    })
+    assert predictor.model_expiry()
+    return manifest
+
+
+def test_expired_models_without_new_bars_are_kept(predictor):
+    before = expire(predictor)
+    weights = predictor.load_model("LSTM_univariate").get_weights()
+
+    assert predictor.train()
+    after = predictor.read_manifest()
+    assert not predictor.model_expiry()
+    for key, entry in after.items():
+        assert entry["creation_date"] >= before[key]["creation_date"]
+        assert {k: entry[k] for k in ("full_train_date", "last_bar", "val_loss")} == \
+               {k: before[key][k] for k in ("full_train_date", "last_bar", "val_loss")}
+    for old, new in zip(weights, predictor.load_model("LSTM_univariate").get_weights()):
+        np.testing.assert_array_equal(old, new)
+
+
+def test_new_bars_are_fine_tuned_up_to_the_newest(predictor, bars, monkeypatch):
+    before = expire(predictor)
+    bars(N_BARS + 3)
+    predictor.data = predictor.get_stock_data()
+
+    preprocessor = predictor.load_preprocessing("LSTM_univariate", ["Close"])
+    X, y = predictor.recent_windows(preprocessor, before["LSTM_univariate_60d_1h"]["last_bar"])
+    # one window per new bar, the last one targets the newest bar
+    assert len(X) == len(y) == 3
+    np.testing.assert_allclose(preprocessor.inverse_transform_y(y).ravel(), predictor.data["Close"].to_numpy()[-3:])
+    np.testing.assert_allclose(preprocessor.x_scaler.inverse_transform(X[-1].reshape(1, -1)).ravel(),
+                               predictor.data["Close"].to_numpy()[-7:-1])
+
+    monkeypatch.setattr(stock_predictor, "DRIFT_THRESHOLD", float("inf"))
+    weights = predictor.load_model("LSTM_univariate").get_weights()
+    assert predictor.train()
+    after = predictor.read_manifest()
+    for key, entry in after.items():
+        assert entry["full_train_date"] == before[key]["full_train_date"]
+        assert entry["last_bar"] == int(predictor.data.index.as_unit("ns").asi8[-1]) > before[key]["last_bar"]
+    tuned = predictor.load_model("LSTM_univariate").get_weights()
+    assert any(not np.array_equal(old, new) for old, new in zip(weights, tuned))
@@ -0,0 +1,91 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from time_series.forecasting import direct_rollout, recursive_rollout
+
+
+def next_closes(horizon):
+    """Step of a fake model: the `horizon` next closes are the last one + 1, + 2, ..."""
+    return lambda X: X[:, -1, 0][:, np.newaxis] + np.arange(1, horizon + 1)
+
+
+def windows(batch=2, window_size=4, n_features=2):
+    X = np.zeros((batch, window_size, n_features))
+    X[:, :, 0] = np.arange(window_size) + 10 * np.arange(batch)[:, np.newaxis]
+    X[:, :, 1] = -1.0
+    return X
+
+
+def test_recursive_rollout_feeds_predictions_back():
+    X = windows()
+    seen = []
+
+    def step(window):
+        seen.append(window.copy())
+        return next_closes(1)(window)
+
+    forecast = recursive_rollout(step, X, 5)
+    np.testing.assert_array_equal(forecast, [[4, 5, 6, 7, 8], [14, 15, 16, 17, 18]])
+    # the window slides by one row per step, other features carried over
+    np.testing.assert_array_equal(seen[2][0, :, 0], [2, 3, 4, 5])
+    assert (seen[-1][:, :, 1] == -1.0).all()
+
+
+@pytest.mark.parametrize("n_instances, passes", [(1, 1), (3, 1), (4, 2), (7, 3), (24, 8)])
+def test_direct_rollout_continues_past_the_horizon(n_instances, passes):
+    calls = []
+
+    def step(window):
+        calls.append(window.copy())
+        return next_closes(3)(window)
+
+    forecast = direct_rollout(step, windows(), n_instances)
+    assert forecast.shape == (2, passes * 3)
+    assert len(calls) == passes
+    np.testing.assert_array_equal(forecast[0], 3 + np.arange(1, passes * 3 + 1))
+    np.testing.assert_array_equal(forecast[1], 13 + np.arange(1, passes * 3 + 1))
+    # every pass sees the last window_size closes, predicted ones included
+    for i, window in enumerate(calls):
+        np.testing.assert_array_equal(window[0, :, 0], np.arange(4) + 3 * i)
+
+
+def test_direct_rollout_with_a_horizon_longer_than_the_window():
+    forecast = direct_rollout(next_closes(6), windows(batch=1, window_size=2), 10)
+    np.testing.assert_array_equal(forecast[0], 1 + np.arange(1, 13))
+
+
+class DirectModel:
+    """Keras-like multi-horizon model, through `predict` (compiled_predict off)."""
+
+    def __init__(self, horizon):
+        self.horizon = horizon
+
+    def predict(self, X, verbose=0):
+        return X[:, -1, 0][:, np.newaxis] + 0.01 * np.arange(1, self.horizon + 1)
+
+
+def test_stock_predictor_direct_head_shorter_than_the_forecast(tmp_path, monkeypatch):
+    pytest.importorskip("tensorflow")
+    from time_series.bar_store import BAR_COLUMNS, BarStore, CSVProvider
+    from time_series.model_registry import ModelRegistry
+    from time_series.stock_predictor import StockPredictor
+
+    monkeypatch.chdir(tmp_path)
+    index = pd.date_range(pd.Timestamp.now(tz="UTC").floor("h") - pd.Timedelta(hours=99), periods=100, freq="h",
+                          tz="UTC", name="Datetime")
+    close = 100.0 + np.sin(np.arange(100) / 5.0)
+    pd.DataFrame(np.column_stack([close, close, close, close, close]), index=index,
+                 columns=pd.MultiIndex.from_product([BAR_COLUMNS, ["AAPL"]])).to_csv(tmp_path / "AAPL_1h.csv")
+    registry = ModelRegistry()
+    predictor = StockPredictor("AAPL", interval="1h", period="60d", direct_horizon=7, model_registry=registry,
+                               bar_store=BarStore(str(tmp_path / "bars"), provider=CSVProvider(str(tmp_path))))
+    predictor.compiled_predict = False
+    preprocessor, _, _ = predictor.fit_preprocessing(["Close"], 7)
+    preprocessor.save(predictor.preprocessing_path("LSTM_direct"))
+    registry.put("AAPL", "1h", "LSTM_direct", "60d", DirectModel(7), None)
+
+    forecast = predictor.forecast_lstm_direct(24)
+    assert forecast.shape == (24, 1)
+    assert np.isfinite(forecast).all()
+    np.testing.assert_allclose(forecast[:7], predictor.forecast_lstm_direct(7))
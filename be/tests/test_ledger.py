@@ -0,0 +1,85 @@
+import pytest
+
+from trader.trader import Trader, Position
+from trader.ledger import replay_positions, rebuild_positions, verify_positions
+
+
+@pytest.fixture
+def traded(session, trader):
+    trader.buy_stock(session, "AAPL", 10, 100.0)
+    trader.buy_stock(session, "AAPL", 10, 120.0)
+    trader.sell_stock(session, "AAPL", 5, 130.0)
+    trader.buy_stock(session, "MSFT", 3, 50.0)
+    trader.sell_stock(session, "MSFT", 3, 40.0)
+    return trader
+
+
+def test_trades_keep_the_ledger_in_sync(session, traded):
+    aapl = session.get(Position, (traded.id, "AAPL"))
+    assert aapl.quantity == 15
+    assert aapl.average_cost == pytest.approx(110.0)
+    assert aapl.realized_pnl == pytest.approx(5 * (130.0 - 110.0))
+    msft = session.get(Position, (traded.id, "MSFT"))
+    assert msft.quantity == 0
+    assert msft.average_cost == 0.0
+    assert msft.realized_pnl == pytest.approx(-30.0)
+    assert traded.get_holdings(session) == {"AAPL": 15}
+    assert verify_positions(session) == []
+
+
+def test_replay_matches_the_stored_ledger(session, traded):
+    replayed = replay_positions(session, traded.id)
+    for symbol, position in replayed.items():
+        stored = session.get(Position, (traded.id, symbol))
+        assert (position.quantity, position.average_cost, position.realized_pnl) == pytest.approx(
+            (stored.quantity, stored.average_cost, stored.realized_pnl))
+
+
+def test_verify_reports_drift_and_rebuild_repairs_it(session, traded):
+    session.get(Position, (traded.id, "AAPL")).quantity = 99
+    session.delete(session.get(Position, (traded.id, "MSFT")))
+    session.add(Position(trader_id=traded.id, symbol="TSLA", quantity=1, average_cost=1.0, realized_pnl=0.0))
+    session.commit()
+
+    mismatches = verify_positions(session)
+    assert len(mismatches) == 3
+    assert any("AAPL: quantity is 99" in m for m in mismatches)
+    assert any("MSFT: missing" in m for m in mismatches)
+    assert any("TSLA: unexpected" in m for m in mismatches)
+
+    rebuild_positions(session)
+    assert verify_positions(session) == []
+    assert session.get(Position, (traded.id, "AAPL")).quantity == 15
+    assert session.get(Position, (traded.id, "TSLA")) is None
+
+
+def test_rebuild_only_touches_the_given_traders(session, traded):
+    other = Trader(name="Bob", balance=1_000.0, mode="ideal")
+    session.add(other)
+    session.commit()
+    other.buy_stock(session, "NVDA", 2, 100.0)
+    session.get(Position, (other.id, "NVDA")).quantity = 7
+    session.commit()
+
+    rebuild_positions(session, [traded.id])
+    assert session.get(Position, (other.id, "NVDA")).quantity == 7
+    rebuild_positions(session, [other.id])
+    assert session.get(Position, (other.id, "NVDA")).quantity == 2
+
+
+def test_symbol_totals(session, traded):
+    assert traded.get_symbol_totals(session) == {
+        "AAPL": {"bought": 20, "sold": 5, "buy_amount": 2_200.0, "sell_amount": 650.0},
+        "MSFT": {"bought": 3, "sold": 3, "buy_amount": 150.0, "sell_amount": 120.0},
+    }
+
+
+def test_quick_verify_checks_quantities_against_the_totals(session, traded):
+    assert verify_positions(session, quick=True) == []
+
+    session.get(Position, (traded.id, "AAPL")).quantity = 99
+    session.get(Position, (traded.id, "MSFT")).average_cost = 1.0
+    session.commit()
+    # average cost and P&L are left to the full replay
+    assert verify_positions(session, quick=True) == [f"trader {traded.id} AAPL: quantity is 99, transactions give 15"]
+    assert len(verify_positions(session)) == 2
@@ -0,0 +1,145 @@
+import json
+import time
+import asyncio
+
+import httpx
+import pytest
+
+from trader import llm_client
+from trader.llm_client import AsyncLLMClient, LLMError, TokenBucket
+from trader.llm_stub import create_app, STUB_PLAN
+
+MESSAGES = [{"role": "user", "content": "plan"}]
+
+
+def make_client(app, **options):
+    options = {"max_concurrency": 4, "requests_per_minute": 60_000, "max_retries": 2, **options}
+    return AsyncLLMClient(base_url="http://stub/v1", api_key="stub", transport=httpx.ASGITransport(app=app), **options)
+
+
+def run(client, call):
+    async def main():
+        async with client:
+            return await call(client)
+    return asyncio.run(main())
+
+
+def test_chat_returns_the_stub_reply():
+    app = create_app(latency=0)
+    reply = run(make_client(app), lambda client: client.chat(MESSAGES))
+    assert json.loads(reply) == STUB_PLAN
+    assert app.state.requests == 1
+
+
+def test_429_is_retried_after_the_retry_after_delay():
+    app = create_app(latency=0, fail_first=2, retry_after=0.05)
+    client = make_client(app)
+    delays = []
+    backoff = client._backoff
+
+    def recorded(attempt, response=None):
+        delays.append(backoff(attempt, response))
+        return delays[-1]
+    client._backoff = recorded
+
+    reply = run(client, lambda client: client.chat(MESSAGES))
+    assert json.loads(reply) == STUB_PLAN
+    assert app.state.requests == 3
+    assert delays == [0.05, 0.05]
+    assert client.stats()["retries"] == 2
+    assert client.stats()["failures"] == 0
+
+
+def test_out_of_retries_raises():
+    app = create_app(latency=0, failure_rate=1.0, retry_after=0)
+    client = make_client(app, max_retries=2)
+    with pytest.raises(LLMError, match="3 attempts"):
+        run(client, lambda client: client.chat(MESSAGES))
+    assert app.state.requests == 3
+    assert client.stats()["failures"] == 1
+
+
+def test_backoff_is_jittered_and_capped(monkeypatch):
+    client = AsyncLLMClient(base_url="http://stub/v1", backoff_base=0.5, backoff_max=3.0)
+    bounds = []
+    monkeypatch.setattr(llm_client.random, "uniform", lambda low, high: bounds.append((low, high)) or high)
+    assert [client._backoff(attempt) for attempt in range(5)] == [0.5, 1.0, 2.0, 3.0, 3.0]
+    assert all(low == 0 for low, _ in bounds)
+    monkeypatch.undo()
+
+    # full jitter: concurrent retries spread over [0, cap] instead of all waiting the cap
+    delays = [client._backoff(3) for _ in range(200)]
+    assert all(0 <= delay <= 3.0 for delay in delays)
+    assert len(set(delays)) > 100
+    assert min(delays) < 1.0 < max(delays)
+
+
+def test_retry_after_is_capped():
+    client = AsyncLLMClient(base_url="http://stub/v1", backoff_max=3.0)
+    assert client._backoff(0, httpx.Response(429, headers={"Retry-After": "120"})) == 3.0
+    assert client._backoff(0, httpx.Response(429, headers={"Retry-After": "1.5"})) == 1.5
+
+
+def test_token_bucket_limits_the_rate():
+    async def acquire(bucket, count):
+        start = time.perf_counter()
+        for _ in range(count):
+            await bucket.acquire()
+        return time.perf_counter() - start
+
+    # a burst of `capacity`, then one token every 1 / rate seconds
+    assert asyncio.run(acquire(TokenBucket(rate=20, capacity=3), 3)) < 0.04
+    assert asyncio.run(acquire(TokenBucket(rate=20, capacity=3), 7)) >= 0.19
+
+
+def test_requests_per_minute_throttles_the_client():
+    app = create_app(latency=0)
+    # 600 requests per minute with bursts of 2: 6 requests take at least 4 / 10 s
+    client = make_client(app, max_concurrency=2, requests_per_minute=600)
+    start = time.perf_counter()
+    replies = run(client, lambda client: client.chat_many([MESSAGES] * 6))
+    assert time.perf_counter() - start >= 0.38
+    assert len(replies) == 6 and app.state.requests == 6
+
+
+def test_chat_many_keeps_the_order_of_the_conversations():
+    def plan(messages):
+        return [{"action": "HOLD", "stock": messages[-1]["content"], "quantity": 0, "confidence": 0.5, "reasoning": ""}]
+
+    # replies finish out of order, each one arrives in the slot of its conversation
+    app = create_app(latency=0.05, jitter=0.05, plan=plan)
+    conversations = [[{"role": "user", "content": f"S{i}"}] for i in range(12)]
+    replies = run(make_client(app, max_concurrency=12), lambda client: client.chat_many(conversations))
+    assert [json.loads(reply)[0]["stock"] for reply in replies] == [f"S{i}" for i in range(12)]
+
+
+def test_chat_many_returns_the_errors_in_place():
+    app = create_app(latency=0, fail_first=1)
+    client = make_client(app, max_concurrency=1, max_retries=0)
+    replies = run(client, lambda client: client.chat_many([MESSAGES] * 3))
+    assert isinstance(replies[0], LLMError)
+    assert [json.loads(reply) for reply in replies[1:]] == [STUB_PLAN, STUB_PLAN]
+
+
+def test_chat_stream_yields_the_reply_delta_by_delta():
+    app = create_app(latency=0, chunk=10)
+
+    async def collect(client):
+        return [delta async for delta in client.chat_stream(MESSAGES)]
+
+    deltas = run(make_client(app), collect)
+    content = json.dumps(STUB_PLAN)
+    assert deltas == [content[i:i + 10] for i in range(0, len(content), 10)]
+    assert json.loads("".join(deltas)) == STUB_PLAN
+
+
+def test_chat_stream_retries_before_the_first_delta():
+    app = create_app(latency=0, fail_first=1, retry_after=0)
+
+    async def collect(client):
+        return "".join([delta async for delta in client.chat_stream(MESSAGES)])
+
+    client = make_client(app)
+    assert json.loads(run(client, collect)) == STUB_PLAN
+    assert app.state.requests == 2
+    assert client.stats()["retries"] == 1
@@ -0,0 +1,49 @@
+import json
+
+import pytest
+
+pytest.importorskip("openai")
+
+from trader.trader import Trader, Transaction, Thought
+from trader.llm_trader import LLMTrader
+
+PRICES = {"AAPL": 100.0, "MSFT": 50.0}
+
+
+def decision(action, stock, quantity, confidence=0.9):
+    return {"action": action, "stock": stock, "quantity": quantity, "confidence": confidence, "reasoning": f"{action} {stock}"}
+
+
+def decide(session, trader, decisions):
+    llm = LLMTrader(trader, "", "ideal")
+    return llm.run_decision_making(session, PRICES, {}, plan_json=json.dumps({"decisions": decisions}))
+
+
+def statuses(session):
+    session.expire_all()
+    return {thought.reasoning: thought.status for thought in session.query(Thought)}
+
+
+def test_executed_plan_records_its_thoughts(session, trader):
+    orders = decide(session, trader, [decision("BUY", "AAPL", 10), decision("HOLD", "MSFT", 0)])
+
+    assert [order["stock"] for order in orders] == ["AAPL"]
+    assert statuses(session) == {"BUY AAPL": "executed", "HOLD MSFT": "executed"}
+    assert session.get(Trader, trader.id).balance == 9_000.0
+
+
+def test_rejected_plan_keeps_its_thoughts(session, trader):
+    orders = decide(session, trader, [decision("BUY", "AAPL", 10), decision("BUY", "MSFT", 1_000)])
+
+    assert orders == []
+    assert statuses(session) == {"BUY AAPL": "rejected", "BUY MSFT": "rejected"}
+    assert session.query(Transaction).count() == 0
+    assert session.get(Trader, trader.id).balance == 10_000.0
+
+
+def test_order_without_price_is_dropped_alone(session, trader):
+    orders = decide(session, trader, [decision("BUY", "AAPL", 10), decision("BUY", "TSLA", 1)])
+
+    assert [order["stock"] for order in orders] == ["AAPL"]
+    assert statuses(session) == {"BUY AAPL": "executed", "BUY TSLA": "skipped"}
+    assert session.query(Transaction).one().symbol == "AAPL"
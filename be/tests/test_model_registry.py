@@ -0,0 +1,101 @@
+import os
+import json
+import pickle
+
+import pytest
+
+from time_series.model_registry import ModelRegistry
+
+MODEL = "MLP_univariate_60d_1h"
+
+
+@pytest.fixture
+def root(tmp_path):
+    (tmp_path / "AAPL").mkdir()
+    return tmp_path
+
+
+def save_model(root, model):
+    with open(root / "AAPL" / f"{MODEL}.pkl", "wb") as file:
+        pickle.dump(model, file)
+
+
+def write_manifest(root, creation_date, mtime):
+    path = root / "AAPL" / "models_manager_60d_1h.json"
+    path.write_text(json.dumps({MODEL: {"creation_date": creation_date}}))
+    # manifests are re-read on mtime changes, set explicitly so the test does not depend on the clock resolution
+    os.utime(path, (mtime, mtime))
+
+
+def get(registry):
+    return registry.get("AAPL", "1h", "MLP_univariate", "60d")
+
+
+def test_cache_hits_while_the_creation_date_is_unchanged(root):
+    save_model(root, {"weights": 1})
+    write_manifest(root, "2024-01-01 10:00:00", 1_000)
+    registry = ModelRegistry(root=str(root))
+
+    first = get(registry)
+    assert first == {"weights": 1}
+    assert get(registry) is first
+    # rewritten with the same creation date (e.g. another model of the manifest retrained): still a hit
+    write_manifest(root, "2024-01-01 10:00:00", 2_000)
+    save_model(root, {"weights": 2})
+    assert get(registry) is first
+    assert registry.stats()["hits"] == 2
+    assert registry.stats()["misses"] == 1
+    assert registry.stats()["invalidations"] == 0
+
+
+def test_new_creation_date_invalidates_the_entry(root):
+    save_model(root, {"weights": 1})
+    write_manifest(root, "2024-01-01 10:00:00", 1_000)
+    registry = ModelRegistry(root=str(root))
+    assert get(registry) == {"weights": 1}
+
+    save_model(root, {"weights": 2})
+    write_manifest(root, "2024-01-02 10:00:00", 2_000)
+    assert get(registry) == {"weights": 2}
+    assert get(registry) == {"weights": 2}
+    assert registry.stats()["misses"] == 2
+    assert registry.stats()["invalidations"] == 1
+    assert registry.stats()["hits"] == 1
+
+
+def test_models_missing_from_the_manifest_use_the_file_mtime(root):
+    save_model(root, {"weights": 1})
+    path = root / "AAPL" / f"{MODEL}.pkl"
+    os.utime(path, (1_000, 1_000))
+    registry = ModelRegistry(root=str(root))
+    assert registry.version("AAPL", "1h", "MLP_univariate", "60d") == 1_000
+    assert get(registry) == {"weights": 1}
+
+    save_model(root, {"weights": 2})
+    os.utime(path, (2_000, 2_000))
+    assert get(registry) == {"weights": 2}
+    assert registry.stats()["invalidations"] == 1
+
+
+def test_put_serves_a_model_until_the_manifest_moves_on(root):
+    save_model(root, {"weights": 1})
+    write_manifest(root, "2024-01-01 10:00:00", 1_000)
+    registry = ModelRegistry(root=str(root))
+    registry.put("AAPL", "1h", "MLP_univariate", "60d", {"weights": "fine-tuned"}, "2024-01-01 10:00:00")
+    assert get(registry) == {"weights": "fine-tuned"}
+
+    write_manifest(root, "2024-01-03 10:00:00", 3_000)
+    assert get(registry) == {"weights": 1}
+
+
+def test_invalidate_drops_the_entries_of_a_symbol(root):
+    save_model(root, {"weights": 1})
+    write_manifest(root, "2024-01-01 10:00:00", 1_000)
+    registry = ModelRegistry(root=str(root))
+    get(registry)
+    registry.invalidate("MSFT")
+    get(registry)
+    registry.invalidate("AAPL")
+    get(registry)
+    assert registry.stats()["misses"] == 2
+    assert registry.stats()["hits"] == 1
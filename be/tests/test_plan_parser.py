@@ -0,0 +1,75 @@
+import re
+import json
+
+import pytest
+
+from trader.plan_parser import PlanExtractor, iter_plan_items, parse_plan
+
+DECISIONS = [
+    {"action": "BUY", "stock": "AAPL", "quantity": 3, "confidence": 0.8, "reasoning": "Breakout, {\"brackets\"} in text"},
+    {"action": "sell", "stock": " msft ", "quantity": 1, "confidence": 0.6, "reasoning": "Take profit"},
+]
+PLAN = json.dumps({"decisions": DECISIONS}, indent=2)
+
+
+def actions(plan):
+    return [(decision.action, decision.stock, decision.quantity) for decision in plan.decisions]
+
+
+@pytest.mark.parametrize("reply", [
+    PLAN,
+    json.dumps(DECISIONS),
+    f"```json\n{PLAN}\n```",
+    f"Here is my plan:\n```\n{json.dumps(DECISIONS)}\n```\nGood luck!",
+])
+def test_wrapped_plans_are_read_whole(reply):
+    plan = parse_plan(reply)
+    assert actions(plan) == [("BUY", "AAPL", 3), ("SELL", "MSFT", 1)]
+    assert plan.errors == []
+
+
+def test_truncated_reply_keeps_the_complete_decisions():
+    reply = "```json\n" + PLAN[:PLAN.index('"Take profit"')]
+    plan = parse_plan(reply)
+    assert actions(plan) == [("BUY", "AAPL", 3)]
+    assert plan.errors == ["truncated decision dropped"]
+
+
+def test_invalid_decision_is_dropped_alone():
+    reply = json.dumps([{"action": "SHORT", "stock": "AAPL"}, DECISIONS[1], {"action": "BUY", "stock": "TSLA", "quantity": -2}])
+    plan = parse_plan(reply)
+    assert actions(plan) == [("SELL", "MSFT", 1)]
+    assert len(plan.errors) == 2
+    assert all(error.startswith("invalid decision") for error in plan.errors)
+
+
+def test_lone_decision_object():
+    plan = parse_plan("Decision: " + json.dumps(DECISIONS[0]))
+    assert actions(plan) == [("BUY", "AAPL", 3)]
+    assert plan.errors == []
+
+
+@pytest.mark.parametrize("reply", ["", "I would rather hold for now.", None])
+def test_reply_without_decisions(reply):
+    plan = parse_plan(reply)
+    assert plan.decisions == []
+    assert plan.errors == ["no decision found in the reply"]
+
+
+@pytest.mark.parametrize("size", [1, 3, 16])
+def test_chunked_feed_yields_each_decision_once_complete(size):
+    reply = f"```json\n{PLAN}\n```"
+    # offset just past the closing brace of each decision
+    decoder = json.JSONDecoder()
+    ends = [decoder.raw_decode(reply, match.start())[1] for match in re.finditer(r'\{\s*"action"', reply)]
+    extractor = PlanExtractor()
+    seen = []
+    for start in range(0, len(reply), size):
+        for item in extractor.feed(reply[start:start + size]):
+            seen.append(item)
+            # returned by the chunk holding its closing brace
+            assert start < ends[len(seen) - 1] <= start + size
+    seen.extend(extractor.close())
+    assert seen == DECISIONS
+    assert extractor.errors == []
+    assert list(iter_plan_items(reply[i:i + size] for i in range(0, len(reply), size))) == DECISIONS
@@ -0,0 +1,89 @@
+import asyncio
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+from trader.trader import Trader, Transaction, TransactionType, Thought
+from trader.storage import AsyncStorage, StorageConfig
+from trader.repository import page_transactions, page_thoughts, encode_cursor, decode_cursor
+
+START = datetime(2024, 1, 1, 9, 0)
+
+
+@pytest.fixture
+def history(tmp_path, session, trader):
+    """25 transactions, in pairs sharing a timestamp so the id breaks the ties, and a few thoughts."""
+    session.add_all([
+        Transaction(trader_id=trader.id, symbol="AAPL" if i % 3 else "MSFT", quantity=1, price=100.0 + i,
+                    transaction_type=TransactionType.BUY if i % 2 else TransactionType.SELL,
+                    timestamp=START + timedelta(minutes=i // 2))
+        for i in range(25)
+    ])
+    session.add_all([
+        Thought(trader_id=trader.id, mode="ideal", action="HOLD", stock="AAPL", quantity=0, confidence=0.5,
+                reasoning=f"thought {i}", timestamp=START + timedelta(hours=i))
+        for i in range(5)
+    ])
+    # another trader's rows never show up
+    other = Trader(name="Bob", balance=0.0, mode="ideal")
+    session.add(other)
+    session.commit()
+    session.add(Transaction(trader_id=other.id, symbol="AAPL", quantity=1, price=1.0,
+                            transaction_type=TransactionType.BUY, timestamp=START))
+    session.commit()
+    trader_id = trader.id
+    session.remove()
+    return f"sqlite:///{tmp_path / 'test.sqlite'}", trader_id
+
+
+def collect(url, page, trader_id, limit, **filters):
+    """All pages of `page` as lists of rows, following the cursors."""
+    async def run():
+        storage = AsyncStorage(StorageConfig(url=url))
+        await storage.init_schema()
+        pages, cursor = [], None
+        try:
+            async with storage.session() as session:
+                while True:
+                    rows, cursor = await page(session, trader_id, limit=limit, cursor=cursor, **filters)
+                    pages.append(rows)
+                    if cursor is None:
+                        return pages
+        finally:
+            await storage.dispose()
+    return asyncio.run(run())
+
+
+@pytest.mark.parametrize("limit", [1, 4, 10, 25, 50])
+def test_pages_cover_the_history_once_newest_first(history, limit):
+    url, trader_id = history
+    pages = collect(url, page_transactions, trader_id, limit)
+    rows = [row for page in pages for row in page]
+    assert len(pages) == max(1, -(-25 // limit))
+    assert all(len(page) == limit for page in pages[:-1])
+    assert len({row.id for row in rows}) == len(rows) == 25
+    keys = [(row.timestamp, row.id) for row in rows]
+    assert keys == sorted(keys, reverse=True)
+
+
+def test_filters_apply_to_every_page(history):
+    url, trader_id = history
+    rows = [row for page in collect(url, page_transactions, trader_id, 3, stock="AAPL", action="buy",
+                                    since=START + timedelta(minutes=2)) for row in page]
+    expected = [i for i in range(25) if i % 3 and i % 2 and i // 2 >= 2]
+    assert sorted(row.price - 100.0 for row in rows) == expected
+    assert all(row.symbol == "AAPL" and row.transaction_type == TransactionType.BUY for row in rows)
+
+
+def test_aware_filters_are_compared_in_utc(history):
+    url, trader_id = history
+    until = (START + timedelta(hours=2)).replace(tzinfo=timezone.utc).astimezone(timezone(timedelta(hours=5)))
+    rows = [row for page in collect(url, page_thoughts, trader_id, 2, until=until) for row in page]
+    assert [row.reasoning for row in rows] == ["thought 1", "thought 0"]
+
+
+def test_cursor_round_trip_and_malformed_cursor():
+    assert decode_cursor(encode_cursor(START, 42)) == (START, 42)
+    for cursor in ["not a cursor", encode_cursor(START, 1)[:-4], "W10="]:
+        with pytest.raises(ValueError):
+            decode_cursor(cursor)
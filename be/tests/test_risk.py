@@ -0,0 +1,145 @@
+import math
+from datetime import datetime, timedelta
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from trader.trader import Trader, Position, EquitySnapshot
+from trader.risk import PERIODS_PER_YEAR, ROLLING_WINDOW, portfolio_risk, format_risk_metrics
+
+PRICES = {"AAPL": 150.0, "MSFT": 300.0, "TSLA": 200.0, "NVDA": 100.0}
+START = datetime(2024, 1, 1)
+
+
+def std(values):
+    """Sample standard deviation."""
+    mean = sum(values) / len(values)
+    return math.sqrt(sum((value - mean) ** 2 for value in values) / (len(values) - 1))
+
+
+def naive_equity_metrics(equity):
+    """Metrics of one trader from its equity list, one snapshot at a time."""
+    returns = [equity[t] / equity[t - 1] - 1.0 for t in range(1, len(equity))]
+    scale = math.sqrt(PERIODS_PER_YEAR)
+    mean = sum(returns) / len(returns)
+    downside = math.sqrt(sum(min(r, 0.0) ** 2 for r in returns) / len(returns))
+    peak, drawdowns = equity[0], []
+    for value in equity:
+        peak = max(peak, value)
+        drawdowns.append(value / peak - 1.0)
+    return {
+        "volatility": std(returns) * scale,
+        "rolling_volatility": std(returns[-ROLLING_WINDOW:]) * scale,
+        "max_drawdown": min(drawdowns),
+        "current_drawdown": drawdowns[-1],
+        "sharpe": mean / std(returns) * scale,
+        "sortino": mean / downside * scale if downside else None,
+        "total_return": equity[-1] / equity[0] - 1.0,
+    }
+
+
+def naive_holdings(balance, quantities, price_history):
+    """Exposure, concentration and holdings correlation of one trader, symbol pair by symbol pair."""
+    values = {symbol: quantity * PRICES[symbol] for symbol, quantity in quantities.items() if quantity > 0}
+    invested = sum(values.values())
+    total = balance + invested
+    exposure = {symbol: value / total for symbol, value in values.items()}
+    weights = {symbol: value / invested for symbol, value in values.items()}
+    returns = price_history.pct_change(fill_method=None)
+    pairs = [(a, b) for a in weights for b in weights if a != b]
+    correlation = None
+    if pairs:
+        weighted = sum(weights[a] * weights[b] * np.corrcoef(returns[a][1:], returns[b][1:])[0, 1] for a, b in pairs)
+        correlation = weighted / sum(weights[a] * weights[b] for a, b in pairs)
+    return {
+        "exposure": exposure,
+        "cash_weight": 1.0 - sum(exposure.values()),
+        "concentration": sum(weight ** 2 for weight in weights.values()) if weights else None,
+        "largest_position": max(exposure, key=exposure.get) if exposure else None,
+        "holdings_correlation": correlation,
+    }
+
+
+@pytest.fixture
+def price_history():
+    rng = np.random.default_rng(1)
+    closes = 100 * np.exp(np.cumsum(rng.normal(0, 0.01, size=(300, len(PRICES))), axis=0))
+    return pd.DataFrame(closes, columns=list(PRICES))
+
+
+@pytest.fixture
+def traders(session):
+    """Traders with equity histories of different lengths (one joined late, one without any) and holdings."""
+    rng = np.random.default_rng(0)
+    setups = [
+        ("Alice", 5_000.0, 250, {"AAPL": 10, "MSFT": 5, "TSLA": 3}),
+        ("Bob", 1_000.0, 250, {"NVDA": 40}),
+        ("Charlie", 8_000.0, 60, {"AAPL": 2, "NVDA": 0}),
+        ("David", 10_000.0, 0, {}),
+    ]
+    equities = {}
+    for name, balance, snapshots, quantities in setups:
+        trader = Trader(name=name, balance=balance, mode="ideal")
+        session.add(trader)
+        session.flush()
+        for symbol, quantity in quantities.items():
+            session.add(Position(trader_id=trader.id, symbol=symbol, quantity=quantity, average_cost=100.0))
+        equity = list(10_000 * np.cumprod(1 + rng.normal(0.0005, 0.01, snapshots)))
+        for t, value in enumerate(equity):
+            # every trader snapshots on the same hourly cycle, the late one for the last cycles only
+            session.add(EquitySnapshot(trader_id=trader.id, timestamp=START + timedelta(hours=250 - snapshots + t),
+                                       balance=balance, portfolio_value=value - balance, total_equity=value))
+        equities[trader.id] = (balance, quantities, equity)
+    session.commit()
+    return equities
+
+
+def test_metrics_match_the_naive_per_trader_computation(session, traders, price_history):
+    risk = portfolio_risk(session, PRICES, price_history)
+    assert set(risk) == set(traders)
+    for trader_id, (balance, quantities, equity) in traders.items():
+        expected = naive_holdings(balance, quantities, price_history)
+        if len(equity) > 1:
+            expected.update(naive_equity_metrics(equity))
+        for name, value in expected.items():
+            if isinstance(value, dict):
+                assert risk[trader_id][name].keys() == value.keys()
+                for symbol in value:
+                    assert risk[trader_id][name][symbol] == pytest.approx(value[symbol]), (trader_id, name, symbol)
+            elif isinstance(value, float):
+                assert risk[trader_id][name] == pytest.approx(value, rel=1e-9), (trader_id, name)
+            else:
+                assert risk[trader_id][name] == value, (trader_id, name)
+
+
+def test_traders_without_history_or_holdings(session, traders, price_history):
+    risk = portfolio_risk(session, PRICES, price_history)
+    david = next(trader_id for trader_id, (_, _, equity) in traders.items() if not equity)
+    assert risk[david]["volatility"] is None
+    assert risk[david]["sharpe"] is None
+    assert risk[david]["exposure"] == {}
+    assert risk[david]["cash_weight"] == 1.0
+    assert risk[david]["concentration"] is None
+    assert risk[david]["holdings_correlation"] is None
+    # one holding: no pair to correlate
+    bob = next(trader_id for trader_id, (_, quantities, _) in traders.items() if list(quantities) == ["NVDA"])
+    assert risk[bob]["concentration"] == 1.0
+    assert risk[bob]["holdings_correlation"] is None
+
+
+def test_exposure_is_ordered_by_weight(session, traders):
+    risk = portfolio_risk(session, PRICES)
+    for report in risk.values():
+        weights = list(report["exposure"].values())
+        assert weights == sorted(weights, reverse=True)
+        assert report["holdings_correlation"] is None
+
+
+def test_format_risk_metrics(session, traders, price_history):
+    risk = portfolio_risk(session, PRICES, price_history)
+    alice = next(iter(traders))
+    block = format_risk_metrics(risk[alice], {"AAPL": 12.5})
+    assert block.startswith("\nRisk Metrics:")
+    assert "- AAPL:" in block and "Realized P/L: $12.50" in block
+    assert "n/a" in format_risk_metrics({})
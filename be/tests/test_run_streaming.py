@@ -0,0 +1,115 @@
+import json
+import asyncio
+
+import pytest
+
+pytest.importorskip("openai")
+
+from trader.trader import Trader, Transaction, Thought, Position
+from trader.llm_trader import LLMTrader
+
+PRICES = {"AAPL": 100.0, "MSFT": 50.0}
+
+
+def decision(action, stock, quantity, confidence=0.9):
+    return {"action": action, "stock": stock, "quantity": quantity, "confidence": confidence, "reasoning": "test"}
+
+
+class Reply:
+    """Async iterator over a streamed reply, one decision per chunk, recording what the consumer saw."""
+
+    def __init__(self, decisions, on_chunk=None, fail_after=None):
+        text = json.dumps({"decisions": decisions})
+        cuts = [text.index(json.dumps(item)) for item in decisions[1:]]
+        self.chunks = [text[a:b] for a, b in zip([0] + cuts, cuts + [len(text)])]
+        self.on_chunk = on_chunk
+        self.fail_after = fail_after
+        self.sent = 0
+        self.closed = False
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        if self.on_chunk is not None:
+            self.on_chunk(self.sent)
+        if self.sent == self.fail_after:
+            raise ConnectionError("stream interrupted")
+        if self.sent == len(self.chunks):
+            raise StopAsyncIteration
+        self.sent += 1
+        await asyncio.sleep(0)
+        return self.chunks[self.sent - 1]
+
+    async def aclose(self):
+        self.closed = True
+
+
+def run(session, trader, reply):
+    return asyncio.run(LLMTrader(trader, "", "ideal").run_streaming(session, PRICES, reply))
+
+
+def assert_nothing_executed(session, trader, rejected_thoughts=0):
+    session.expire_all()
+    assert session.get(Trader, trader.id).balance == 10_000.0
+    assert session.query(Transaction).count() == 0
+    assert session.query(Position).count() == 0
+    # the reasoning read before the cancellation is kept, flagged as rejected
+    assert [thought.status for thought in session.query(Thought)] == ["rejected"] * rejected_thoughts
+
+
+def test_orders_are_executed_as_they_are_parsed(session, trader):
+    plan = [decision("BUY", "AAPL", 10), decision("SELL", "AAPL", 4), decision("HOLD", "MSFT", 0),
+            decision("BUY", "MSFT", 20)]
+    llm = LLMTrader(trader, "", "ideal")
+    balances = []
+
+    def on_chunk(sent):
+        # the trader as executed so far, before the next chunk is read
+        if sent:
+            balances.append(llm.trader.balance)
+
+    reply = Reply(plan, on_chunk)
+    result = asyncio.run(llm.run_streaming(session, PRICES, reply))
+
+    assert balances == [9_000.0, 9_400.0, 9_400.0, 8_400.0]
+    assert result["cancelled"] is None
+    assert len(result["orders"]) == 3
+    assert 0 < result["first_action"] < result["total"]
+    assert reply.closed
+
+    session.expire_all()
+    assert session.get(Trader, trader.id).balance == pytest.approx(8_400.0)
+    assert session.query(Transaction).count() == 3
+    assert [thought.status for thought in session.query(Thought)] == ["executed"] * 4
+    # opened and partly sold within the same uncommitted transaction: a single ledger row
+    assert session.query(Position).filter_by(symbol="AAPL").one().quantity == 6
+
+
+def test_rejected_order_cancels_the_stream_and_rolls_back(session, trader):
+    reply = Reply([decision("BUY", "AAPL", 10), decision("BUY", "MSFT", 1_000), decision("BUY", "AAPL", 1)])
+    result = run(session, trader, reply)
+
+    assert "insufficient balance" in result["cancelled"].lower()
+    assert result["orders"] == [] and result["first_action"] is None
+    # the last decision was never read
+    assert reply.sent == 2 and reply.closed
+    assert_nothing_executed(session, trader, rejected_thoughts=2)
+
+
+def test_invalid_decision_cancels_the_plan(session, trader):
+    reply = Reply([decision("BUY", "AAPL", 10), {"action": "SHORT", "stock": "AAPL"}, decision("BUY", "MSFT", 1)])
+    result = run(session, trader, reply)
+
+    assert result["cancelled"].startswith("invalid decision")
+    assert reply.sent == 2
+    assert_nothing_executed(session, trader, rejected_thoughts=1)
+
+
+def test_interrupted_stream_rolls_back(session, trader):
+    reply = Reply([decision("BUY", "AAPL", 10), decision("BUY", "MSFT", 1)], fail_after=1)
+    with pytest.raises(ConnectionError):
+        run(session, trader, reply)
+
+    assert reply.closed
+    assert_nothing_executed(session, trader)
@@ -0,0 +1,96 @@
+import json
+
+import pytest
+from fastapi import FastAPI, Request
+from fastapi.exceptions import HTTPException
+from fastapi.testclient import TestClient
+
+from snapshot import Snapshot
+
+PAYLOAD = {"people": {"Alice": "ideal"}, "current_prices": {"AAPL": 100.0}}
+
+
+def dashboard_app(snapshot: dict) -> FastAPI:
+    """The `/` handler of main.py over a plain dict instead of the pipeline snapshot."""
+    app = FastAPI()
+
+    @app.get("/")
+    async def root(request: Request):
+        if "dashboard" not in snapshot:
+            raise HTTPException(status_code=503, detail="Dashboard not ready yet", headers={"Retry-After": "30"})
+        return snapshot["dashboard"].response(request.headers.get("if-none-match"))
+
+    return app
+
+
+def test_etag_is_derived_from_the_body():
+    first, second = Snapshot.build(PAYLOAD), Snapshot.build(dict(PAYLOAD))
+    assert first.etag == second.etag
+    assert first.etag.startswith('"') and first.etag.endswith('"')
+    assert Snapshot.build({**PAYLOAD, "current_prices": {"AAPL": 101.0}}).etag != first.etag
+    assert json.loads(first.body) == PAYLOAD
+
+
+@pytest.mark.parametrize("header, matches", [
+    (None, False),
+    ("", False),
+    ("*", True),
+    ('"other"', False),
+    ('"other", {etag}', True),
+    ("W/{etag}", True),
+])
+def test_if_none_match(header, matches):
+    snapshot = Snapshot.build(PAYLOAD)
+    assert snapshot.matches(header.format(etag=snapshot.etag) if header else header) is matches
+
+
+def test_503_before_the_first_snapshot():
+    client = TestClient(dashboard_app({}))
+    response = client.get("/")
+    assert response.status_code == 503
+    assert response.headers["retry-after"] == "30"
+
+
+def test_200_then_304_while_the_snapshot_is_unchanged():
+    snapshot = {"dashboard": Snapshot.build(PAYLOAD)}
+    client = TestClient(dashboard_app(snapshot))
+    response = client.get("/")
+    assert response.status_code == 200
+    assert response.json() == PAYLOAD
+    assert response.headers["etag"] == snapshot["dashboard"].etag
+    assert response.headers["cache-control"] == "no-cache"
+
+    response = client.get("/", headers={"If-None-Match": response.headers["etag"]})
+    assert response.status_code == 304
+    assert response.content == b""
+    assert response.headers["etag"] == snapshot["dashboard"].etag
+
+    # a new cycle with other data: the stale tag gets the full body again
+    snapshot["dashboard"] = Snapshot.build({**PAYLOAD, "current_prices": {"AAPL": 101.0}})
+    stale = client.get("/", headers={"If-None-Match": response.headers["etag"]})
+    assert stale.status_code == 200
+    assert stale.json()["current_prices"] == {"AAPL": 101.0}
+
+
+@pytest.fixture
+def main(tmp_path, monkeypatch):
+    for module in ("vaderSentiment", "feedparser", "torch", "transformers", "tensorflow", "openai"):
+        pytest.importorskip(module)
+    # main.py logs to app.log in the working directory
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setenv("DB_URL", f"sqlite:///{tmp_path / 'test.sqlite'}")
+    import main
+    monkeypatch.setattr(main.pipeline, "snapshot", {})
+    return main
+
+
+def test_main_root_serves_the_dashboard_snapshot(main):
+    # without the startup hook: no database, models or update cycle, only the published snapshot
+    client = TestClient(main.app)
+    assert client.get("/").status_code == 503
+
+    main.pipeline.snapshot["dashboard"] = Snapshot.build(PAYLOAD)
+    response = client.get("/")
+    assert response.status_code == 200
+    assert response.json() == PAYLOAD
+    assert client.get("/", headers={"If-None-Match": response.headers["etag"]}).status_code == 304
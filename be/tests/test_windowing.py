@@ -0,0 +1,92 @@
+import numpy as np
+import pytest
+
+from time_series.windowing import window_features, window_multivariate, window_targets, window_univariate
+
+
+def loop_univariate(data, window_size):
+    """`StockPredictor.window_data_univariate` before the strided views."""
+    X, y = [], []
+    for i in range(len(data) - window_size - 1):
+        X.append(data[i:(i + window_size)])
+        y.append(data[i + window_size])
+    return np.array(X), np.array(y).reshape(-1, 1)
+
+
+def loop_multivariate(data, close_data, window_size):
+    """`StockPredictor.window_data_multivariate` before the strided views."""
+    X, y = [], []
+    for i in range(len(data) - window_size - 1):
+        X.append(data[i:(i + window_size), :])
+        y.append(close_data[i + window_size])
+    return np.array(X), np.array(y).reshape(-1, 1)
+
+
+def loop_windows(data, close_data, window_size, horizon, keep_last=False):
+    """The same loops with a `horizon` steps target."""
+    X, y = [], []
+    for i in range(len(data) - window_size - horizon + keep_last):
+        X.append(data[i:(i + window_size)])
+        y.append(close_data[i + window_size:i + window_size + horizon])
+    return np.array(X).reshape(-1, window_size, data.shape[1]), np.array(y).reshape(-1, horizon)
+
+
+@pytest.fixture
+def series():
+    rng = np.random.default_rng(0)
+    return rng.normal(size=(40, 3))
+
+
+@pytest.mark.parametrize("window_size", [1, 6, 20])
+def test_univariate_matches_the_loops(series, window_size):
+    data = series[:, :1]
+    X, y = window_univariate(data, window_size)
+    expected_X, expected_y = loop_univariate(data, window_size)
+    assert X.shape == expected_X.shape == (len(data) - window_size - 1, window_size, 1)
+    np.testing.assert_array_equal(X, expected_X)
+    np.testing.assert_array_equal(y, expected_y)
+
+
+@pytest.mark.parametrize("window_size", [1, 6, 20])
+def test_multivariate_matches_the_loops(series, window_size):
+    X, y = window_multivariate(series, series[:, 0], window_size)
+    expected_X, expected_y = loop_multivariate(series, series[:, 0], window_size)
+    assert len(X) == len(y) == len(expected_X)
+    np.testing.assert_array_equal(X, expected_X)
+    np.testing.assert_array_equal(y, expected_y)
+
+
+@pytest.mark.parametrize("horizon", [1, 3, 12])
+@pytest.mark.parametrize("keep_last", [False, True])
+def test_horizon_matches_the_loops(series, horizon, keep_last):
+    window_size = 6
+    X, y = window_multivariate(series, series[:, 0], window_size, horizon, keep_last)
+    expected_X, expected_y = loop_windows(series, series[:, 0], window_size, horizon, keep_last)
+    assert len(X) == len(y) == len(series) - window_size - horizon + keep_last
+    np.testing.assert_array_equal(X, expected_X)
+    np.testing.assert_array_equal(y, expected_y)
+
+
+def test_horizon_edge(series):
+    window_size, horizon = 6, 3
+    # the original loops leave out the window whose target ends on the last row, keep_last builds it
+    y = window_targets(series[:, 0], window_size, horizon)
+    assert y[-1, -1] == series[-2, 0]
+    y = window_targets(series[:, 0], window_size, horizon, keep_last=True)
+    assert y[-1, -1] == series[-1, 0]
+    X = window_features(series, window_size, horizon, keep_last=True)
+    np.testing.assert_array_equal(X[-1], series[-window_size - horizon:-horizon])
+
+
+@pytest.mark.parametrize("n_rows", [0, 5, 7, 8])
+def test_too_short_series_have_no_windows(n_rows):
+    data = np.ones((n_rows, 2))
+    X, y = window_multivariate(data, data[:, 0], 6, horizon=2)
+    assert X.shape == (max(n_rows - 8, 0), 6, 2)
+    assert y.shape == (max(n_rows - 8, 0), 2)
+
+
+def test_windows_are_views(series):
+    X = window_features(series, 6)
+    assert np.shares_memory(X, series)
+    assert not X.flags.writeable
@@ -5,7 +5,8 @@ const API_BASE_URL = 'http://localhost:8000';
 
 export async function fetchTradingData(): Promise<ApiResponse> {
   try {
-    const response = await fetch(API_BASE_URL);
+    // revalidate with the server's ETag: an unchanged dashboard comes back as an empty 304
+    const response = await fetch(API_BASE_URL, { cache: 'no-cache' });
     if (!response.ok) {
       // If API fails, return mock data
       console.warn('API unavailable, using mock data');